@@ -0,0 +1,191 @@
+"""Serialization, keyset pagination and response caching for the read API.
+
+Pages are ordered on indexed columns and continue from an opaque cursor
+(`<id>` for conflicts, `<date>.<id>` for episodes), so deep pages cost the
+same as the first. Rendered responses are cached under a version stamp that
+writers bump with `invalidate()` once a step that changed episodes or
+conflict assignments finishes (a detection sweep, the generation stage, an
+import, a retention pass), not per row. Writers run in Celery workers, so
+the bump only reaches the web processes through a shared cache
+(CACHE_URL=redis://...); with the default process-local cache, pages can be
+up to API_CACHE_SECONDS stale (system check geopol.W001 warns about this).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+
+from . import search
+from .models import Conflict, Episode, RawNews
+
+VERSION_KEY = "api:version"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+CONFLICT_FIELDS = ("id", "name", "description", "member_count", "confidence", "created_at", "updated_at", "last_active_at")
+SOURCE_FIELDS = ("id", "title", "source_name", "source_url", "published_at")
+
+
+class BadRequest(ValueError):
+    """Malformed query parameter (cursor, limit or date)."""
+
+
+@dataclass
+class CachedPage:
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def version() -> int:
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def invalidate() -> None:
+    """Retire every cached API response (a fresh stamp also survives cache eviction)."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def cache_key(path: str) -> str:
+    return f"api:{version()}:{hashlib.sha1(path.encode('utf-8')).hexdigest()}"
+
+
+def render(payload: Dict, last_modified: Optional[datetime]) -> CachedPage:
+    body = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False).encode("utf-8")
+    return CachedPage(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"', last_modified=last_modified)
+
+
+def cache_seconds() -> int:
+    return getattr(settings, "API_CACHE_SECONDS", 300)
+
+
+def page_size(raw: Optional[str]) -> int:
+    if not raw:
+        return getattr(settings, "API_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise BadRequest("limit must be an integer") from None
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_date(raw: str) -> date:
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise BadRequest("date must be YYYY-MM-DD") from None
+
+
+def _latest(*values: Optional[datetime]) -> Optional[datetime]:
+    present = [v for v in values if v is not None]
+    return max(present) if present else None
+
+
+def article_dict(a: RawNews) -> Dict:
+    return {"id": a.id, "title": a.title, "source_name": a.source_name, "url": a.source_url,
+            "published_at": a.published_at, "conflict_id": a.conflict_id}
+
+
+def conflict_dict(c: Conflict) -> Dict:
+    return {name: getattr(c, name) for name in CONFLICT_FIELDS}
+
+
+def episode_dict(e: Episode) -> Dict:
+    return {
+        "id": e.id,
+        "date": e.date,
+        "conflict": {"id": e.conflict_id, "name": e.conflict.name},
+        "summary": e.summary,
+        "narrative": e.narrative,
+        "confidence": e.confidence,
+        "updated_at": e.updated_at,
+        "sources": [{"id": s.id, "title": s.title, "source_name": s.source_name, "url": s.source_url,
+                     "published_at": s.published_at} for s in e.sources.all()],
+    }
+
+
+def conflict_page(cursor: Optional[str], limit: int) -> Tuple[List[Conflict], Optional[str]]:
+    """Newest conflicts first; the embedding is never loaded."""
+    qs = Conflict.objects.only(*CONFLICT_FIELDS).order_by("-id")
+    if cursor:
+        try:
+            qs = qs.filter(id__lt=int(cursor))
+        except ValueError:
+            raise BadRequest("invalid cursor") from None
+    rows = list(qs[: limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (str(rows[-1].id) if more else None)
+
+
+def with_relations(qs):
+    """Episodes with their conflict joined and sources in one extra query."""
+    return qs.select_related("conflict").only(
+        "id", "date", "summary", "narrative", "confidence", "updated_at", "conflict__id", "conflict__name",
+    ).prefetch_related(
+        Prefetch("sources", queryset=RawNews.objects.only(*SOURCE_FIELDS).order_by("id"))
+    )
+
+
+def episode_page(qs, cursor: Optional[str], limit: int) -> Tuple[List[Episode], Optional[str]]:
+    """Episodes of `qs`, newest day first."""
+    qs = with_relations(qs).order_by("-date", "-id")
+    if cursor:
+        day, _, last_id = cursor.partition(".")
+        try:
+            day, last_id = date.fromisoformat(day), int(last_id)
+        except ValueError:
+            raise BadRequest("invalid cursor") from None
+        qs = qs.filter(Q(date__lt=day) | Q(date=day, id__lt=last_id))
+    rows = list(qs[: limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (f"{rows[-1].date.isoformat()}.{rows[-1].id}" if more else None)
+
+
+def conflicts_payload(cursor: Optional[str], limit: int) -> CachedPage:
+    rows, nxt = conflict_page(cursor, limit)
+    return render({"results": [conflict_dict(c) for c in rows], "next": nxt},
+                  _latest(*(c.updated_at for c in rows)))
+
+
+def timeline_payload(conflict: Conflict, cursor: Optional[str], limit: int) -> CachedPage:
+    rows, nxt = episode_page(Episode.objects.filter(conflict=conflict), cursor, limit)
+    return render({"conflict": conflict_dict(conflict), "results": [episode_dict(e) for e in rows], "next": nxt},
+                  _latest(conflict.updated_at, *(e.updated_at for e in rows)))
+
+
+def episodes_payload(day: Optional[date], cursor: Optional[str], limit: int) -> CachedPage:
+    qs = Episode.objects.filter(date=day) if day else Episode.objects.all()
+    rows, nxt = episode_page(qs, cursor, limit)
+    return render({"results": [episode_dict(e) for e in rows], "next": nxt},
+                  _latest(*(e.updated_at for e in rows)))
+
+
+def search_payload(query: str, kind: str, cursor: Optional[str], limit: int) -> CachedPage:
+    if not query.strip():
+        raise BadRequest("q is required")
+    if kind not in search.INDEXES:
+        raise BadRequest(f"type must be one of: {', '.join(search.INDEXES)}")
+    try:
+        page = search.search(query, kind, cursor, limit)
+    except ValueError:
+        raise BadRequest("invalid cursor") from None
+    if kind == "episodes":
+        found = {e.id: e for e in with_relations(Episode.objects.filter(id__in=page.ids))}
+        to_dict = episode_dict
+    else:
+        found = RawNews.objects.only(*SOURCE_FIELDS, "conflict_id").in_bulk(page.ids)
+        to_dict = article_dict
+    # Rows deleted since the index lookup are skipped
+    results = [{**to_dict(found[i]), "score": score} for i, score in zip(page.ids, page.scores) if i in found]
+    last_modified = _latest(*(e.updated_at for e in found.values())) if kind == "episodes" else None
+    return render({"results": results, "next": page.next}, last_modified)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GeopolConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'geopol'
+
+    def ready(self):
+        from . import checks  # noqa: F401  (registers system checks)
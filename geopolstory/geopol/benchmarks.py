@@ -0,0 +1,319 @@
+"""Synthetic-load benchmarks for the daily pipeline and for search.
+
+`synthetic_corpus` fills the database with N articles, M existing conflicts
+and K subscribers; `run_benchmark` runs the whole pipeline canvas eagerly on
+it with a deterministic embedder, NER and LLM, and reports per-stage wall
+time from the run's metrics. Results are plain dicts so they can be written
+as JSON and compared across commits with `compare_results`.
+
+`run_search_benchmark` does the same for full-text search on an archive of
+Zipf-distributed synthetic text, with an `icontains` scan as the baseline.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.test import override_settings
+from django.utils import timezone
+
+from . import search
+from .models import Conflict, ConflictSubscription, Episode, PipelineRun, RawNews
+from .pipeline.embedders import Embedder
+from .pipeline.processing import NERResult
+from .pipeline.story_generation import GenerationResult
+
+STAGES = [PipelineRun.STAGE_SCRAPE, PipelineRun.STAGE_DETECT, PipelineRun.STAGE_GENERATE, PipelineRun.STAGE_EMAIL]
+SEARCH_VOCABULARY = 20000
+TIMEZONES = ["UTC", "Asia/Kolkata", "Europe/London", "America/New_York", "Asia/Tokyo"]
+# Fraction of articles about topics with no existing conflict (exercises creation)
+NEW_TOPIC_SHARE = 0.1
+
+
+@dataclass
+class Scale:
+    articles: int
+    conflicts: int
+    subscribers: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "Scale":
+        """`N` or `N:M:K`; M defaults to N/20 and K to N/2."""
+        parts = [int(p) for p in spec.split(":")]
+        n = parts[0]
+        m = parts[1] if len(parts) > 1 else max(n // 20, 1)
+        k = parts[2] if len(parts) > 2 else max(n // 2, 1)
+        return cls(articles=n, conflicts=m, subscribers=k)
+
+
+class SyntheticEmbedder(Embedder):
+    """Deterministic embedder: a fixed vector per topic token plus small per-text noise.
+
+    `noise` is the norm of the per-text perturbation, so same-topic texts sit
+    around cosine 1/sqrt(1 + noise**2) of their topic.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, dim: int = 384, noise: float = 0.3) -> None:
+        self.dim = dim
+        self.noise = noise
+
+    def topic_vector(self, topic: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(topic.encode("utf-8")).digest()[:4], "big")
+        vec = np.random.default_rng(seed).standard_normal(self.dim)
+        return vec / np.linalg.norm(vec)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        rows = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "big")
+            jitter = np.random.default_rng(seed).standard_normal(self.dim)
+            vec = self.topic_vector(text.split()[0]) + self.noise * jitter / np.linalg.norm(jitter)
+            rows.append(vec / np.linalg.norm(vec))
+        return np.asarray(rows, dtype=np.float32)
+
+
+class StubStoryGenerator:
+    """Stands in for the LLM backends: instant, deterministic narratives."""
+
+    model = "synthetic"
+
+    async def generate_all(self, jobs, on_result=None):
+        results = []
+        for job in jobs:
+            res = GenerationResult(key=job.key, text=f"Summary for {job.key}\n{job.prompt[:200]}", attempts=1)
+            if on_result:
+                await on_result(res)
+            results.append(res)
+            await asyncio.sleep(0)
+        return results
+
+    async def aclose(self) -> None:
+        pass
+
+
+def _stub_ner(self, text: str) -> NERResult:
+    # Every article gets its own signature so detection takes the centroid path
+    return NERResult(orgs=[hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]])
+
+
+def synthetic_corpus(scale: Scale, embedder: Optional[SyntheticEmbedder] = None, seed: int = 0) -> None:
+    """Insert `scale` worth of conflicts, last-24h articles and subscribers."""
+    embedder = embedder or SyntheticEmbedder()
+    rng = np.random.default_rng(seed)
+    now = timezone.now()
+
+    Conflict.objects.bulk_create(
+        [
+            Conflict(
+                name=f"topic-{t} conflict",
+                entity_signature=f"bench:topic-{t}",
+                embedding=embedder.topic_vector(f"topic-{t}").tolist(),
+                member_count=10,
+                centroid_weight=10.0,
+                centroid_updated_at=now - timedelta(days=2),
+                last_active_at=now - timedelta(days=2),
+            )
+            for t in range(scale.conflicts)
+        ],
+        batch_size=1000,
+    )
+    topics = max(int(scale.conflicts * (1 + NEW_TOPIC_SHARE)), scale.conflicts + 1)
+    RawNews.objects.bulk_create(
+        [
+            RawNews(
+                source_name="Synthetic",
+                source_url=f"https://bench.invalid/a/{i}",
+                title=f"topic-{t} update {i}",
+                text=f"topic-{t} report {i}. " * 20,
+                fingerprint=f"bench-{i}",
+                published_at=now - timedelta(minutes=int(rng.integers(1, 23 * 60))),
+            )
+            for i, t in enumerate(rng.integers(0, topics, size=scale.articles))
+        ],
+        batch_size=1000,
+    )
+    User = get_user_model()
+    User.objects.bulk_create(
+        [
+            User(username=f"bench{u}", email=f"bench{u}@example.com", is_subscribed=True,
+                 timezone=TIMEZONES[u % len(TIMEZONES)])
+            for u in range(scale.subscribers)
+        ],
+        batch_size=1000,
+    )
+    # A quarter of subscribers follow a few conflicts; the rest get everything
+    users = list(User.objects.filter(username__startswith="bench").values_list("id", flat=True))
+    conflict_ids = list(Conflict.objects.values_list("id", flat=True))
+    ConflictSubscription.objects.bulk_create(
+        [
+            ConflictSubscription(user_id=uid, conflict_id=int(cid))
+            for uid in users[: len(users) // 4]
+            for cid in set(rng.choice(conflict_ids, size=min(3, len(conflict_ids)), replace=False))
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def run_benchmark(scale: Scale, seed: int = 0) -> Dict:
+    """Build the corpus for `scale`, run the pipeline on it and time every stage.
+
+    Runs against whatever database is active; callers isolate it (the
+    `bench_pipeline` command uses a throwaway test database).
+    """
+    from . import tasks
+
+    embedder = SyntheticEmbedder()
+    t0 = time.perf_counter()
+    synthetic_corpus(scale, embedder, seed=seed)
+    setup_seconds = time.perf_counter() - t0
+
+    with ExitStack() as stack:
+        stack.enter_context(override_settings(
+            CELERY_TASK_ALWAYS_EAGER=True,
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+        ))
+        stack.enter_context(mock.patch.object(tasks, "scrape_source", lambda name, max_per_source: 0))
+        stack.enter_context(mock.patch.object(tasks, "get_story_generator", StubStoryGenerator))
+        stack.enter_context(mock.patch("geopol.pipeline.conflict_detection.get_embedder", lambda **kw: embedder))
+        stack.enter_context(mock.patch("geopol.pipeline.context.get_embedder", lambda **kw: embedder))
+        stack.enter_context(mock.patch("geopol.pipeline.processing.Preprocessor.ner", _stub_ner))
+        t0 = time.perf_counter()
+        run_id = tasks.run_daily_pipeline()
+        # Deliver every timezone bucket now rather than at its local morning
+        tasks.send_due_digests(as_of=(timezone.now() + timedelta(days=1, hours=1)).isoformat())
+        total = time.perf_counter() - t0
+        run = PipelineRun.objects.get(id=run_id)
+
+    hist = run.metrics.get("histograms", {})
+    stages = {
+        stage: round(hist.get(f'pipeline_task_seconds{{stage="{stage}"}}', {}).get("sum", 0.0), 4)
+        for stage in STAGES
+    }
+    detect = hist.get("detect_seconds", {"count": 0, "sum": 0.0})
+    return {
+        "scale": asdict(scale),
+        "stage": run.stage,
+        "error": run.error,
+        "setup_seconds": round(setup_seconds, 4),
+        "total_seconds": round(total, 4),
+        "stages": stages,
+        "detect_ms_per_article": round(1000 * detect["sum"] / detect["count"], 4) if detect["count"] else 0.0,
+        "episodes": (run.checkpoints.get(PipelineRun.STAGE_GENERATE) or {}).get("episodes", 0),
+        "emails_sent": run.metrics.get("counters", {}).get("emails_sent_total", 0),
+        # Process high-water mark, so later scales in one invocation include earlier ones
+        "peak_rss_mb": round(max(run.metrics.get("peaks", {}).values(), default=0) / 2**20, 1),
+    }
+
+
+def _label(scale: Dict) -> str:
+    return f"{scale['articles']}:{scale['conflicts']}:{scale['subscribers']}"
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.2, min_seconds: float = 0.05) -> List[str]:
+    """Regressions of `current` against `baseline`, as readable strings.
+
+    A timing regresses when it is more than `threshold` (fractional) slower
+    and also at least `min_seconds` slower, which keeps tiny stages from
+    flapping on noise. Scales present in only one file are ignored.
+    """
+    base = {_label(r["scale"]): r for r in baseline.get("results", [])}
+    problems = []
+    for result in current.get("results", []):
+        label = _label(result["scale"])
+        before = base.get(label)
+        if before is None:
+            continue
+        pairs = [("total", before["total_seconds"], result["total_seconds"])]
+        pairs += [(s, before["stages"].get(s, 0.0), result["stages"].get(s, 0.0)) for s in STAGES]
+        for name, old, new in pairs:
+            if new > old * (1 + threshold) and new - old >= min_seconds:
+                problems.append(f"{label} {name}: {old:.3f}s -> {new:.3f}s (+{(new / old - 1) * 100 if old else float('inf'):.0f}%)")
+    return problems
+
+
+def _words(rng: np.random.Generator, n: int) -> str:
+    # Zipf ranks give natural-language-like term frequencies (a few very common words)
+    ranks = np.minimum(rng.zipf(1.1, size=n), SEARCH_VOCABULARY)
+    return " ".join(f"term{r}" for r in ranks)
+
+
+def search_corpus(articles: int, seed: int = 0, batch_size: int = 2000) -> Dict[str, int]:
+    """Insert an archive of `articles` articles (~300 words) and one episode per 20 articles."""
+    rng = np.random.default_rng(seed)
+    episodes = max(articles // 20, 1)
+    conflicts = max(episodes // 100, 1)
+    Conflict.objects.bulk_create(
+        [Conflict(name=f"search conflict {c}", entity_signature=f"bench:search-{c}") for c in range(conflicts)]
+    )
+    conflict_ids = list(Conflict.objects.filter(entity_signature__startswith="bench:search-").values_list("id", flat=True))
+    for start in range(0, articles, batch_size):
+        RawNews.objects.bulk_create([
+            RawNews(source_name="Synthetic", source_url=f"https://bench.invalid/s/{i}", title=_words(rng, 10),
+                    text=_words(rng, 300), fingerprint=f"bench-s{i}")
+            for i in range(start, min(start + batch_size, articles))
+        ])
+    first_day = timezone.now().date() - timedelta(days=episodes // conflicts + 1)
+    for start in range(0, episodes, batch_size):
+        Episode.objects.bulk_create([
+            Episode(conflict_id=conflict_ids[e % conflicts], date=first_day + timedelta(days=e // conflicts),
+                    summary=_words(rng, 12), narrative=_words(rng, 200))
+            for e in range(start, min(start + batch_size, episodes))
+        ])
+    return {"articles": articles, "episodes": episodes}
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ms = np.asarray(samples) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "max_ms": round(float(ms.max()), 3)}
+
+
+def run_search_benchmark(articles: int, queries: int = 50, seed: int = 0, limit: int = 20,
+                         baseline_queries: int = 5) -> Dict:
+    """Build a search archive and time ranked first pages, page five, and an `icontains` scan."""
+    t0 = time.perf_counter()
+    counts = search_corpus(articles, seed=seed)
+    setup_seconds = time.perf_counter() - t0
+
+    rng = np.random.default_rng(seed + 1)
+    # Mid-frequency terms: common enough to match many rows, rare enough to discriminate
+    workload = [f"term{a} term{b}" for a, b in rng.integers(20, 2000, size=(queries, 2))]
+    report: Dict = {"scale": counts, "setup_seconds": round(setup_seconds, 4), "queries": queries}
+    for kind in search.INDEXES:
+        first, deep = [], []
+        for q in workload:
+            t0 = time.perf_counter()
+            page = search.search(q, kind, limit=limit)
+            first.append(time.perf_counter() - t0)
+            for pageno in range(2, 6):  # walk to page five
+                if page.next is None:
+                    break
+                t0 = time.perf_counter()
+                page = search.search(q, kind, cursor=page.next, limit=limit)
+                if pageno == 5:
+                    deep.append(time.perf_counter() - t0)
+        report[kind] = {"first_page": _percentiles(first), "page_five": _percentiles(deep) if deep else None}
+
+    # What ranking needs without an index: every matching row (a LIMIT would stop early)
+    scans = []
+    for q in workload[:baseline_queries]:
+        match = Q()
+        for term in q.split():
+            match |= Q(title__icontains=term) | Q(text__icontains=term)
+        t0 = time.perf_counter()
+        RawNews.objects.filter(match).count()
+        scans.append(time.perf_counter() - t0)
+    report["icontains_scan"] = _percentiles(scans)
+    return report
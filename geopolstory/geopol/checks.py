@@ -0,0 +1,82 @@
+"""System checks for deployment settings the app relies on."""
+from __future__ import annotations
+
+from typing import List
+
+from django.conf import settings
+from django.core import checks
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+
+# Backends whose entries live in one process only
+PROCESS_LOCAL_CACHES = ("django.core.cache.backends.locmem.LocMemCache",)
+# Backends whose `add` cannot exclude other processes (dummy claims always succeed)
+UNSHARED_LOCK_CACHES = PROCESS_LOCAL_CACHES + ("django.core.cache.backends.dummy.DummyCache",)
+
+
+@checks.register(checks.Tags.caches, deploy=False)
+def check_api_cache_shared(app_configs=None, **kwargs) -> List[checks.CheckMessage]:
+    """API responses are invalidated from Celery workers, which needs a cache every process sees."""
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if getattr(settings, "API_CACHE_SECONDS", 300) > 0 and backend in PROCESS_LOCAL_CACHES:
+        return [checks.Warning(
+            "API responses are cached in a process-local cache, so invalidations from Celery workers "
+            "never reach the web processes and pages stay stale for up to API_CACHE_SECONDS.",
+            hint="Set CACHE_URL to a shared cache (e.g. redis://...), or API_CACHE_SECONDS=0.",
+            id="geopol.W001",
+        )]
+    return []
+
+
+@checks.register(checks.Tags.caches)
+def check_locks_shared(app_configs=None, **kwargs) -> List[checks.CheckMessage]:
+    """Off PostgreSQL, geopol.locks claims locks in the default cache (see advisory_lock)."""
+    engine = settings.DATABASES.get("default", {}).get("ENGINE", "")
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if "postgresql" not in engine and backend in UNSHARED_LOCK_CACHES:
+        return [checks.Warning(
+            "Locks fall back to the default cache on this database, and it is not shared between "
+            "processes: conflict creation, centroid flushes and the ingest lock only exclude threads "
+            "of one process, so parallel Celery workers can create duplicate conflicts.",
+            hint="Use PostgreSQL, or set CACHE_URL to a shared cache (e.g. redis://...); a single "
+                 "worker process is safe.",
+            id="geopol.W003",
+        )]
+    return []
+
+
+@checks.register(checks.Tags.caches)
+def check_llm_limit_shared(app_configs=None, **kwargs) -> List[checks.CheckMessage]:
+    """The LLM concurrency limit is a semaphore in the default cache (see geopol.locks.CacheSemaphore)."""
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if backend in UNSHARED_LOCK_CACHES:
+        return [checks.Warning(
+            "The LLM concurrency limit is held in a cache that is not shared between processes, so "
+            "every Celery worker process sends up to LLM_CONCURRENCY (OLLAMA_CONCURRENCY) requests "
+            "on its own.",
+            hint="Set CACHE_URL to a shared cache (e.g. redis://...).",
+            id="geopol.W004",
+        )]
+    return []
+
+
+@checks.register(checks.Tags.database)
+def check_search_index(app_configs=None, databases=None, **kwargs) -> List[checks.CheckMessage]:
+    """Search stays in sync only while its triggers/columns exist (see geopol.search)."""
+    from . import search
+
+    messages: List[checks.CheckMessage] = []
+    for alias in databases or []:
+        connection = connections[alias]
+        if ("geopol", "0010_search_index") not in MigrationRecorder(connection).applied_migrations():
+            continue
+        absent = search.missing(connection)
+        if absent:
+            messages.append(checks.Warning(
+                f"Full-text search objects are missing on '{alias}': {', '.join(absent)}. "
+                "New and edited rows are no longer indexed.",
+                hint="Run `manage.py rebuild_search_index`; a migration that rebuilds the table should "
+                     "call geopol.search.install().",
+                id="geopol.W002",
+            ))
+    return messages
@@ -1,11 +1,26 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
 
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Count, Max
 from django.template.loader import render_to_string
+from django.utils.html import escape
+
+from .metrics import incr, observe, timed
+
+# Rendered into the shared HTML once; swapped for each recipient at send time
+RECIPIENT_PLACEHOLDER = "%%RECIPIENT_EMAIL%%"
+# Where the recipient's episode fragments are spliced into the shared shell
+EPISODES_PLACEHOLDER = "%%EPISODES%%"
+
+# (email, followed conflict ids); None means "not following anything specific"
+Recipient = Tuple[str, Optional[Collection[int]]]
 
 
 @dataclass
@@ -15,11 +30,201 @@ class EpisodeEmail:
     narrative: str
     confidence: float
     sources: List[dict]
+    conflict_id: Optional[int] = None
+
+
+@dataclass
+class DigestBundle:
+    """A digest shell plus per-conflict fragments, rendered once and shared.
+
+    Personalizing a digest is a string join over the recipient's followed
+    conflicts; no template is rendered per recipient.
+    """
+
+    date_str: str
+    subject: str
+    shell: str
+    fragments: Dict[Optional[int], str] = field(default_factory=dict)
+
+    @property
+    def num_episodes(self) -> int:
+        return len(self.fragments)
+
+    @property
+    def html(self) -> str:
+        return self.shell.replace(EPISODES_PLACEHOLDER, "".join(self.fragments.values()))
+
+    def body_for(self, conflict_ids: Optional[Collection[int]] = None) -> str:
+        """Joined fragments for the followed conflicts (all when None/empty)."""
+        if not conflict_ids:
+            return "".join(self.fragments.values())
+        return "".join(html for cid, html in self.fragments.items() if cid in conflict_ids)
+
+    def html_for(self, to_email: str, conflict_ids: Optional[Collection[int]] = None) -> str:
+        # Address the shell before splicing in fragments, so generated text
+        # that happens to contain the placeholder is left alone
+        head, _, tail = self.shell.partition(EPISODES_PLACEHOLDER)
+        recipient = escape(to_email)
+        return (
+            head.replace(RECIPIENT_PLACEHOLDER, recipient)
+            + self.body_for(conflict_ids)
+            + tail.replace(RECIPIENT_PLACEHOLDER, recipient)
+        )
+
+
+def _subject(date_str: str) -> str:
+    return f"GeopolStory — Daily Digest ({date_str})"
+
+
+def render_fragment(episode: EpisodeEmail) -> str:
+    return render_to_string("email/episode_fragment.html", {"ep": episode})
+
+
+def render_shell(date_str: str, variant: str = "default") -> str:
+    return render_to_string(
+        "email/daily_digest.html",
+        {"date": date_str, "variant": variant, "recipient": RECIPIENT_PLACEHOLDER, "episodes_html": EPISODES_PLACEHOLDER},
+    )
+
+
+def render_digest(date_str: str, episodes: List[EpisodeEmail], variant: str = "default") -> DigestBundle:
+    # Episodes without a conflict id still get distinct slots, in order
+    fragments = {ep.conflict_id if ep.conflict_id is not None else -i - 1: render_fragment(ep) for i, ep in enumerate(episodes)}
+    return DigestBundle(date_str=date_str, subject=_subject(date_str), shell=render_shell(date_str, variant), fragments=fragments)
+
+
+def _fragment_key(episode) -> str:
+    return f"digest:fragment:{episode.id}:{episode.updated_at.isoformat()}"
+
+
+def _episode_email(e) -> EpisodeEmail:
+    return EpisodeEmail(
+        conflict_name=e.conflict.name,
+        summary=e.summary,
+        narrative=e.narrative,
+        confidence=e.confidence,
+        sources=[{"title": s.title, "source_name": s.source_name, "url": s.source_url} for s in e.sources.all()],
+        conflict_id=e.conflict_id,
+    )
+
+
+def _episodes(day: date):
+    from .models import Episode
+
+    return Episode.objects.filter(date=day).select_related("conflict").prefetch_related("sources").order_by("id")
+
+
+def episode_payload(day: date) -> List[EpisodeEmail]:
+    return [_episode_email(e) for e in _episodes(day)]
+
+
+def build_daily_digest(day: date, variant: str = "default", timeout: Optional[int] = None) -> DigestBundle:
+    """Materialize and render the digest for `day` once, via the cache.
+
+    The cache key includes the episode count and latest `updated_at`, so a
+    regenerated episode produces a fresh digest instead of a stale hit. On a
+    miss, per-episode fragments are themselves cached by `(id, updated_at)`,
+    so only episodes that changed since the last build are re-rendered.
+    """
+    from .models import Episode
+
+    stamp = Episode.objects.filter(date=day).aggregate(n=Count("id"), last=Max("updated_at"))
+    last = stamp["last"].isoformat() if stamp["last"] else "none"
+    key = f"digest:{day.isoformat()}:{variant}:{stamp['n']}:{last}"
+    bundle = cache.get(key)
+    if bundle is not None:
+        return bundle
+    if timeout is None:
+        timeout = getattr(settings, "DIGEST_CACHE_SECONDS", 6 * 3600)
+
+    episodes = list(_episodes(day))
+    cached = cache.get_many([_fragment_key(e) for e in episodes])
+    fresh = {}
+    fragments: Dict[Optional[int], str] = {}
+    for e in episodes:
+        fkey = _fragment_key(e)
+        html = cached.get(fkey)
+        if html is None:
+            html = fresh[fkey] = render_fragment(_episode_email(e))
+        fragments[e.conflict_id] = html
+    if fresh:
+        cache.set_many(fresh, timeout)
+
+    date_str = day.isoformat()
+    bundle = DigestBundle(date_str=date_str, subject=_subject(date_str), shell=render_shell(date_str, variant), fragments=fragments)
+    cache.set(key, bundle, timeout)
+    return bundle
+
+
+def digest_message(
+    to_email: str, bundle: DigestBundle, conflict_ids: Optional[Collection[int]] = None
+) -> Optional[EmailMultiAlternatives]:
+    """Build the recipient's message, or None if none of their conflicts has an episode."""
+    if conflict_ids and not any(cid in bundle.fragments for cid in conflict_ids):
+        return None
+    msg = EmailMultiAlternatives(
+        subject=bundle.subject, body="", from_email=settings.DEFAULT_FROM_EMAIL, to=[to_email]
+    )
+    msg.attach_alternative(bundle.html_for(to_email, conflict_ids), "text/html")
+    return msg
+
+
+def send_digest_bundle(to_email: str, bundle: DigestBundle) -> None:
+    digest_message(to_email, bundle).send()
+
+
+class PartialBatchError(RuntimeError):
+    """A batch send failed part-way; `delivered` lists the addresses already sent."""
+
+    def __init__(self, delivered: List[str], cause: Exception):
+        super().__init__(f"digest batch failed after {len(delivered)} messages: {cause}")
+        self.delivered = delivered
+
+
+@dataclass
+class BatchStats:
+    sent: int
+    seconds: float
+
+    @property
+    def per_second(self) -> float:
+        return self.sent / self.seconds if self.seconds else float("inf")
+
+
+def send_digest_batch(
+    recipients: Iterable[str | Recipient], bundle: DigestBundle, fail_silently: bool = False
+) -> BatchStats:
+    """Send `bundle` to many recipients over a single backend connection.
+
+    Recipients are plain emails (full digest) or `(email, conflict_ids)`
+    pairs (only the followed conflicts). With the SMTP backend this is one
+    TLS handshake/login per batch instead of one per recipient.
+
+    Messages go out one by one over that connection, so a failure part-way
+    raises PartialBatchError naming who already got theirs.
+    """
+    start = time.perf_counter()
+    delivered: List[str] = []
+    try:
+        with get_connection(fail_silently=fail_silently) as connection:
+            for rcpt in recipients:
+                email, conflict_ids = (rcpt, None) if isinstance(rcpt, str) else rcpt
+                msg = digest_message(email, bundle, conflict_ids)
+                if msg is None:
+                    continue
+                try:
+                    sent = connection.send_messages([msg])
+                except Exception as exc:
+                    raise PartialBatchError(delivered, exc) from exc
+                if sent:
+                    delivered.append(email)
+    finally:
+        incr("emails_sent_total", len(delivered))
+    stats = BatchStats(sent=len(delivered), seconds=time.perf_counter() - start)
+    observe("email_batch_seconds", stats.seconds)
+    return stats
 
 
+@timed("send_digest_seconds")
 def send_daily_digest(to_email: str, date_str: str, episodes: List[EpisodeEmail]) -> None:
-    subject = f"GeopolStory — Daily Digest ({date_str})"
-    html = render_to_string("email/daily_digest.html", {"date": date_str, "episodes": episodes})
-    msg = EmailMultiAlternatives(subject=subject, body="", from_email=settings.DEFAULT_FROM_EMAIL, to=[to_email])
-    msg.attach_alternative(html, "text/html")
-    msg.send()
+    send_digest_bundle(to_email, render_digest(date_str, episodes))
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+
+
+class LockTimeout(RuntimeError):
+    """Raised when a blocking lock could not be acquired in time."""
+
+
+def _pg_key(name: str) -> int:
+    # pg advisory locks take a signed 64-bit key
+    return int.from_bytes(hashlib.sha256(name.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+@contextmanager
+def advisory_lock(name: str, timeout: float = 60.0, blocking: bool = True, poll: float = 0.05) -> Iterator[bool]:
+    """Cross-process named lock. Yields True when held, False if not acquired.
+
+    On PostgreSQL this is a session-level `pg_advisory_lock`, waited on under
+    a `lock_timeout` of `timeout`; a holder that hangs keeps it until its
+    session ends, but waiters give up instead of blocking forever.
+    Elsewhere it is an atomic `cache.add` claim, which is only cross-process
+    when CACHE_URL points at a shared cache such as Redis (see the
+    geopol.W003 check). Non-blocking callers get False instead of waiting;
+    blocking callers get `LockTimeout` after `timeout` seconds.
+    """
+    if connection.vendor == "postgresql":
+        key = _pg_key(name)
+        with connection.cursor() as cur:
+            if blocking:
+                try:
+                    # The savepoint scopes lock_timeout and clears the error on timeout;
+                    # the advisory lock itself is session-level and outlives it
+                    with transaction.atomic():
+                        cur.execute("SELECT set_config('lock_timeout', %s, true)", [f"{max(int(timeout * 1000), 1)}ms"])
+                        cur.execute("SELECT pg_advisory_lock(%s)", [key])
+                except OperationalError as exc:
+                    raise LockTimeout(f"Could not acquire lock {name!r} within {timeout}s") from exc
+                acquired = True
+            else:
+                cur.execute("SELECT pg_try_advisory_lock(%s)", [key])
+                acquired = bool(cur.fetchone()[0])
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(%s)", [key])
+        return
+
+    cache_key = f"geopol:lock:{name}"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + timeout
+    # Expire the claim eventually so a crashed holder cannot wedge everyone
+    acquired = cache.add(cache_key, token, timeout=max(int(timeout), 1) * 2)
+    while not acquired and blocking:
+        if time.monotonic() >= deadline:
+            raise LockTimeout(f"Could not acquire lock {name!r} within {timeout}s")
+        time.sleep(poll)
+        acquired = cache.add(cache_key, token, timeout=max(int(timeout), 1) * 2)
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(cache_key) == token:
+            cache.delete(cache_key)
+
+
+class CacheSemaphore:
+    """Counting semaphore with `slots` holders across every process sharing the cache.
+
+    A holder claims one of `slots` keys with an atomic `cache.add` and
+    deletes it when done; until a key frees up, waiters poll. Claims expire
+    after `lease` seconds, so a crashed holder cannot keep its slot. Like the
+    cache fallback of `advisory_lock`, this only spans processes when
+    CACHE_URL points at a shared cache (geopol.W004).
+    """
+
+    def __init__(self, name: str, slots: int, lease: float, poll: float = 0.05) -> None:
+        self.keys = [f"geopol:semaphore:{name}:{i}" for i in range(max(slots, 1))]
+        self.lease = max(int(lease), 1)
+        self.poll = poll
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        token = uuid.uuid4().hex
+        held = None
+        while held is None:
+            for key in self.keys:
+                if await cache.aadd(key, token, timeout=self.lease):
+                    held = key
+                    break
+            else:
+                await asyncio.sleep(self.poll)
+        try:
+            yield
+        finally:
+            if await cache.aget(held) == token:
+                await cache.adelete(held)
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+
+from django.core.management.base import BaseCommand
+
+from geopol.retention import archive_dir, run_retention
+
+
+class Command(BaseCommand):
+    help = "Archive old article bodies (and optionally episodes) to compressed files and prune in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived/deleted")
+        parser.add_argument("--article-days", type=int, help="Override RETENTION_ARTICLE_DAYS")
+        parser.add_argument("--episode-days", type=int, help="Override RETENTION_EPISODE_DAYS")
+        parser.add_argument("--batch-size", type=int, help="Override RETENTION_BATCH_SIZE")
+
+    def handle(self, *args, **options):
+        stats = run_retention(
+            dry_run=options["dry_run"],
+            article_days=options["article_days"],
+            episode_days=options["episode_days"],
+            batch_size=options["batch_size"],
+        )
+        prefix = "Would archive" if options["dry_run"] else "Archived"
+        self.stdout.write(self.style.SUCCESS(f"{prefix} into {archive_dir()}: {asdict(stats)}"))
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from geopol.models import RawNews
+from geopol.pipeline.embedders import OnnxEmbedder, SentenceTransformerEmbedder, benchmark_embedders
+
+
+class Command(BaseCommand):
+    help = "Benchmark the ONNX int8 embedder against the PyTorch backend (throughput, latency, agreement)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--n", type=int, default=256, help="Number of texts to embed")
+        parser.add_argument("--batch-size", type=int, default=32)
+        parser.add_argument("--threads", type=int, default=0, help="ONNX intra-op threads (0 = default)")
+        parser.add_argument("--no-quantize", action="store_true", help="Benchmark the fp32 ONNX model")
+
+    def handle(self, *args, **options):
+        n = options["n"]
+        texts = [
+            f"{title}\n\n{text[:1000]}"
+            for title, text in RawNews.objects.order_by("-created_at").values_list("title", "text")[:n]
+        ]
+        if len(texts) < n:
+            # Pad with synthetic headlines so the benchmark runs on an empty DB
+            texts += [f"Clashes reported near border town {i} as talks stall" for i in range(n - len(texts))]
+        onnx = OnnxEmbedder(intra_op_threads=options["threads"], quantize=not options["no_quantize"])
+        results = benchmark_embedders(SentenceTransformerEmbedder(), onnx, texts, batch_size=options["batch_size"])
+        self.stdout.write(json.dumps(results, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Benchmarked {len(texts)} texts"))
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import json
+import subprocess
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from geopol.benchmarks import Scale, compare_results, run_benchmark
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Time each pipeline stage on synthetic corpora (stub embedder/NER/LLM, locmem email) "
+        "in a throwaway database, and optionally fail on regressions against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            default="1000,10000",
+            help="Comma-separated N or N:M:K (articles:conflicts:subscribers), e.g. 1000,10000,100000",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write JSON results to this file")
+        parser.add_argument("--baseline", help="Previous JSON results to compare against")
+        parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%)")
+        parser.add_argument("--min-seconds", type=float, default=0.05, help="Ignore slowdowns smaller than this")
+
+    def handle(self, *args, **options):
+        scales = [Scale.parse(s) for s in options["scales"].split(",") if s.strip()]
+        results = []
+        setup_test_environment()
+        test_db = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            for scale in scales:
+                # Each scale starts from an empty database
+                call_command("flush", interactive=False, verbosity=0)
+                self.stdout.write(f"Running {scale} ...")
+                results.append(run_benchmark(scale, seed=options["seed"]))
+                self.stdout.write(json.dumps(results[-1]))
+        finally:
+            connection.creation.destroy_test_db(test_db, verbosity=0)
+            teardown_test_environment()
+
+        report = {"commit": _git_commit(), "created_at": timezone.now().isoformat(), "results": results}
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as fh:
+                baseline = json.load(fh)
+            problems = compare_results(baseline, report, options["threshold"], options["min_seconds"])
+            if problems:
+                raise CommandError("Performance regressions:\n  " + "\n  ".join(problems))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
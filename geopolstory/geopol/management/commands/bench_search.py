@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from geopol.benchmarks import run_search_benchmark
+
+from .bench_pipeline import _git_commit
+
+
+class Command(BaseCommand):
+    help = (
+        "Time ranked full-text search (first page and page five) against an icontains scan "
+        "on synthetic archives in a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--articles", default="10000,100000", help="Comma-separated archive sizes")
+        parser.add_argument("--queries", type=int, default=50, help="Queries per archive and index")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write JSON results to this file")
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["articles"].split(",") if s.strip()]
+        results = []
+        setup_test_environment()
+        test_db = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            for size in sizes:
+                call_command("flush", interactive=False, verbosity=0)
+                self.stdout.write(f"Searching {size} articles ...")
+                results.append(run_search_benchmark(size, queries=options["queries"], seed=options["seed"]))
+                self.stdout.write(json.dumps(results[-1]))
+        finally:
+            connection.creation.destroy_test_db(test_db, verbosity=0)
+            teardown_test_environment()
+
+        if options["output"]:
+            report = {"commit": _git_commit(), "created_at": timezone.now().isoformat(), "vendor": connection.vendor,
+                      "results": results}
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
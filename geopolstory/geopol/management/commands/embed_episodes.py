@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from geopol.models import Episode
+from geopol.pipeline.context import ContextRetriever
+
+
+class Command(BaseCommand):
+    help = "Embed episode summaries that have no vector yet (backfill for historical context retrieval)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=256, help="Summaries per embedding call")
+
+    def handle(self, *args, **options):
+        retriever = ContextRetriever.from_settings()
+        retriever.enabled = True
+        total, last = 0, 0
+        while True:
+            batch = list(
+                Episode.objects.filter(id__gt=last).order_by("id")
+                .only("id", "summary", "embedding", "updated_at")[: options["batch_size"]]
+            )
+            if not batch:
+                break
+            pending = [e for e in batch if not e.embedding]
+            embedded = retriever.embed_episodes(pending)
+            if pending and not embedded:
+                raise CommandError("Embedder unavailable; install requirements-ml.txt or set EMBEDDING_BACKEND")
+            total += embedded
+            last = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f"Embedded {total} episode summaries"))
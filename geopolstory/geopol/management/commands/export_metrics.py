@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from geopol import metrics
+from geopol.models import PipelineRun
+
+
+class Command(BaseCommand):
+    help = "Export a pipeline run's metrics in Prometheus text format (or as a JSON summary)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--run", type=int, help="PipelineRun id (default: latest finished run)")
+        parser.add_argument(
+            "--output",
+            help="Write to this file atomically, e.g. for node_exporter's textfile collector (default: stdout)",
+        )
+        parser.add_argument("--summary", action="store_true", help="Print a condensed JSON summary instead")
+
+    def handle(self, *args, **options):
+        runs = PipelineRun.objects.all()
+        run = runs.filter(id=options["run"]).first() if options["run"] else runs.filter(finished_at__isnull=False).first()
+        if run is None:
+            raise CommandError("No matching pipeline run")
+
+        if options["summary"]:
+            self.stdout.write(json.dumps(
+                {"run": run.id, "day": run.day.isoformat(), "stage": run.stage, "error": run.error,
+                 "metrics": metrics.summarize(run.metrics)},
+                indent=2,
+            ))
+            return
+
+        gauges = {"pipeline_run_started_timestamp_seconds": run.started_at.timestamp()}
+        if run.finished_at:
+            gauges["pipeline_run_finished_timestamp_seconds"] = run.finished_at.timestamp()
+            gauges["pipeline_run_duration_seconds"] = (run.finished_at - run.started_at).total_seconds()
+        episodes = (run.checkpoints.get(PipelineRun.STAGE_GENERATE) or {}).get("episodes")
+        if episodes is not None:
+            gauges["pipeline_run_episodes"] = episodes
+        text = metrics.to_prometheus(run.metrics, gauges)
+
+        if not options["output"]:
+            self.stdout.write(text, ending="")
+            return
+        tmp = f"{options['output']}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        os.replace(tmp, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote metrics for run {run.id} to {options['output']}"))
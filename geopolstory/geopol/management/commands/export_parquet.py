@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from geopol.parquet_io import DEFAULT_CHUNK_SIZE, TABLES, export_tables
+
+
+class Command(BaseCommand):
+    help = "Stream RawNews, Conflict and Episode rows into month-partitioned Parquet files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Directory to write <table>/month=YYYY-MM/*.parquet into")
+        parser.add_argument("--tables", nargs="+", choices=TABLES, help="Subset of tables (default: all)")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows fetched per query")
+
+    def handle(self, *args, **options):
+        counts = export_tables(options["output"], options["tables"], options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Exported to {options['output']}: {counts}"))
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from geopol.parquet_io import DEFAULT_CHUNK_SIZE, TABLES, import_tables
+
+
+class Command(BaseCommand):
+    help = "Bulk-load a Parquet export (see export_parquet); existing rows are left untouched."
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Directory written by export_parquet")
+        parser.add_argument("--tables", nargs="+", choices=TABLES, help="Subset of tables (default: all)")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per insert batch")
+
+    def handle(self, *args, **options):
+        counts = import_tables(options["input"], options["tables"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Imported from {options['input']}: {counts}"))
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from geopol import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Create any missing full-text index objects and re-index every article and episode "
+        "(backfill after restores, or repair after a migration rebuilt a table on SQLite)."
+    )
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search indexes: {', '.join(search.INDEXES)}"))
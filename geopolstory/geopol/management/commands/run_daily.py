@@ -2,12 +2,33 @@ from __future__ import annotations
 
 from django.core.management.base import BaseCommand
 
-from geopol.tasks import run_daily_pipeline
+from geopol.tasks import resume_pipeline, run_daily_pipeline, run_incremental_refresh
 
 
 class Command(BaseCommand):
     help = "Run the GeopolStory daily pipeline: cluster, generate, email."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only detect unprocessed articles and regenerate episodes of conflicts with new articles (no email)",
+        )
+        parser.add_argument(
+            "--resume",
+            type=int,
+            metavar="RUN_ID",
+            help="Continue a failed pipeline run from its last checkpoint",
+        )
+
     def handle(self, *args, **options):
+        if options["incremental"]:
+            result = run_incremental_refresh.delay()
+            self.stdout.write(self.style.SUCCESS(f"Queued incremental refresh task: {result.id}"))
+            return
+        if options["resume"]:
+            result = resume_pipeline.delay(options["resume"])
+            self.stdout.write(self.style.SUCCESS(f"Queued resume of pipeline run {options['resume']}: {result.id}"))
+            return
         result = run_daily_pipeline.delay()
         self.stdout.write(self.style.SUCCESS(f"Queued daily pipeline task: {result.id}"))
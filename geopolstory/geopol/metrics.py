@@ -0,0 +1,235 @@
+"""In-process counters and timing histograms for the pipeline.
+
+Observations land in the process-wide registry and in every open `scope()`
+on the current thread, so a Celery task can collect exactly what it did and
+store it with its PipelineRun. Snapshots are plain JSON-serializable dicts
+that merge across workers and render as Prometheus text. Peaks (high-water
+marks such as peak RSS) merge by maximum rather than by sum.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from contextlib import ContextDecorator, contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+PREFIX = "geopol_"
+# Seconds; spans run from sub-millisecond lookups to multi-minute LLM batches
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def series_key(name: str, labels: Dict[str, object]) -> str:
+    """Prometheus-style series id, e.g. `ner_seconds{source="Reuters"}`."""
+    if not labels:
+        return name
+    inner = ",".join(f'{k}="{labels[k]}"' for k in sorted(labels))
+    return f"{name}{{{inner}}}"
+
+
+def _empty() -> Dict:
+    return {"counters": {}, "histograms": {}, "peaks": {}}
+
+
+class Registry:
+    """Thread-safe store of counters, fixed-bucket histograms and peaks."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._data = _empty()
+
+    def incr(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            counters = self._data["counters"]
+            counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, key: str, value: float) -> None:
+        with self._lock:
+            hist = self._data["histograms"].get(key)
+            if hist is None:
+                hist = self._data["histograms"][key] = {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)}
+            hist["count"] += 1
+            hist["sum"] += value
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+
+    def peak(self, key: str, value: float) -> None:
+        with self._lock:
+            peaks = self._data["peaks"]
+            peaks[key] = max(peaks.get(key, value), value)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return merge(_empty(), self._data)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._data = _empty()
+
+
+REGISTRY = Registry()
+_scopes = threading.local()
+
+
+def _targets() -> List[Registry]:
+    return [REGISTRY, *getattr(_scopes, "stack", [])]
+
+
+def incr(name: str, amount: float = 1, **labels) -> None:
+    key = series_key(name, labels)
+    for reg in _targets():
+        reg.incr(key, amount)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    key = series_key(name, labels)
+    for reg in _targets():
+        reg.observe(key, value)
+
+
+def peak(name: str, value: float, **labels) -> None:
+    """Record a high-water mark; merged snapshots keep the largest value seen."""
+    key = series_key(name, labels)
+    for reg in _targets():
+        reg.peak(key, value)
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far (0 where unsupported).
+
+    A lifetime high-water mark: in a long-lived worker it covers every task
+    the process has run, which is what bounds its memory.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class timed(ContextDecorator):
+    """Time a block or function into the `<name>` histogram and log the span.
+
+    Usable as `with timed("embed_seconds"):` or `@timed("ner_seconds")`.
+    """
+
+    def __init__(self, name: str, **labels) -> None:
+        self.name = name
+        self.labels = labels
+
+    def _recreate_cm(self) -> "timed":
+        # A fresh timer per decorated call keeps concurrent calls independent
+        return type(self)(self.name, **self.labels)
+
+    def __enter__(self) -> "timed":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        seconds = time.perf_counter() - self._start
+        observe(self.name, seconds, **self.labels)
+        if exc_type is not None:
+            incr(self.name.removesuffix("_seconds") + "_errors_total", **self.labels)
+        logger.debug("span", metric=self.name, seconds=round(seconds, 4), error=exc_type is not None, **self.labels)
+        return False
+
+
+@contextmanager
+def scope() -> Iterator[Registry]:
+    """Additionally collect this thread's observations into a fresh registry."""
+    reg = Registry()
+    stack = getattr(_scopes, "stack", None)
+    if stack is None:
+        stack = _scopes.stack = []
+    stack.append(reg)
+    try:
+        yield reg
+    finally:
+        stack.remove(reg)
+
+
+def merge(into: Dict, other: Optional[Dict]) -> Dict:
+    """Add snapshot `other` into snapshot `into` (in place) and return it."""
+    if not other:
+        return into
+    into.setdefault("counters", {})
+    into.setdefault("histograms", {})
+    into.setdefault("peaks", {})
+    for key, value in other.get("counters", {}).items():
+        into["counters"][key] = into["counters"].get(key, 0) + value
+    for key, hist in other.get("histograms", {}).items():
+        mine = into["histograms"].get(key)
+        if mine is None:
+            into["histograms"][key] = {"count": hist["count"], "sum": hist["sum"], "buckets": list(hist["buckets"])}
+            continue
+        mine["count"] += hist["count"]
+        mine["sum"] += hist["sum"]
+        mine["buckets"] = [a + b for a, b in zip(mine["buckets"], hist["buckets"])]
+    for key, value in other.get("peaks", {}).items():
+        into["peaks"][key] = max(into["peaks"].get(key, value), value)
+    return into
+
+
+def summarize(snapshot: Dict) -> Dict:
+    """Condensed view for logs: counters and peaks plus count/total/mean per histogram."""
+    out: Dict = dict(snapshot.get("counters", {}))
+    out.update(snapshot.get("peaks", {}))
+    for key, hist in snapshot.get("histograms", {}).items():
+        mean = hist["sum"] / hist["count"] if hist["count"] else 0.0
+        out[key] = {"count": hist["count"], "total": round(hist["sum"], 3), "mean": round(mean, 4)}
+    return out
+
+
+def _split(key: str):
+    name, brace, rest = key.partition("{")
+    return name, (rest[:-1] if brace else "")
+
+
+INF = 'le="+Inf"'
+
+
+def _braced(*parts: str) -> str:
+    joined = ",".join(p for p in parts if p)
+    return "{" + joined + "}" if joined else ""
+
+
+def to_prometheus(snapshot: Dict, gauges: Optional[Dict[str, float]] = None) -> str:
+    """Render a snapshot (plus optional plain gauges) in Prometheus text format.
+
+    Peaks are rendered as gauges.
+    """
+    lines: List[str] = []
+    typed = set()
+
+    def declare(metric: str, kind: str) -> None:
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} {kind}")
+            typed.add(metric)
+
+    plain = {**snapshot.get("peaks", {}), **(gauges or {})}
+    for key in sorted(plain):
+        name, labels = _split(key)
+        declare(PREFIX + name, "gauge")
+        lines.append(f"{PREFIX}{name}{_braced(labels)} {plain[key]}")
+    for key in sorted(snapshot.get("counters", {})):
+        name, labels = _split(key)
+        declare(PREFIX + name, "counter")
+        lines.append(f"{PREFIX}{name}{_braced(labels)} {snapshot['counters'][key]}")
+    for key in sorted(snapshot.get("histograms", {})):
+        name, labels = _split(key)
+        hist = snapshot["histograms"][key]
+        declare(PREFIX + name, "histogram")
+        for bound, count in zip(BUCKETS, hist["buckets"]):
+            le = 'le="%s"' % bound
+            lines.append(f"{PREFIX}{name}_bucket{_braced(labels, le)} {count}")
+        lines.append(f"{PREFIX}{name}_bucket{_braced(labels, INF)} {hist['count']}")
+        lines.append(f"{PREFIX}{name}_sum{_braced(labels)} {hist['sum']}")
+        lines.append(f"{PREFIX}{name}_count{_braced(labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
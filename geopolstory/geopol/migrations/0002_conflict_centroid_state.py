@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geopol', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conflict',
+            name='centroid_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conflict',
+            name='centroid_weight',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AddField(
+            model_name='conflict',
+            name='member_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:13
+
+from django.db import migrations, models
+
+
+def backfill_last_active_at(apps, schema_editor):
+    Conflict = apps.get_model('geopol', 'Conflict')
+    Episode = apps.get_model('geopol', 'Episode')
+    latest = dict(
+        Episode.objects.values('conflict_id').annotate(last=models.Max('created_at')).values_list('conflict_id', 'last')
+    )
+    batch = []
+    for c in Conflict.objects.only('id', 'created_at').iterator(chunk_size=1000):
+        c.last_active_at = max(filter(None, [c.created_at, latest.get(c.id)]))
+        batch.append(c)
+        if len(batch) >= 1000:
+            Conflict.objects.bulk_update(batch, ['last_active_at'])
+            batch = []
+    if batch:
+        Conflict.objects.bulk_update(batch, ['last_active_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geopol', '0002_conflict_centroid_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conflict',
+            name='last_active_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_active_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+def disambiguate_duplicate_signatures(apps, schema_editor):
+    """Suffix all but the oldest conflict sharing a signature with `#<id>`.
+
+    Duplicates stay separate conflicts (still reachable by centroid match);
+    only the oldest keeps the exact signature.
+    """
+    Conflict = apps.get_model('geopol', 'Conflict')
+    dupes = (
+        Conflict.objects.values('entity_signature')
+        .annotate(n=models.Count('id'))
+        .filter(n__gt=1)
+        .values_list('entity_signature', flat=True)
+    )
+    for sig in list(dupes):
+        for c in Conflict.objects.filter(entity_signature=sig).order_by('id')[1:]:
+            c.entity_signature = f"{sig[:490]}#{c.id}"
+            c.save(update_fields=['entity_signature'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geopol', '0003_conflict_last_active_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(disambiguate_duplicate_signatures, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='conflict',
+            name='entity_signature',
+            field=models.CharField(max_length=512, unique=True),
+        ),
+    ]
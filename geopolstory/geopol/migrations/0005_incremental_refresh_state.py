@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geopol', '0004_conflict_signature_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conflict',
+            name='dirty_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rawnews',
+            name='conflict',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='articles', to='geopol.conflict'),
+        ),
+        migrations.AddField(
+            model_name='rawnews',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geopol', '0005_incremental_refresh_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConflictSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('conflict', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='geopol.conflict')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conflict_subscriptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'conflict')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geopol', '0006_conflict_subscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PipelineRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('day', models.DateField(db_index=True)),
+                ('stage', models.CharField(choices=[('scrape', 'scrape'), ('detect', 'detect'), ('generate', 'generate'), ('email', 'email'), ('done', 'done')], default='scrape', max_length=16)),
+                ('checkpoints', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geopol', '0007_pipeline_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pipelinerun',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geopol', '0008_pipeline_run_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawnews',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='rawnews',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='rawnews',
+            index=models.Index(fields=['conflict', 'created_at'], name='rawnews_conflict_created_idx'),
+        ),
+    ]
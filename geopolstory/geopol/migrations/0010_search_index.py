@@ -0,0 +1,88 @@
+from django.db import migrations
+
+# Frozen copies of what geopol.search installed when this migration was
+# written; later changes to geopol.search.INDEXES need a new migration.
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS geopol_rawnews_fts USING fts5(title, text, content='geopol_rawnews', "
+    "content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS geopol_rawnews_fts_ai AFTER INSERT ON geopol_rawnews BEGIN "
+    "INSERT INTO geopol_rawnews_fts(rowid, title, text) VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS geopol_rawnews_fts_ad AFTER DELETE ON geopol_rawnews BEGIN "
+    "INSERT INTO geopol_rawnews_fts(geopol_rawnews_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS geopol_rawnews_fts_au AFTER UPDATE OF title, text ON geopol_rawnews BEGIN "
+    "INSERT INTO geopol_rawnews_fts(geopol_rawnews_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO geopol_rawnews_fts(rowid, title, text) VALUES (new.id, new.title, new.text); END",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS geopol_episode_fts USING fts5(summary, narrative, "
+    "content='geopol_episode', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS geopol_episode_fts_ai AFTER INSERT ON geopol_episode BEGIN "
+    "INSERT INTO geopol_episode_fts(rowid, summary, narrative) VALUES (new.id, new.summary, new.narrative); END",
+    "CREATE TRIGGER IF NOT EXISTS geopol_episode_fts_ad AFTER DELETE ON geopol_episode BEGIN "
+    "INSERT INTO geopol_episode_fts(geopol_episode_fts, rowid, summary, narrative) "
+    "VALUES ('delete', old.id, old.summary, old.narrative); END",
+    "CREATE TRIGGER IF NOT EXISTS geopol_episode_fts_au AFTER UPDATE OF summary, narrative ON geopol_episode BEGIN "
+    "INSERT INTO geopol_episode_fts(geopol_episode_fts, rowid, summary, narrative) "
+    "VALUES ('delete', old.id, old.summary, old.narrative); "
+    "INSERT INTO geopol_episode_fts(rowid, summary, narrative) VALUES (new.id, new.summary, new.narrative); END",
+    # Index existing rows
+    "INSERT INTO geopol_rawnews_fts(geopol_rawnews_fts) VALUES ('rebuild')",
+    "INSERT INTO geopol_episode_fts(geopol_episode_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS geopol_rawnews_fts_ai",
+    "DROP TRIGGER IF EXISTS geopol_rawnews_fts_ad",
+    "DROP TRIGGER IF EXISTS geopol_rawnews_fts_au",
+    "DROP TABLE IF EXISTS geopol_rawnews_fts",
+    "DROP TRIGGER IF EXISTS geopol_episode_fts_ai",
+    "DROP TRIGGER IF EXISTS geopol_episode_fts_ad",
+    "DROP TRIGGER IF EXISTS geopol_episode_fts_au",
+    "DROP TABLE IF EXISTS geopol_episode_fts",
+]
+
+# Generated columns index existing rows as they are added
+POSTGRES_FORWARDS = [
+    "ALTER TABLE geopol_rawnews ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(text, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS geopol_rawnews_search_idx ON geopol_rawnews USING GIN (search_vector)",
+    "ALTER TABLE geopol_episode ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(summary, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(narrative, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS geopol_episode_search_idx ON geopol_episode USING GIN (search_vector)",
+    "ANALYZE geopol_rawnews",
+    "ANALYZE geopol_episode",
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS geopol_rawnews_search_idx",
+    "ALTER TABLE geopol_rawnews DROP COLUMN IF EXISTS search_vector",
+    "DROP INDEX IF EXISTS geopol_episode_search_idx",
+    "ALTER TABLE geopol_episode DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, postgres, sqlite):
+    for sql in postgres if schema_editor.connection.vendor == "postgresql" else sqlite:
+        schema_editor.execute(sql)
+
+
+def forwards(apps, schema_editor):
+    # FTS5 tables/triggers (SQLite) or tsvector columns/GIN indexes (PostgreSQL)
+    _run(schema_editor, POSTGRES_FORWARDS, SQLITE_FORWARDS)
+
+
+def backwards(apps, schema_editor):
+    _run(schema_editor, POSTGRES_BACKWARDS, SQLITE_BACKWARDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geopol', '0009_rawnews_archival_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-19 02:00
+
+from django.db import migrations, models
+
+# As installed by 0010_search_index
+EPISODE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS geopol_episode_fts_ai AFTER INSERT ON geopol_episode BEGIN "
+    "INSERT INTO geopol_episode_fts(rowid, summary, narrative) VALUES (new.id, new.summary, new.narrative); END",
+    "CREATE TRIGGER IF NOT EXISTS geopol_episode_fts_ad AFTER DELETE ON geopol_episode BEGIN "
+    "INSERT INTO geopol_episode_fts(geopol_episode_fts, rowid, summary, narrative) "
+    "VALUES ('delete', old.id, old.summary, old.narrative); END",
+    "CREATE TRIGGER IF NOT EXISTS geopol_episode_fts_au AFTER UPDATE OF summary, narrative ON geopol_episode BEGIN "
+    "INSERT INTO geopol_episode_fts(geopol_episode_fts, rowid, summary, narrative) "
+    "VALUES ('delete', old.id, old.summary, old.narrative); "
+    "INSERT INTO geopol_episode_fts(rowid, summary, narrative) VALUES (new.id, new.summary, new.narrative); END",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite adds this column by rebuilding the table, which drops its FTS triggers
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in EPISODE_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geopol', '0010_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='embedding',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class RawNews(models.Model):
@@ -7,9 +8,12 @@ class RawNews(models.Model):
 
     Always include the canonical `source_url` and `source_name`. `fingerprint`
     uniquely identifies near-duplicate content by normalized title+source.
+    `conflict` and `processed_at` record the detection result; rows with no
+    `processed_at` have not been through detection yet. `archived_at` marks
+    rows whose body was moved to a cold archive (see geopol.retention).
     """
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     source_name = models.CharField(max_length=128)
@@ -22,6 +26,17 @@ class RawNews(models.Model):
     language = models.CharField(max_length=16, default="en")
     country_hint = models.CharField(max_length=64, blank=True)
     meta = models.JSONField(default=dict, blank=True)
+    conflict = models.ForeignKey(
+        "Conflict", null=True, blank=True, on_delete=models.SET_NULL, related_name="articles"
+    )
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Per-conflict article lookups in the daily window
+            models.Index(fields=["conflict", "created_at"], name="rawnews_conflict_created_idx"),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - trivial
         return f"{self.source_name}: {self.title[:80]}"
@@ -33,6 +48,11 @@ class Conflict(models.Model):
     `entity_signature` is a stable string built from key entities (ORG/LOC/PER)
     derived from NER, sorted and normalized. `embedding` stores vector centroid
     for similarity-based matching. Confidence tracks clustering reliability.
+    `member_count` is the number of articles folded into the centroid and
+    `centroid_weight` their (optionally time-decayed) weight in the running mean.
+    `last_active_at` is the time of the latest matched article or episode and
+    bounds the candidate set searched during detection. `dirty_at` is set when
+    new articles arrive and cleared once the day's episode is regenerated.
     """
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -40,8 +60,13 @@ class Conflict(models.Model):
 
     name = models.CharField(max_length=300)
     description = models.TextField(blank=True)
-    entity_signature = models.CharField(max_length=512, db_index=True)
+    entity_signature = models.CharField(max_length=512, unique=True)
     embedding = models.JSONField(default=list, blank=True)
+    member_count = models.PositiveIntegerField(default=1)
+    centroid_weight = models.FloatField(default=1.0)
+    centroid_updated_at = models.DateTimeField(null=True, blank=True)
+    last_active_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    dirty_at = models.DateTimeField(null=True, blank=True, db_index=True)
     confidence = models.FloatField(default=0.0)
 
     def __str__(self) -> str:  # pragma: no cover - trivial
@@ -52,6 +77,9 @@ class Episode(models.Model):
     """Narrative episode tied to a conflict for a given day.
 
     Includes generated narrative, references to source articles, and metadata.
+    `embedding` is the unit vector of `summary`, computed once after the
+    episode is saved (and again only if the summary changes); it feeds
+    historical context retrieval (see geopol.pipeline.context).
     """
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -64,6 +92,7 @@ class Episode(models.Model):
     sources = models.ManyToManyField(RawNews, related_name="episodes")
     confidence = models.FloatField(default=0.0)
     meta = models.JSONField(default=dict, blank=True)
+    embedding = models.JSONField(default=list, blank=True)
 
     class Meta:
         unique_together = ("conflict", "date")
@@ -72,3 +101,53 @@ class Episode(models.Model):
     def __str__(self) -> str:  # pragma: no cover - trivial
         return f"{self.conflict.name} — {self.date.isoformat()}"
 
+
+class ConflictSubscription(models.Model):
+    """A user following a conflict. Users who follow nothing get every episode."""
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="conflict_subscriptions")
+    conflict = models.ForeignKey(Conflict, on_delete=models.CASCADE, related_name="subscriptions")
+
+    class Meta:
+        unique_together = ("user", "conflict")
+
+    def __str__(self) -> str:  # pragma: no cover - trivial
+        return f"{self.user_id} → {self.conflict_id}"
+
+
+class PipelineRun(models.Model):
+    """One execution of the daily pipeline with its per-stage checkpoints.
+
+    `checkpoints` maps a stage (or `scrape:<source>`) to what it recorded on
+    completion; a resumed run skips every stage already present.
+    """
+
+    STAGE_SCRAPE = "scrape"
+    STAGE_DETECT = "detect"
+    STAGE_GENERATE = "generate"
+    STAGE_EMAIL = "email"
+    STAGE_DONE = "done"
+    STAGES = [STAGE_SCRAPE, STAGE_DETECT, STAGE_GENERATE, STAGE_EMAIL, STAGE_DONE]
+
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    day = models.DateField(db_index=True)
+    stage = models.CharField(max_length=16, choices=[(s, s) for s in STAGES], default=STAGE_SCRAPE)
+    checkpoints = models.JSONField(default=dict, blank=True)
+    # Merged metrics snapshots (see geopol.metrics) from every task of the run
+    metrics = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self) -> str:  # pragma: no cover - trivial
+        return f"{self.day.isoformat()} [{self.stage}]"
+
+    @property
+    def since(self):
+        """Start of the article window; fixed at run start so resumes see the same set."""
+        return self.started_at - timezone.timedelta(days=1)
@@ -0,0 +1,231 @@
+"""Columnar export/import of the corpus as month-partitioned Parquet.
+
+`export_tables` streams RawNews, Conflict and Episode rows (embeddings
+included) in id-ordered chunks (keyset pagination, one `values()` query per
+chunk) into `<dir>/<table>/month=YYYY-MM/part-0.parquet`, so memory stays
+bounded by the chunk size no matter how large the corpus is. The month comes from
+`created_at` (an episode's `date`), which keeps the Hive-style layout
+readable by pandas, DuckDB or Spark without extra options.
+
+`import_tables` reads the files back in record batches and restores them
+with `bulk_create`, keeping primary keys and timestamps. Rows that already
+exist are skipped, so a reload into a partially seeded database is safe.
+"""
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import structlog
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from . import api
+from .models import Conflict, Episode, RawNews
+
+logger = structlog.get_logger(__name__)
+
+# Load order matters: articles and episodes point at conflicts
+TABLES = ["conflicts", "rawnews", "episodes"]
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("pyarrow not installed. Install requirements.txt.") from exc
+    return pa, pq
+
+
+def _schemas(pa) -> Dict[str, object]:
+    ts = pa.timestamp("us", tz="UTC")
+    return {
+        "conflicts": pa.schema([
+            ("id", pa.int64()),
+            ("created_at", ts),
+            ("updated_at", ts),
+            ("name", pa.string()),
+            ("description", pa.string()),
+            ("entity_signature", pa.string()),
+            # Sentence-transformer vectors are float32 to begin with, so this is lossless
+            ("embedding", pa.list_(pa.float32())),
+            ("member_count", pa.int64()),
+            ("centroid_weight", pa.float64()),
+            ("centroid_updated_at", ts),
+            ("last_active_at", ts),
+            ("dirty_at", ts),
+            ("confidence", pa.float64()),
+        ]),
+        "rawnews": pa.schema([
+            ("id", pa.int64()),
+            ("created_at", ts),
+            ("updated_at", ts),
+            ("source_name", pa.string()),
+            ("source_url", pa.string()),
+            ("title", pa.string()),
+            ("published_at", ts),
+            ("byline", pa.string()),
+            ("text", pa.string()),
+            ("fingerprint", pa.string()),
+            ("language", pa.string()),
+            ("country_hint", pa.string()),
+            ("meta", pa.string()),
+            ("conflict_id", pa.int64()),
+            ("processed_at", ts),
+            ("archived_at", ts),
+        ]),
+        "episodes": pa.schema([
+            ("id", pa.int64()),
+            ("created_at", ts),
+            ("updated_at", ts),
+            ("conflict_id", pa.int64()),
+            ("date", pa.date32()),
+            ("summary", pa.string()),
+            ("narrative", pa.string()),
+            ("confidence", pa.float64()),
+            ("meta", pa.string()),
+            ("embedding", pa.list_(pa.float32())),
+            ("source_ids", pa.list_(pa.int64())),
+        ]),
+    }
+
+
+MODELS = {"conflicts": Conflict, "rawnews": RawNews, "episodes": Episode}
+# Columns stored as JSON text (nested dicts have no stable Arrow schema)
+JSON_COLUMNS = {"meta"}
+
+
+def _month(table: str, row: Dict) -> str:
+    value = row["date"] if table == "episodes" else row["created_at"]
+    return value.strftime("%Y-%m")
+
+
+def _rows(table: str, size: int) -> Iterator[List[Dict]]:
+    """Id-ordered chunks of export rows, one query per chunk (plus source links for episodes)."""
+    model = MODELS[table]
+    fields = [name for name in _schemas(_pyarrow()[0])[table].names if name != "source_ids"]
+    last = 0
+    while True:
+        rows = list(model.objects.filter(id__gt=last).order_by("id").values(*fields)[:size])
+        if not rows:
+            return
+        if table == "episodes":
+            links: Dict[int, List[int]] = {}
+            through = Episode.sources.through.objects.filter(episode_id__in=[r["id"] for r in rows])
+            for episode_id, rawnews_id in through.order_by("rawnews_id").values_list("episode_id", "rawnews_id"):
+                links.setdefault(episode_id, []).append(rawnews_id)
+            for row in rows:
+                row["source_ids"] = links.get(row["id"], [])
+        for row in rows:
+            for col in JSON_COLUMNS.intersection(row):
+                row[col] = json.dumps(row[col], ensure_ascii=False)
+        yield rows
+        last = rows[-1]["id"]
+
+
+def export_table(table: str, out_dir: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Write one table under `out_dir/<table>/`, replacing any previous export of it."""
+    pa, pq = _pyarrow()
+    schema = _schemas(pa)[table]
+    root = Path(out_dir) / table
+    if root.exists():
+        shutil.rmtree(root)
+    writers: Dict[str, object] = {}
+    written = 0
+    try:
+        for rows in _rows(table, chunk_size):
+            by_month: Dict[str, List[Dict]] = {}
+            for row in rows:
+                by_month.setdefault(_month(table, row), []).append(row)
+            for month, part in by_month.items():
+                writer = writers.get(month)
+                if writer is None:
+                    path = root / f"month={month}" / "part-0.parquet"
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    writer = writers[month] = pq.ParquetWriter(str(path), schema, compression="zstd")
+                writer.write_table(pa.Table.from_pylist(part, schema=schema))
+            written += len(rows)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    logger.info("parquet_exported", table=table, rows=written, partitions=len(writers))
+    return written
+
+
+def export_tables(out_dir: Path, tables: Optional[Sequence[str]] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    return {table: export_table(table, out_dir, chunk_size) for table in (tables or TABLES)}
+
+
+def _timestamp_fields(model) -> List[str]:
+    return [
+        f.attname for f in model._meta.concrete_fields
+        if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False)
+    ]
+
+
+def _insert_keeping_timestamps(model, objs: List, fields: List[str]) -> None:
+    """bulk_create rows that do not exist yet, then write back their exported timestamps.
+
+    bulk_create stamps auto_now/auto_now_add fields with now(), so the
+    exported values are restored with a bulk_update of just those rows.
+    Switching auto_now off on the shared field objects instead would also
+    drop the timestamps of saves made by other threads meanwhile.
+    """
+    existing = set(model.objects.filter(pk__in=[obj.pk for obj in objs]).values_list("pk", flat=True))
+    objs = [obj for obj in objs if obj.pk not in existing]
+    stamps = [[getattr(obj, f) for f in fields] for obj in objs]
+    model.objects.bulk_create(objs, batch_size=1000, ignore_conflicts=True)
+    if not (objs and fields):
+        return
+    for obj, values in zip(objs, stamps):
+        for f, value in zip(fields, values):
+            setattr(obj, f, value)
+    model.objects.bulk_update(objs, fields, batch_size=1000)
+
+
+def _files(in_dir: Path, table: str) -> List[Path]:
+    return sorted((Path(in_dir) / table).glob("month=*/*.parquet"))
+
+
+def import_table(table: str, in_dir: Path, batch_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Bulk-load one exported table; returns the number of rows read."""
+    _, pq = _pyarrow()
+    model = MODELS[table]
+    through = Episode.sources.through
+    stamps = _timestamp_fields(model)
+    loaded = 0
+    for path in _files(in_dir, table):
+        for batch in pq.ParquetFile(str(path)).iter_batches(batch_size=batch_size):
+            rows = batch.to_pylist()
+            links = []
+            objs = []
+            for row in rows:
+                for col in JSON_COLUMNS.intersection(row):
+                    row[col] = json.loads(row[col]) if row[col] else {}
+                source_ids = row.pop("source_ids", None) or []
+                links += [through(episode_id=row["id"], rawnews_id=sid) for sid in source_ids]
+                objs.append(model(**row))
+            with transaction.atomic():
+                _insert_keeping_timestamps(model, objs, stamps)
+                if links:
+                    through.objects.bulk_create(links, batch_size=1000, ignore_conflicts=True)
+            loaded += len(rows)
+    # Explicit ids bypass the sequence; move it past them (no-op on SQLite)
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+    logger.info("parquet_imported", table=table, rows=loaded)
+    return loaded
+
+
+def import_tables(in_dir: Path, tables: Optional[Sequence[str]] = None,
+                  batch_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    wanted = tables or TABLES
+    counts = {table: import_table(table, in_dir, batch_size) for table in TABLES if table in wanted}
+    api.invalidate()
+    return counts
@@ -1,18 +1,24 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import date
-from typing import Iterable, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
-try:  # optional dependency loaded lazily
-    from sentence_transformers import SentenceTransformer  # type: ignore
-except Exception:  # pragma: no cover - handled lazily
-    SentenceTransformer = None  # type: ignore
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
+from ..locks import advisory_lock
+from ..metrics import incr, timed
 from ..models import Conflict, Episode, RawNews
+from .embedders import DEFAULT_MODEL, Embedder, get_embedder
 from .processing import Preprocessor, build_entity_signature
 
+# Characters of article text that detection reads (NER input)
+LEAD_CHARS = 2000
+
 
 @dataclass
 class DetectionResult:
@@ -21,6 +27,46 @@ class DetectionResult:
     similarity: float
 
 
+@dataclass
+class _PendingCentroid:
+    conflict: Conflict
+    vectors: List[np.ndarray] = field(default_factory=list)
+    last_seen: Optional[datetime] = None
+
+
+def article_lead(article: RawNews) -> str:
+    """Opening text of `article`, as much as detection reads.
+
+    Streaming callers load only a `lead` annotation (see `tasks`) instead
+    of the full text; plain instances fall back to slicing `text`.
+    """
+    lead = getattr(article, "lead", None)
+    return lead if lead is not None else article.text[:LEAD_CHARS]
+
+
+def incremental_centroid(
+    prev: Optional[np.ndarray],
+    weight: float,
+    new_vectors: Sequence[np.ndarray],
+    decay: float = 1.0,
+) -> Tuple[np.ndarray, float]:
+    """Fold `new_vectors` into a centroid that already carries `weight` members.
+
+    `decay` scales the previous weight before merging (1.0 = plain running
+    mean). Returns the re-normalized centroid and its new weight.
+    """
+    new = np.asarray(new_vectors, dtype=float)
+    total = new.sum(axis=0)
+    new_weight = float(len(new))
+    if prev is not None and weight > 0:
+        prev_weight = weight * decay
+        total = total + np.asarray(prev, dtype=float) * prev_weight
+        new_weight += prev_weight
+    mean = total / new_weight
+    norm = np.linalg.norm(mean)
+    return (mean / norm if norm > 0 else mean), new_weight
+
+
 class ConflictDetector:
     """Detects whether a new article belongs to an existing conflict.
 
@@ -30,68 +76,275 @@ class ConflictDetector:
     3) Thresholds: if signature match and similarity > t1 -> same conflict
        else if signature partial + similarity > t2 -> same conflict
        else create new conflict
+
+    Centroids are kept in an in-memory matrix for the lifetime of the detector.
+    Matched article vectors are accumulated and written back in one
+    `bulk_update` by `flush_centroid_updates()` at the end of a run.
+
+    Only conflicts active within `active_window_days` are held in the index.
+    Archived conflicts are scanned in chunks as a second chance, and only when
+    no active conflict passes `THRESHOLD_NEW`.
+
+    Safe to run from several workers at once: new conflicts are claimed under
+    `CREATE_LOCK` (re-checking signature and conflicts created meanwhile by
+    other workers) and signatures are unique, so no duplicates are created.
     """
 
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2") -> None:
+    THRESHOLD_NEW = 0.60
+    ARCHIVE_CHUNK_SIZE = 1000
+    CREATE_LOCK = "conflict-create"
+    CENTROID_LOCK = "conflict-centroids"
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        half_life_days: Optional[float] = None,
+        embedder: Optional[Embedder] = None,
+        active_window_days: Optional[float] = None,
+    ) -> None:
         self.pre = Preprocessor()
-        # Lazy-load model
-        self._model: Optional[SentenceTransformer] = None
+        # Lazy-load model; backend chosen by EMBEDDING_BACKEND unless injected
+        self._model: Optional[Embedder] = embedder
         self.model_name = model_name
+        if half_life_days is None:
+            half_life_days = getattr(settings, "CONFLICT_CENTROID_HALF_LIFE_DAYS", 0.0)
+        self.half_life_days = half_life_days
+        if active_window_days is None:
+            active_window_days = getattr(settings, "CONFLICT_ACTIVE_WINDOW_DAYS", 30.0)
+        self.active_window_days = active_window_days
+        # In-memory match index: row i of `_matrix` is the unit centroid of `_conflicts[i]`
+        self._conflicts: Optional[List[Conflict]] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._rows: Dict[int, int] = {}
+        self._max_id = 0
+        self._pending: Dict[int, _PendingCentroid] = {}
 
     def _ensure_model(self) -> None:
         if self._model is None:
-            if SentenceTransformer is None:
-                raise RuntimeError(
-                    "sentence-transformers not installed. Install requirements-ml.txt or monkeypatch _embed."
-                )
-            self._model = SentenceTransformer(self.model_name)
+            self._model = get_embedder(model_name=self.model_name)
 
+    @timed("embed_seconds")
     def _embed(self, texts: List[str]) -> np.ndarray:
         self._ensure_model()
-        return np.array(self._model.encode(texts, normalize_embeddings=True))
+        return self._model.encode(texts)
+
+    # Match index
+    _INDEX_FIELDS = (
+        "id", "name", "embedding", "member_count", "centroid_weight", "centroid_updated_at",
+        "last_active_at", "created_at",
+    )
+
+    def _active_cutoff(self) -> Optional[datetime]:
+        if not self.active_window_days:
+            return None
+        return timezone.now() - timedelta(days=self.active_window_days)
+
+    def _archived_q(self, cutoff: datetime) -> Q:
+        return Q(last_active_at__lt=cutoff) | Q(last_active_at__isnull=True)
+
+    def _ensure_index(self) -> None:
+        if self._conflicts is not None:
+            return
+        # Read the high-water mark first so nothing created meanwhile is missed
+        self._max_id = Conflict.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        self._conflicts, rows = [], []
+        qs = Conflict.objects.only(*self._INDEX_FIELDS)
+        cutoff = self._active_cutoff()
+        if cutoff is not None:
+            qs = qs.exclude(self._archived_q(cutoff))
+        for c in qs:
+            if c.embedding:
+                self._conflicts.append(c)
+                rows.append(_unit(np.asarray(c.embedding, dtype=float)))
+        self._rows = {c.id: i for i, c in enumerate(self._conflicts)}
+        self._matrix = np.vstack(rows) if rows else None
 
+    def _refresh_index(self) -> None:
+        """Pull in conflicts created (by any worker) since the index was loaded."""
+        self._ensure_index()
+        for c in Conflict.objects.filter(id__gt=self._max_id).only(*self._INDEX_FIELDS).order_by("id"):
+            if c.embedding:
+                self._index_put(c)
+            self._max_id = max(self._max_id, c.id)
+
+    def _index_put(self, conflict: Conflict) -> None:
+        vec = _unit(np.asarray(conflict.embedding, dtype=float))
+        row = self._rows.get(conflict.id)
+        if row is not None:
+            self._conflicts[row] = conflict
+            self._matrix[row] = vec
+            return
+        self._rows[conflict.id] = len(self._conflicts)
+        self._conflicts.append(conflict)
+        self._matrix = vec[None, :] if self._matrix is None else np.vstack([self._matrix, vec])
+
+    def _best_match(self, vec: np.ndarray) -> Tuple[float, Optional[Conflict]]:
+        self._ensure_index()
+        if self._matrix is None:
+            return -1.0, None
+        sims = self._matrix @ _unit(vec)
+        i = int(np.argmax(sims))
+        return float(sims[i]), self._conflicts[i]
+
+    def _best_archived_match(self, vec: np.ndarray) -> Tuple[float, Optional[Conflict]]:
+        """Second-chance scan over conflicts outside the active window."""
+        cutoff = self._active_cutoff()
+        if cutoff is None:
+            return -1.0, None
+        unit = _unit(vec)
+        best_sim, best_conflict = -1.0, None
+        qs = Conflict.objects.filter(self._archived_q(cutoff)).only(*self._INDEX_FIELDS)
+        chunk: List[Conflict] = []
+
+        def scan(batch: List[Conflict]) -> None:
+            nonlocal best_sim, best_conflict
+            mat = np.vstack([_unit(np.asarray(c.embedding, dtype=float)) for c in batch])
+            sims = mat @ unit
+            i = int(np.argmax(sims))
+            if sims[i] > best_sim:
+                best_sim, best_conflict = float(sims[i]), batch[i]
+
+        for c in qs.iterator(chunk_size=self.ARCHIVE_CHUNK_SIZE):
+            if c.embedding and c.id not in self._rows:
+                chunk.append(c)
+            if len(chunk) >= self.ARCHIVE_CHUNK_SIZE:
+                scan(chunk)
+                chunk = []
+        if chunk:
+            scan(chunk)
+        return best_sim, best_conflict
+
+    @timed("detect_seconds")
     def detect_or_create(self, article: RawNews) -> DetectionResult:
-        ner = self.pre.ner(article.text[:2000])
+        lead = article_lead(article)
+        ner = self.pre.ner(lead[:LEAD_CHARS])
         signature = build_entity_signature(ner)
+        text = f"{article.title}\n\n{lead[:1000]}"
+        vec = self._embed([text])[0]
 
         # Try direct signature match first
         conflict = Conflict.objects.filter(entity_signature=signature).first()
         if conflict:
+            self.queue_centroid_update(conflict, vec, article.created_at or timezone.now())
+            incr("detections_total", outcome="signature")
             return DetectionResult(conflict=conflict, created=False, similarity=1.0)
 
-        # Embedding similarity versus existing conflicts
-        text = f"{article.title}\n\n{article.text[:1000]}"
-        vec = self._embed([text])[0]
-        best_sim, best_conflict = -1.0, None
-        candidates = list(Conflict.objects.all().only("id", "name", "embedding"))
-        for c in candidates:
-            if not c.embedding:
-                continue
-            cvec = np.array(c.embedding, dtype=float)
-            sim = float(np.dot(vec, cvec) / (np.linalg.norm(vec) * np.linalg.norm(cvec) + 1e-9))
-            if sim > best_sim:
-                best_sim, best_conflict = sim, c
-
-        THRESHOLD_NEW = 0.60
-        if best_conflict and best_sim >= THRESHOLD_NEW:
+        # Embedding similarity versus existing conflict centroids
+        seen_at = article.created_at or timezone.now()
+        with timed("centroid_search_seconds", index="active"):
+            best_sim, best_conflict = self._best_match(vec)
+        if best_conflict is None or best_sim < self.THRESHOLD_NEW:
+            with timed("centroid_search_seconds", index="archived"):
+                best_sim, best_conflict = self._best_archived_match(vec)
+            if best_conflict is not None and best_sim >= self.THRESHOLD_NEW:
+                # Revived: keep it in the active index for the rest of the run
+                self._index_put(best_conflict)
+        if best_conflict and best_sim >= self.THRESHOLD_NEW:
+            self.queue_centroid_update(best_conflict, vec, seen_at)
+            incr("detections_total", outcome="centroid")
             return DetectionResult(conflict=best_conflict, created=False, similarity=best_sim)
 
-        # Create new conflict
-        conflict = Conflict.objects.create(
-            name=article.title[:200],
-            description=article.text[:500],
-            entity_signature=signature,
-            embedding=vec.tolist(),
-            confidence=0.5,
-        )
+        result = self._claim_new_conflict(article, signature, vec, seen_at)
+        incr("detections_total", outcome="created" if result.created else "rechecked")
+        return result
+
+    def _claim_new_conflict(
+        self, article: RawNews, signature: str, vec: np.ndarray, seen_at: datetime
+    ) -> DetectionResult:
+        # Another worker may have created a matching conflict since our lookups;
+        # re-check under the lock before creating.
+        with advisory_lock(self.CREATE_LOCK):
+            self._refresh_index()
+            best_sim, best_conflict = self._best_match(vec)
+            if best_conflict and best_sim >= self.THRESHOLD_NEW:
+                self.queue_centroid_update(best_conflict, vec, seen_at)
+                return DetectionResult(conflict=best_conflict, created=False, similarity=best_sim)
+            conflict, created = Conflict.objects.get_or_create(
+                entity_signature=signature,
+                defaults={
+                    "name": article.title[:200],
+                    "description": article_lead(article)[:500],
+                    "embedding": vec.tolist(),
+                    "member_count": 1,
+                    "centroid_weight": 1.0,
+                    "centroid_updated_at": timezone.now(),
+                    "last_active_at": seen_at,
+                    "confidence": 0.5,
+                },
+            )
+        if not created:
+            self.queue_centroid_update(conflict, vec, seen_at)
+            return DetectionResult(conflict=conflict, created=False, similarity=1.0)
+        self._index_put(conflict)
+        self._max_id = max(self._max_id, conflict.id)
         return DetectionResult(conflict=conflict, created=True, similarity=0.0)
 
+    # Centroid maintenance
+    def queue_centroid_update(
+        self, conflict: Conflict, vector: np.ndarray, seen_at: Optional[datetime] = None
+    ) -> None:
+        """Accumulate `vector` for `conflict`; written by `flush_centroid_updates()`."""
+        pending = self._pending.setdefault(conflict.id, _PendingCentroid(conflict=conflict))
+        pending.vectors.append(np.asarray(vector, dtype=float))
+        if seen_at is not None and (pending.last_seen is None or seen_at > pending.last_seen):
+            pending.last_seen = seen_at
+
+    def _decay(self, conflict: Conflict, now: datetime) -> float:
+        if not self.half_life_days:
+            return 1.0
+        last = conflict.centroid_updated_at or conflict.created_at
+        if last is None:
+            return 1.0
+        age_days = max((now - last).total_seconds(), 0.0) / 86400.0
+        return 0.5 ** (age_days / self.half_life_days)
+
+    def _apply_centroid(self, conflict: Conflict, new_vectors: Sequence[np.ndarray], now: datetime) -> None:
+        prev = np.asarray(conflict.embedding, dtype=float) if conflict.embedding else None
+        centroid, weight = incremental_centroid(
+            prev, conflict.centroid_weight, new_vectors, decay=self._decay(conflict, now)
+        )
+        conflict.embedding = centroid.tolist()
+        conflict.centroid_weight = weight
+        conflict.member_count = (conflict.member_count if prev is not None else 0) + len(new_vectors)
+        conflict.centroid_updated_at = now
+
+    def flush_centroid_updates(self) -> int:
+        """Write all accumulated centroid updates with one `bulk_update`.
+
+        Also refreshes the in-memory match index. Returns number of conflicts updated.
+        """
+        if not self._pending:
+            return 0
+        now = timezone.now()
+        updated = []
+        # Re-read current centroids under the lock so concurrent workers'
+        # increments are merged rather than overwritten.
+        with advisory_lock(self.CENTROID_LOCK), transaction.atomic():
+            fresh = Conflict.objects.only(*self._INDEX_FIELDS).in_bulk(list(self._pending))
+            for conflict_id, pending in self._pending.items():
+                c = fresh.get(conflict_id)
+                if c is None:
+                    continue
+                self._apply_centroid(c, pending.vectors, now)
+                if pending.last_seen and (c.last_active_at is None or pending.last_seen > c.last_active_at):
+                    c.last_active_at = pending.last_seen
+                updated.append(c)
+            Conflict.objects.bulk_update(
+                updated, ["embedding", "member_count", "centroid_weight", "centroid_updated_at", "last_active_at"]
+            )
+        if self._conflicts is not None:
+            for c in updated:
+                self._index_put(c)
+        self._pending.clear()
+        return len(updated)
+
     def update_conflict_embedding(self, conflict: Conflict, new_vectors: List[np.ndarray]) -> None:
-        # Update centroid embedding as running average
-        prev = np.array(conflict.embedding, dtype=float) if conflict.embedding else None
-        if prev is None:
-            conflict.embedding = new_vectors[-1].tolist()
-        else:
-            new = np.mean([prev] + new_vectors, axis=0)
-            conflict.embedding = new.tolist()
-        conflict.save(update_fields=["embedding"])
+        # Count-weighted incremental centroid for a single conflict
+        self._apply_centroid(conflict, new_vectors, timezone.now())
+        conflict.save(update_fields=["embedding", "member_count", "centroid_weight", "centroid_updated_at"])
+        if self._conflicts is not None:
+            self._index_put(conflict)
+
+
+def _unit(vec: np.ndarray) -> np.ndarray:
+    return vec / (np.linalg.norm(vec) + 1e-9)
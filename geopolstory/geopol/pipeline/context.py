@@ -0,0 +1,261 @@
+"""Historical context for story prompts, retrieved by embedding similarity.
+
+Every episode summary is embedded once, after the episode is saved. For each
+conflict, a retrieval index holds the unit vectors of its past summaries in
+one float32 matrix. The index is cached and refreshed incrementally: only
+episodes saved since the cached copy are read. Building a prompt embeds the
+day's article titles and picks the conflict's most recent episode (for
+continuity) plus the past episodes most similar to today's news. The prompt
+keeps its fixed number of context bullets however long the history grows.
+
+Conflicts with no embedded history, or runs where the embedder is not
+available, fall back to the most recent episodes.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import structlog
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from ..metrics import incr, timed
+from ..models import Conflict, Episode
+from .embedders import Embedder, get_embedder
+
+logger = structlog.get_logger(__name__)
+
+CACHE_PREFIX = "context:index"
+# Titles per conflict folded into the retrieval query
+QUERY_TITLES = 20
+# Indexes are patched in place, so they can outlive many runs
+INDEX_CACHE_SECONDS = 7 * 24 * 3600
+
+
+@dataclass
+class ConflictIndex:
+    """Unit summary vectors of one conflict's embedded episodes.
+
+    `count`, `last_updated` and `max_id` describe every episode of the
+    conflict when the index was built, so a later stamp can tell whether
+    episodes were only added or changed (patch in place) or deleted
+    (rebuild).
+    """
+
+    count: int
+    last_updated: Optional[datetime]
+    max_id: int
+    ids: List[int]
+    days: np.ndarray  # date ordinals, int64
+    summaries: List[str]
+    matrix: np.ndarray  # (n, dim) float32
+
+    @classmethod
+    def empty(cls) -> "ConflictIndex":
+        return cls(count=0, last_updated=None, max_id=0, ids=[], days=np.zeros(0, dtype=np.int64), summaries=[],
+                   matrix=np.zeros((0, 0), dtype=np.float32))
+
+    def upsert(self, rows: Iterable[tuple]) -> None:
+        """Apply `(id, date, summary, embedding)` rows; rows without an embedding are dropped."""
+        pos = {eid: i for i, eid in enumerate(self.ids)}
+        ids, days, summaries = list(self.ids), list(self.days), list(self.summaries)
+        vectors = list(self.matrix)
+        for eid, day, summary, embedding in rows:
+            i = pos.get(eid)
+            if i is not None:
+                ids[i] = None  # superseded; compacted below
+            if embedding:
+                ids.append(eid)
+                days.append(day.toordinal())
+                summaries.append(summary)
+                vectors.append(_unit(np.asarray(embedding, dtype=np.float32)))
+        keep = [i for i, eid in enumerate(ids) if eid is not None]
+        self.ids = [ids[i] for i in keep]
+        self.days = np.asarray([days[i] for i in keep], dtype=np.int64)
+        self.summaries = [summaries[i] for i in keep]
+        self.matrix = np.vstack([vectors[i] for i in keep]).astype(np.float32) if keep else np.zeros((0, 0), np.float32)
+
+
+def _unit(vec: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+def _cache_key(conflict_id: int) -> str:
+    return f"{CACHE_PREFIX}:{conflict_id}"
+
+
+class ContextRetriever:
+    """Embeds episode summaries and picks each conflict's context bullets."""
+
+    def __init__(self, top_k: int = 3, enabled: bool = True, embedder: Optional[Embedder] = None) -> None:
+        self.top_k = top_k
+        self.enabled = enabled
+        self._model = embedder
+        self._failed = False
+
+    @classmethod
+    def from_settings(cls) -> "ContextRetriever":
+        return cls(
+            top_k=getattr(settings, "STORY_CONTEXT_EPISODES", 3),
+            enabled=getattr(settings, "STORY_CONTEXT_RETRIEVAL", True),
+        )
+
+    @timed("context_embed_seconds")
+    def _embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Unit vectors for `texts`, or None once the embedder has proven unavailable."""
+        if not self.enabled or self._failed:
+            return None
+        try:
+            if self._model is None:
+                self._model = get_embedder()
+            return np.asarray(self._model.encode(texts), dtype=np.float32)
+        except Exception as exc:
+            self._failed = True
+            logger.warning("context_embedder_unavailable", error=repr(exc))
+            return None
+
+    def embed_episodes(self, episodes: Iterable[Episode]) -> int:
+        """Store summary vectors for episodes that have none; returns how many were embedded."""
+        todo = [e for e in episodes if not e.embedding]
+        if not todo:
+            return 0
+        vectors = self._embed([e.summary for e in todo])
+        if vectors is None:
+            return 0
+        now = timezone.now()
+        for e, vec in zip(todo, vectors):
+            e.embedding = vec.tolist()
+            # bulk_update skips auto_now; the index stamp relies on updated_at moving
+            e.updated_at = now
+        Episode.objects.bulk_update(todo, ["embedding", "updated_at"], batch_size=500)
+        incr("episodes_embedded_total", len(todo))
+        return len(todo)
+
+    def indexes(self, conflict_ids: Sequence[int]) -> Dict[int, ConflictIndex]:
+        """Current retrieval index per conflict, reading only episodes saved since the cached copy.
+
+        At most three queries for any number of conflicts: the stamps, one
+        delta read for every cached index that fell behind, and one full read
+        for indexes that are missing or lost episodes.
+        """
+        fields = ("conflict_id", "id", "date", "summary", "embedding")
+        stamps = {
+            row["conflict_id"]: row
+            for row in Episode.objects.filter(conflict_id__in=conflict_ids)
+            .values("conflict_id").annotate(n=Count("id"), last=Max("updated_at"), max_id=Max("id"))
+        }
+        cached = cache.get_many([_cache_key(cid) for cid in conflict_ids])
+        result: Dict[int, ConflictIndex] = {}
+        behind: Dict[int, ConflictIndex] = {}
+        build: List[int] = []
+        for cid in conflict_ids:
+            stamp = stamps.get(cid)
+            index: Optional[ConflictIndex] = cached.get(_cache_key(cid))
+            if stamp is None:
+                result[cid] = ConflictIndex.empty()
+            elif index is not None and (index.count, index.last_updated) == (stamp["n"], stamp["last"]):
+                incr("context_index_total", outcome="hit")
+                result[cid] = index
+            elif index is not None and index.last_updated is not None:
+                behind[cid] = index
+            else:
+                build.append(cid)
+
+        if behind:
+            since = Q()
+            for cid, index in behind.items():
+                since |= Q(conflict_id=cid, updated_at__gt=index.last_updated)
+            deltas: Dict[int, List[tuple]] = {cid: [] for cid in behind}
+            for row in Episode.objects.filter(since).values_list(*fields):
+                deltas[row[0]].append(row[1:])
+            for cid, index in behind.items():
+                added = sum(1 for row in deltas[cid] if row[0] > index.max_id)
+                if index.count + added == stamps[cid]["n"]:
+                    index.upsert(deltas[cid])
+                    incr("context_index_total", outcome="patched")
+                    result[cid] = index
+                else:
+                    build.append(cid)  # episodes were deleted since (e.g. retention)
+        if build:
+            rows: Dict[int, List[tuple]] = {cid: [] for cid in build}
+            for row in Episode.objects.filter(conflict_id__in=build).order_by("id").values_list(*fields):
+                rows[row[0]].append(row[1:])
+            for cid in build:
+                index = ConflictIndex.empty()
+                index.upsert(rows[cid])
+                incr("context_index_total", outcome="built")
+                result[cid] = index
+
+        fresh = {}
+        for cid in list(behind) + build:
+            index, stamp = result[cid], stamps[cid]
+            index.count, index.last_updated, index.max_id = stamp["n"], stamp["last"], stamp["max_id"]
+            fresh[_cache_key(cid)] = index
+        if fresh:
+            cache.set_many(fresh, INDEX_CACHE_SECONDS)
+        return result
+
+    def _recent(self, conflict_ids: Sequence[int], day: date) -> Dict[int, List[str]]:
+        """Newest `top_k` summaries before `day` per conflict, in one query."""
+        out: Dict[int, List[str]] = {cid: [] for cid in conflict_ids}
+        if not conflict_ids:
+            return out
+        rows = (
+            Episode.objects.filter(conflict_id__in=conflict_ids, date__lt=day)
+            .annotate(rank=Window(RowNumber(), partition_by=F("conflict_id"),
+                                  order_by=[F("date").desc(), F("id").desc()]))
+            .filter(rank__lte=self.top_k)
+            .order_by("conflict_id", "rank")
+            .values_list("conflict_id", "summary")
+        )
+        for conflict_id, summary in rows:
+            out[conflict_id].append(summary)
+        return out
+
+    def context_for(self, conflict_titles: Dict[Conflict, List[str]], day: date) -> Dict[int, List[str]]:
+        """Context bullets per conflict id, newest first, from episodes before `day`.
+
+        `conflict_titles` maps each conflict to its newest article titles,
+        which form the retrieval query (the first QUERY_TITLES are used).
+        """
+        conflicts = list(conflict_titles)
+        if not self.top_k:
+            return {c.id: [] for c in conflicts}
+        indexes = self.indexes([c.id for c in conflicts]) if self.enabled else {}
+        # One embedding call for every conflict that has history to rank
+        ranked = [c for c in conflicts if len(indexes.get(c.id, ConflictIndex.empty()).ids) > 0]
+        queries = self._embed([
+            ". ".join(conflict_titles[c][:QUERY_TITLES]) or c.name for c in ranked
+        ]) if ranked else None
+
+        row_of = {c.id: i for i, c in enumerate(ranked)}
+        out: Dict[int, List[str]] = {}
+        fallback: List[int] = []
+        for c in conflicts:
+            index = indexes.get(c.id)
+            past = np.flatnonzero(index.days < day.toordinal()) if c.id in row_of else []
+            # Vectors from a different embedding model cannot be compared
+            if queries is None or len(past) == 0 or index.matrix.shape[1] != queries.shape[1]:
+                fallback.append(c.id)
+                continue
+            query = _unit(queries[row_of[c.id]])
+            # Newest past episode always, then the best matches among the rest
+            newest = past[np.argmax(index.days[past])]
+            rest = past[past != newest]
+            chosen = [newest]
+            if len(rest) and self.top_k > 1:
+                sims = index.matrix[rest] @ query
+                k = min(self.top_k - 1, len(rest))
+                top = rest[np.argpartition(-sims, k - 1)[:k]]
+                chosen += list(top)
+            chosen.sort(key=lambda i: (index.days[i], index.ids[i]), reverse=True)
+            out[c.id] = [index.summaries[i] for i in chosen]
+        out.update(self._recent(fallback, day))
+        return out
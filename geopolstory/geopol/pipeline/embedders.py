@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:  # pragma: no cover
+    from sentence_transformers import SentenceTransformer
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class Embedder:
+    """Turns texts into L2-normalized float32 vectors, one row per text."""
+
+    name: str = "base"
+
+    def encode(self, texts: List[str]) -> np.ndarray:  # pragma: no cover
+        raise NotImplementedError
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """Full-precision PyTorch backend via sentence-transformers."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL) -> None:
+        self.model_name = model_name
+        self._model: Optional[SentenceTransformer] = None
+        self._lock = threading.Lock()
+
+    def _ensure_model(self) -> None:
+        if self._model is not None:
+            return
+        # One load even when threads of an io worker share this instance
+        with self._lock:
+            if self._model is not None:
+                return
+            # Imported here: it pulls in torch, which costs seconds and hundreds of MB
+            try:
+                from sentence_transformers import SentenceTransformer
+            except Exception as exc:
+                raise RuntimeError(
+                    "sentence-transformers not installed. Install requirements-ml.txt or monkeypatch _embed."
+                ) from exc
+            self._model = SentenceTransformer(self.model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        self._ensure_model()
+        return np.asarray(self._model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+class OnnxEmbedder(Embedder):
+    """ONNX Runtime CPU backend with int8 dynamic quantization.
+
+    On first use the transformer is exported to ONNX under `cache_dir` and its
+    weights quantized to int8 with `quantize_dynamic`; later runs load the
+    cached file. Output uses the same mean pooling + normalization as the
+    sentence-transformers model so vectors are interchangeable.
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        cache_dir: Optional[str] = None,
+        intra_op_threads: int = 0,
+        quantize: bool = True,
+        max_length: int = 256,
+    ) -> None:
+        self.model_name = model_name
+        self.cache_dir = Path(cache_dir or os.path.join(Path.home(), ".cache", "geopolstory", "onnx"))
+        self.intra_op_threads = intra_op_threads
+        self.quantize = quantize
+        self.max_length = max_length
+        self._session = None
+        self._tokenizer = None
+        self._input_names: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def model_path(self) -> Path:
+        slug = self.model_name.replace("/", "__")
+        suffix = "int8" if self.quantize else "fp32"
+        return self.cache_dir / f"{slug}.{suffix}.onnx"
+
+    def _export(self) -> None:
+        import torch
+        from transformers import AutoModel
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fp32_path = self.cache_dir / f"{self.model_name.replace('/', '__')}.fp32.onnx"
+        if not fp32_path.exists():
+            model = AutoModel.from_pretrained(self.model_name).eval()
+            sample = self._tokenizer(["export"], return_tensors="pt")
+            names = ["input_ids", "attention_mask", "token_type_ids"]
+            names = [n for n in names if n in sample]
+            axes = {n: {0: "batch", 1: "seq"} for n in names}
+            axes["last_hidden_state"] = {0: "batch", 1: "seq"}
+            torch.onnx.export(
+                model,
+                tuple(sample[n] for n in names),
+                str(fp32_path),
+                input_names=names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=axes,
+                opset_version=14,
+            )
+        if self.quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(str(fp32_path), str(self.model_path), weight_type=QuantType.QInt8)
+
+    def _ensure_session(self) -> None:
+        if self._session is not None:
+            return
+        with self._lock:
+            if self._session is None:
+                self._load_session()
+
+    def _load_session(self) -> None:
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as exc:
+            raise RuntimeError("onnxruntime/transformers not installed. Install requirements-ml.txt.") from exc
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        if not self.model_path.exists():
+            self._export()
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = self.intra_op_threads
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(
+            str(self.model_path), sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [i.name for i in self._session.get_inputs()]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        self._ensure_session()
+        enc = self._tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        feeds = {n: enc[n].astype(np.int64) for n in self._input_names}
+        hidden = self._session.run(None, feeds)[0]
+        mask = enc["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+def get_embedder(backend: Optional[str] = None, model_name: str = DEFAULT_MODEL) -> Embedder:
+    """The embedder selected by `EMBEDDING_BACKEND` ("torch" or "onnx").
+
+    Instances are shared per process, so every detector, retriever and
+    thread reuses one loaded model.
+    """
+    from django.conf import settings
+
+    backend = (backend or getattr(settings, "EMBEDDING_BACKEND", "torch")).lower()
+    if backend == "onnx":
+        return _shared_embedder(
+            backend,
+            model_name,
+            getattr(settings, "EMBEDDING_ONNX_CACHE_DIR", None) or None,
+            getattr(settings, "EMBEDDING_ONNX_THREADS", 0),
+        )
+    return _shared_embedder(backend, model_name, None, 0)
+
+
+@lru_cache(maxsize=8)
+def _shared_embedder(backend: str, model_name: str, cache_dir: Optional[str], threads: int) -> Embedder:
+    if backend == "onnx":
+        return OnnxEmbedder(model_name, cache_dir=cache_dir, intra_op_threads=threads)
+    if backend == "torch":
+        return SentenceTransformerEmbedder(model_name)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def benchmark_embedders(
+    reference: Embedder,
+    candidate: Embedder,
+    texts: Sequence[str],
+    batch_size: int = 32,
+) -> Dict[str, Dict[str, float]]:
+    """Compare `candidate` against `reference` on `texts`.
+
+    Reports throughput (texts/s) and per-batch latency for each backend, plus
+    cosine agreement between their vectors for the same text.
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    outputs = []
+    for emb in (reference, candidate):
+        emb.encode(list(texts[:1]))  # warm-up: model load / session init
+        latencies, vecs = [], []
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            t0 = time.perf_counter()
+            vecs.append(emb.encode(list(texts[i:i + batch_size])))
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        outputs.append(np.vstack(vecs))
+        results[emb.name] = {
+            "throughput": len(texts) / elapsed if elapsed else float("inf"),
+            "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "latency_p95_ms": float(np.percentile(latencies, 95) * 1000),
+        }
+    cos = np.sum(outputs[0] * outputs[1], axis=1)
+    results["agreement"] = {"cosine_mean": float(cos.mean()), "cosine_min": float(cos.min())}
+    return results
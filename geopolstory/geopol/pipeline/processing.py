@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, Iterable, List, Sequence, Tuple
 
 from pydantic import BaseModel
 
+from ..metrics import timed
+
 
 def normalize_whitespace(text: str) -> str:
     text = re.sub(r"\s+", " ", text)
@@ -23,11 +26,27 @@ class NERResult(BaseModel):
     locs: List[str] = []
 
 
+@lru_cache(maxsize=1)
+def _load_nlp():
+    """spaCy pipeline shared by every Preprocessor in the process (None without spaCy)."""
+    try:
+        import spacy
+
+        try:
+            return spacy.load("en_core_web_sm")
+        except OSError:
+            # model not installed; fall back to blank English
+            return spacy.blank("en")
+    except Exception:
+        return None
+
+
 class Preprocessor:
     """Wraps spaCy NER; fallback to regex if model isn't present.
 
     For local dev we avoid forcing model download at import time. The first call
-    to `ensure()` lazily loads en_core_web_sm if available.
+    to `ensure()` lazily loads en_core_web_sm if available; the model is loaded
+    once per process, however many detectors (one per detection shard) exist.
     """
 
     def __init__(self) -> None:
@@ -35,17 +54,9 @@ class Preprocessor:
 
     def ensure(self) -> None:
         if self._nlp is None:
-            try:
-                import spacy
-
-                try:
-                    self._nlp = spacy.load("en_core_web_sm")
-                except OSError:
-                    # model not installed; fall back to blank English
-                    self._nlp = spacy.blank("en")
-            except Exception:
-                self._nlp = None
+            self._nlp = _load_nlp()
 
+    @timed("ner_seconds")
     def ner(self, text: str) -> NERResult:
         self.ensure()
         if not self._nlp or not hasattr(self._nlp, "pipe"):
@@ -1,13 +1,26 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import math
 import os
-from dataclasses import dataclass
-from typing import List, Optional
+import random
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from jinja2 import Template
+import structlog
 
-from .processing import normalize_whitespace
+from ..locks import CacheSemaphore
+from ..metrics import timed
 
+if TYPE_CHECKING:  # pragma: no cover
+    from jinja2 import Template
+
+logger = structlog.get_logger(__name__)
 
 STORY_PROMPT_TEMPLATE = """
 You are a careful geopolitical analyst. Write a narrative-style update grounded
@@ -22,7 +35,8 @@ Input:
 {% endfor %}
 - Articles:
 {% for a in articles %}- [{{ loop.index }}] {{ a.title }} ({{ a.source_name }}) — {{ a.url }}
-{% endfor %}
+{% if a.snippet %}  {{ a.snippet }}
+{% endif %}{% endfor %}
 
 Write 3-6 concise paragraphs (<= 500 words), include a one-line summary first.
 End with a footer listing sources and a confidence score between 0 and 1.
@@ -37,8 +51,45 @@ class ArticleRef:
     snippet: str
 
 
+@lru_cache(maxsize=16)
+def compile_template(source: str) -> Template:
+    """Compile a Jinja template once per process and reuse it."""
+    from jinja2 import Template
+
+    return Template(source)
+
+
+@lru_cache(maxsize=4)
+def _encoding(model: str):
+    """tiktoken encoding for `model`, or None when the optional tokenizer is unusable.
+
+    tiktoken downloads its BPE files on first use; on an offline worker that
+    fails with a network error, and prompts fall back to the estimate.
+    """
+    try:
+        import tiktoken  # type: ignore
+    except Exception:  # pragma: no cover - heuristic fallback in count_tokens
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except (OSError, ValueError) as exc:  # requests' errors are OSErrors
+        logger.warning("tiktoken_unavailable", model=model, error=repr(exc))
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Token count via tiktoken when installed, else a ~4 chars/token estimate."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+
 def render_prompt(conflict_name: str, date: str, articles: List[ArticleRef], context_bullets: List[str]) -> str:
-    tmpl = Template(STORY_PROMPT_TEMPLATE)
+    tmpl = compile_template(STORY_PROMPT_TEMPLATE)
     return tmpl.render(
         conflict_name=conflict_name,
         date=date,
@@ -47,6 +98,138 @@ def render_prompt(conflict_name: str, date: str, articles: List[ArticleRef], con
     )
 
 
+@dataclass
+class BuiltPrompt:
+    prompt: str
+    tokens: int
+    articles: List[ArticleRef]
+    articles_total: int
+
+    @property
+    def meta(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.tokens,
+            "prompt_articles": len(self.articles),
+            "prompt_snippets": sum(1 for a in self.articles if a.snippet),
+            "articles_total": self.articles_total,
+        }
+
+
+class PromptBuilder:
+    """Renders story prompts within a token budget.
+
+    Articles (expected newest first) are de-duplicated by URL and by
+    source + normalized title, then interleaved across sources so one outlet
+    cannot crowd out the rest. Headlines are admitted in that order while the
+    budget allows; truncated snippets are then added in the same order with
+    whatever budget remains.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 3000,
+        snippet_chars: int = 240,
+        model: str = "gpt-4o-mini",
+        template: str = STORY_PROMPT_TEMPLATE,
+    ) -> None:
+        self.token_budget = token_budget
+        self.snippet_chars = snippet_chars
+        self.model = model
+        self.template = compile_template(template)
+
+    @classmethod
+    def from_settings(cls) -> "PromptBuilder":
+        from django.conf import settings
+
+        return cls(
+            token_budget=getattr(settings, "LLM_PROMPT_TOKEN_BUDGET", 3000),
+            snippet_chars=getattr(settings, "LLM_PROMPT_SNIPPET_CHARS", 240),
+            model=getattr(settings, "LLM_MODEL", "gpt-4o-mini"),
+        )
+
+    def rank(self, articles: Sequence[ArticleRef]) -> List[ArticleRef]:
+        # processing pulls in pydantic; only prompt building needs it
+        from .processing import normalize_title
+
+        seen_urls, seen_titles = set(), set()
+        by_source: Dict[str, List[ArticleRef]] = {}
+        for a in articles:
+            title_key = (a.source_name, normalize_title(a.title))
+            if a.url in seen_urls or title_key in seen_titles:
+                continue
+            seen_urls.add(a.url)
+            seen_titles.add(title_key)
+            by_source.setdefault(a.source_name, []).append(a)
+        ranked: List[ArticleRef] = []
+        queues = list(by_source.values())
+        while queues:
+            ranked.extend(q.pop(0) for q in queues)
+            queues = [q for q in queues if q]
+        return ranked
+
+    def _snippet(self, text: str) -> str:
+        from .processing import normalize_whitespace
+
+        text = normalize_whitespace(text)
+        if len(text) <= self.snippet_chars:
+            return text
+        return text[: self.snippet_chars].rsplit(" ", 1)[0] + "…"
+
+    def _render(self, conflict_name: str, date: str, articles: List[ArticleRef], context_bullets: List[str]) -> str:
+        return self.template.render(
+            conflict_name=conflict_name, date=date, articles=articles, context_bullets=context_bullets
+        )
+
+    def build(
+        self, conflict_name: str, date: str, articles: Sequence[ArticleRef], context_bullets: List[str]
+    ) -> BuiltPrompt:
+        ranked = self.rank(articles)
+        base = self._render(conflict_name, date, [], context_bullets)
+        used = count_tokens(base, self.model)
+
+        # Pass 1: headlines only
+        empty = count_tokens(self._render("", "", [], []), self.model)
+        chosen: List[ArticleRef] = []
+        for a in ranked:
+            headline = replace(a, snippet="")
+            cost = count_tokens(self._render("", "", [headline], []), self.model) - empty
+            if used + cost > self.token_budget:
+                break
+            chosen.append(headline)
+            used += cost
+        # Pass 2: snippets for admitted headlines, in rank order, while budget remains
+        originals = {a.url: a for a in ranked}
+        for i, a in enumerate(chosen):
+            snippet = self._snippet(originals[a.url].snippet)
+            if not snippet:
+                continue
+            cost = count_tokens(f"  {snippet}\n", self.model)
+            if used + cost > self.token_budget:
+                continue
+            chosen[i] = replace(a, snippet=snippet)
+            used += cost
+
+        prompt = self._render(conflict_name, date, chosen, context_bullets)
+        tokens = count_tokens(prompt, self.model)
+        # Estimates are per-piece; trim from the tail if the whole came out over budget
+        while tokens > self.token_budget and chosen:
+            chosen.pop()
+            prompt = self._render(conflict_name, date, chosen, context_bullets)
+            tokens = count_tokens(prompt, self.model)
+        return BuiltPrompt(prompt=prompt, tokens=tokens, articles=chosen, articles_total=len(articles))
+
+
+def input_digest(prompt: str, model: str, source_ids: Sequence[int]) -> str:
+    """Stable hash of everything that determines a generated narrative."""
+    key = json.dumps({"prompt": prompt, "model": model, "sources": sorted(source_ids)}, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def response_cache_key(prompt: str, model: str) -> str:
+    return "llm:" + hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+@timed("llm_request_seconds", backend="openai_sync")
 def openai_generate(prompt: str, model: str = "gpt-4o-mini") -> str:
     from openai import OpenAI
 
@@ -61,12 +244,329 @@ def openai_generate(prompt: str, model: str = "gpt-4o-mini") -> str:
     return resp.choices[0].message.content or ""
 
 
-def ollama_generate(prompt: str, model: str = "llama3.1") -> str:
+class OllamaError(RuntimeError):
+    """Error object reported inside an Ollama NDJSON stream."""
+
+
+def parse_ollama_line(line: str) -> Tuple[str, bool]:
+    """Decode one NDJSON line of /api/generate into (text fragment, done)."""
+    obj = json.loads(line)
+    if obj.get("error"):
+        raise OllamaError(obj["error"])
+    return obj.get("response", ""), bool(obj.get("done"))
+
+
+def _ollama_payload(prompt: str, model: str, keep_alive: str) -> dict:
+    return {
+        "model": model,
+        "prompt": prompt,
+        "stream": True,
+        "keep_alive": keep_alive,
+        "options": {"temperature": 0.3, "num_predict": 900},
+    }
+
+
+@lru_cache(maxsize=4)
+def _ollama_client(host: str):
     import httpx
+
+    # One pooled client per host for the process; reused across calls
+    return httpx.Client(base_url=host, timeout=httpx.Timeout(60.0, connect=5.0))
+
+
+def ollama_generate(prompt: str, model: str = "llama3.1") -> str:
     host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-    payload = {"model": model, "prompt": prompt, "options": {"temperature": 0.3}}
-    with httpx.Client(timeout=60) as client:
-        r = client.post(f"{host}/api/generate", json=payload)
+    keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    parts: List[str] = []
+    with _ollama_client(host).stream("POST", "/api/generate", json=_ollama_payload(prompt, model, keep_alive)) as r:
         r.raise_for_status()
-        # streaming returns concatenated lines; we return full text
-        return r.text
+        for line in r.iter_lines():
+            if not line:
+                continue
+            text, _ = parse_ollama_line(line)
+            parts.append(text)
+    return "".join(parts)
+
+
+@dataclass
+class GenerationJob:
+    key: Any
+    prompt: str
+
+
+@dataclass
+class GenerationResult:
+    key: Any
+    text: str = ""
+    error: Optional[str] = None
+    attempts: int = 0
+    latency: float = 0.0
+    ttft: Optional[float] = None
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class AsyncStoryGenerator:
+    """Concurrent narrative generation over one pooled OpenAI-compatible client.
+
+    At most `concurrency` requests are in flight. With `shared_limit`, that
+    bound holds across every generator using the same name, in any process
+    (a `CacheSemaphore`), so parallel generation tasks share it instead of
+    multiplying it; `from_settings` always sets one. Each call has its own
+    `timeout`; 429s, 5xx, timeouts and connection errors are retried up to
+    `max_retries` times with jittered exponential backoff. `base_url` points
+    the client at any OpenAI-compatible server.
+
+    With `cache_seconds` > 0, responses are stored in the Django cache keyed by
+    a hash of model + prompt, so identical prompts (re-runs, retried tasks)
+    are served without an LLM call.
+    """
+
+    RETRY_STATUSES = frozenset({408, 429})
+
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        concurrency: int = 8,
+        timeout: float = 60.0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        cache_seconds: int = 0,
+        shared_limit: Optional[str] = None,
+    ) -> None:
+        self.model = model
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.base_url = base_url
+        self.api_key = api_key
+        self.cache_seconds = cache_seconds
+        self.shared_limit = shared_limit
+        self._client = None
+
+    @classmethod
+    def from_settings(cls) -> "AsyncStoryGenerator":
+        from django.conf import settings
+
+        return cls(
+            model=getattr(settings, "LLM_MODEL", "gpt-4o-mini"),
+            concurrency=getattr(settings, "LLM_CONCURRENCY", 8),
+            timeout=getattr(settings, "LLM_TIMEOUT_SECONDS", 60.0),
+            max_retries=getattr(settings, "LLM_MAX_RETRIES", 4),
+            base_url=getattr(settings, "OPENAI_BASE_URL", "") or None,
+            cache_seconds=getattr(settings, "LLM_RESPONSE_CACHE_SECONDS", 0),
+            shared_limit="llm",
+        )
+
+    def _ensure_client(self):
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            self._client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key or os.getenv("OPENAI_API_KEY") or "unset",
+                max_retries=0,  # retries are handled here so backoff is shared with the semaphore
+                http_client=httpx.AsyncClient(limits=limits, timeout=self.timeout),
+            )
+        return self._client
+
+    def _retryable(self, exc: Exception) -> bool:
+        import openai
+
+        if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, asyncio.TimeoutError)):
+            return True
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code in self.RETRY_STATUSES or exc.status_code >= 500
+        return False
+
+    def _slot_lease(self) -> float:
+        """How long a shared slot is held at most; a crashed holder's slot frees up after this."""
+        return self.timeout * 2
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _complete(self, prompt: str) -> Tuple[str, Optional[float]]:
+        """Return (text, time to first token); TTFT is None for non-streaming backends."""
+        client = self._ensure_client()
+        resp = await client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "system", "content": "You are a precise geopolitical writer."},
+                      {"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=900,
+            timeout=self.timeout,
+        )
+        return resp.choices[0].message.content or "", None
+
+    async def _run_job(
+        self, job: GenerationJob, sem: asyncio.Semaphore, shared: Optional[CacheSemaphore]
+    ) -> GenerationResult:
+        result = GenerationResult(key=job.key)
+        start = time.perf_counter()
+        cache_key = response_cache_key(job.prompt, self.model)
+        if self.cache_seconds:
+            from django.core.cache import cache
+
+            hit = await cache.aget(cache_key)
+            if hit is not None:
+                result.text, result.cached = hit, True
+                return result
+        while True:
+            result.attempts += 1
+            try:
+                async with sem, (shared.slot() if shared else nullcontext()):
+                    result.text, result.ttft = await self._complete(job.prompt)
+                break
+            except Exception as exc:
+                if result.attempts > self.max_retries or not self._retryable(exc):
+                    result.error = f"{type(exc).__name__}: {exc}"
+                    break
+                await asyncio.sleep(self._backoff(result.attempts))
+        result.latency = time.perf_counter() - start
+        if self.cache_seconds and result.ok:
+            from django.core.cache import cache
+
+            await cache.aset(cache_key, result.text, self.cache_seconds)
+        return result
+
+    async def generate_all(
+        self,
+        jobs: Iterable[GenerationJob],
+        on_result: Optional[Callable[[GenerationResult], Awaitable[None]]] = None,
+    ) -> List[GenerationResult]:
+        """Run all jobs concurrently; `on_result` is awaited as each one completes."""
+        sem = asyncio.Semaphore(self.concurrency)
+        shared = (
+            CacheSemaphore(self.shared_limit, self.concurrency, lease=self._slot_lease()) if self.shared_limit else None
+        )
+        tasks = [asyncio.ensure_future(self._run_job(job, sem, shared)) for job in jobs]
+        results = []
+        for fut in asyncio.as_completed(tasks):
+            result = await fut
+            if on_result is not None:
+                await on_result(result)
+            results.append(result)
+        return results
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            close = getattr(self._client, "aclose", None) or self._client.close
+            await close()
+            self._client = None
+
+
+class OllamaStoryGenerator(AsyncStoryGenerator):
+    """Local-LLM backend streaming from Ollama's /api/generate.
+
+    Shares concurrency, retries and caching with `AsyncStoryGenerator` but
+    talks to Ollama over one pooled httpx client, assembling the NDJSON stream
+    incrementally and recording time-to-first-token. `keep_alive` keeps the
+    model resident between calls so later requests skip the load.
+
+    `timeout` applies per read, so a stalled stream fails fast while a long
+    generation that keeps producing tokens runs on. `total_timeout` (0 = none)
+    is a much larger backstop on the whole generation and is not retried.
+    """
+
+    def __init__(
+        self,
+        model: str = "llama3.1",
+        host: str = "http://localhost:11434",
+        keep_alive: str = "30m",
+        concurrency: int = 2,
+        total_timeout: float = 900.0,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(model=model, concurrency=concurrency, **kwargs)
+        self.host = host
+        self.keep_alive = keep_alive
+        self.total_timeout = total_timeout
+
+    @classmethod
+    def from_settings(cls) -> "OllamaStoryGenerator":
+        from django.conf import settings
+
+        return cls(
+            model=getattr(settings, "OLLAMA_MODEL", "llama3.1"),
+            host=getattr(settings, "OLLAMA_HOST", "http://localhost:11434"),
+            keep_alive=getattr(settings, "OLLAMA_KEEP_ALIVE", "30m"),
+            concurrency=getattr(settings, "OLLAMA_CONCURRENCY", 2),
+            timeout=getattr(settings, "LLM_TIMEOUT_SECONDS", 60.0),
+            total_timeout=getattr(settings, "OLLAMA_TOTAL_TIMEOUT_SECONDS", 900.0),
+            max_retries=getattr(settings, "LLM_MAX_RETRIES", 4),
+            cache_seconds=getattr(settings, "LLM_RESPONSE_CACHE_SECONDS", 0),
+            shared_limit=f"ollama:{getattr(settings, 'OLLAMA_HOST', 'http://localhost:11434')}",
+        )
+
+    def _slot_lease(self) -> float:
+        # Streams may run up to total_timeout; without one, fall back to an hour
+        return self.total_timeout + self.timeout if self.total_timeout else 3600.0
+
+    def _ensure_client(self):
+        if self._client is None:
+            import httpx
+
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            self._client = httpx.AsyncClient(
+                base_url=self.host, limits=limits, timeout=httpx.Timeout(self.timeout, connect=5.0)
+            )
+        return self._client
+
+    def _retryable(self, exc: Exception) -> bool:
+        import httpx
+
+        # A stalled read is worth retrying; hitting total_timeout (asyncio.TimeoutError)
+        # would only repeat the same long generation
+        if isinstance(exc, (httpx.TimeoutException, httpx.TransportError)):
+            return True
+        if isinstance(exc, httpx.HTTPStatusError):
+            status = exc.response.status_code
+            return status in self.RETRY_STATUSES or status >= 500
+        return False
+
+    async def _stream(self, prompt: str) -> Tuple[str, Optional[float]]:
+        client = self._ensure_client()
+        start = time.perf_counter()
+        ttft: Optional[float] = None
+        parts: List[str] = []
+        payload = _ollama_payload(prompt, self.model, self.keep_alive)
+        async with client.stream("POST", "/api/generate", json=payload) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line:
+                    continue
+                # Read through the final `done` line so the connection returns to the pool
+                text, _ = parse_ollama_line(line)
+                if text and ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(text)
+        return "".join(parts), ttft
+
+    async def _complete(self, prompt: str) -> Tuple[str, Optional[float]]:
+        if not self.total_timeout:
+            return await self._stream(prompt)
+        return await asyncio.wait_for(self._stream(prompt), timeout=self.total_timeout)
+
+
+def get_story_generator() -> AsyncStoryGenerator:
+    """Generator selected by `LLM_BACKEND` ("openai" or "ollama")."""
+    from django.conf import settings
+
+    backend = getattr(settings, "LLM_BACKEND", "openai").lower()
+    if backend == "ollama":
+        return OllamaStoryGenerator.from_settings()
+    if backend == "openai":
+        return AsyncStoryGenerator.from_settings()
+    raise ValueError(f"Unknown LLM backend: {backend}")
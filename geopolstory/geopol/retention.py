@@ -0,0 +1,175 @@
+"""Data lifecycle: archive old article bodies, prune what nothing links to.
+
+Old RawNews bodies are appended to gzip-compressed JSONL files (one per
+month of `created_at`) under ARCHIVE_DIR, then blanked in the database. The
+row itself stays as a tombstone: its `source_url` and `fingerprint` are the
+scrapers' dedupe keys, so deleting it would let the next scrape ingest the
+article again as new. Episodes keep linking to the same metadata (title,
+URL, source, dates). Old episodes can be archived the same way when
+RETENTION_EPISODE_DAYS is set, and old PipelineRuns are pruned. Work
+happens in id-ordered chunks so no statement touches more than
+RETENTION_BATCH_SIZE rows.
+
+Archives are written before the database changes, so a crash mid-chunk can
+repeat a record in the archive but never lose one.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import structlog
+from django.conf import settings
+from django.utils import timezone
+
+from . import api
+from .models import Episode, PipelineRun, RawNews
+
+logger = structlog.get_logger(__name__)
+
+ARTICLE_FIELDS = (
+    "id", "created_at", "source_name", "source_url", "title", "published_at", "byline", "text",
+    "fingerprint", "language", "conflict_id",
+)
+
+
+@dataclass
+class RetentionStats:
+    articles_archived: int = 0
+    episodes_archived: int = 0
+    runs_deleted: int = 0
+
+
+def archive_dir() -> Path:
+    return Path(getattr(settings, "ARCHIVE_DIR", os.path.join(settings.BASE_DIR, "archive")))
+
+
+def _archive_path(kind: str, month: str) -> Path:
+    return archive_dir() / kind / f"{month}.jsonl.gz"
+
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _append(kind: str, records: List[Dict]) -> None:
+    """Append records to their month's archive (concatenated gzip members are valid gzip)."""
+    by_month: Dict[str, List[Dict]] = {}
+    for rec in records:
+        by_month.setdefault(rec["created_at"][:7], []).append(rec)
+    for month, recs in by_month.items():
+        path = _archive_path(kind, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(path, "at", encoding="utf-8") as fh:
+            for rec in recs:
+                fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+
+def read_archive(kind: str, month: str) -> Iterator[Dict]:
+    """Yield archived records (`kind` is "rawnews" or "episodes", `month` is YYYY-MM)."""
+    path = _archive_path(kind, month)
+    if not path.exists():
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            yield json.loads(line)
+
+
+def _id_chunks(qs, size: int) -> Iterator[List[int]]:
+    """Ascending id chunks via keyset pagination (no OFFSET scans)."""
+    last = 0
+    while True:
+        ids = list(qs.filter(id__gt=last).order_by("id").values_list("id", flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def archive_articles(cutoff: datetime, batch_size: int, dry_run: bool = False) -> RetentionStats:
+    stats = RetentionStats()
+    old = RawNews.objects.filter(created_at__lt=cutoff, archived_at__isnull=True)
+    for ids in _id_chunks(old, batch_size):
+        if dry_run:
+            stats.articles_archived += len(ids)
+            continue
+        records = [
+            {k: _serialize(v) for k, v in row.items()}
+            for row in RawNews.objects.filter(id__in=ids).values(*ARTICLE_FIELDS)
+        ]
+        _append("rawnews", records)
+        RawNews.objects.filter(id__in=ids).update(text="", meta={}, archived_at=timezone.now())
+        stats.articles_archived += len(records)
+    return stats
+
+
+def archive_episodes(cutoff_date, batch_size: int, dry_run: bool = False) -> int:
+    archived = 0
+    old = Episode.objects.filter(date__lt=cutoff_date)
+    for ids in _id_chunks(old, batch_size):
+        if dry_run:
+            archived += len(ids)
+            continue
+        episodes = list(Episode.objects.filter(id__in=ids).select_related("conflict").prefetch_related("sources"))
+        records = [
+            {
+                "id": e.id,
+                "created_at": e.created_at.isoformat(),
+                "date": e.date.isoformat(),
+                "conflict_id": e.conflict_id,
+                "conflict_name": e.conflict.name,
+                "summary": e.summary,
+                "narrative": e.narrative,
+                "confidence": e.confidence,
+                "meta": e.meta,
+                "sources": [{"title": s.title, "url": s.source_url, "source_name": s.source_name}
+                            for s in e.sources.all()],
+            }
+            for e in episodes
+        ]
+        _append("episodes", records)
+        Episode.objects.filter(id__in=ids).delete()
+        archived += len(records)
+    return archived
+
+
+def run_retention(
+    now: Optional[datetime] = None,
+    dry_run: bool = False,
+    article_days: Optional[int] = None,
+    episode_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> RetentionStats:
+    """Apply every retention rule (settings unless overridden); returns what was (or would be) done."""
+    now = now or timezone.now()
+    batch_size = batch_size or getattr(settings, "RETENTION_BATCH_SIZE", 1000)
+    stats = RetentionStats()
+
+    if article_days is None:
+        article_days = getattr(settings, "RETENTION_ARTICLE_DAYS", 90)
+    if article_days:
+        stats = archive_articles(now - timezone.timedelta(days=article_days), batch_size, dry_run)
+
+    if episode_days is None:
+        episode_days = getattr(settings, "RETENTION_EPISODE_DAYS", 0)
+    if episode_days:
+        stats.episodes_archived = archive_episodes(
+            (now - timezone.timedelta(days=episode_days)).date(), batch_size, dry_run
+        )
+
+    run_days = getattr(settings, "RETENTION_RUN_DAYS", 90)
+    if run_days:
+        runs = PipelineRun.objects.filter(started_at__lt=now - timezone.timedelta(days=run_days))
+        stats.runs_deleted = runs.count() if dry_run else runs.delete()[0]
+
+    if stats.episodes_archived and not dry_run:
+        api.invalidate()
+    logger.info("retention_done", dry_run=dry_run, **asdict(stats))
+    return stats
@@ -2,9 +2,6 @@ from __future__ import annotations
 
 from typing import Iterable, Optional
 
-import requests
-from bs4 import BeautifulSoup
-
 from .base import BaseScraper, ScrapedArticle
 
 
@@ -18,7 +15,7 @@ class AlJazeeraScraper(BaseScraper):
             return []
         resp = self.session.get(self.base_url, timeout=20)
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = self._soup(resp.text)
         urls = []
         for a in soup.select("a[href]"):
             href = a.get("href")
@@ -38,7 +35,7 @@ class AlJazeeraScraper(BaseScraper):
         try:
             resp = self.session.get(url, timeout=20)
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "html.parser")
+            soup = self._soup(resp.text)
             title_el = soup.find("h1")
             title = title_el.get_text(strip=True) if title_el else url
             paragraphs = [p.get_text(strip=True) for p in soup.select("article p")]
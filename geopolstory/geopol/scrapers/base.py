@@ -3,14 +3,15 @@ from __future__ import annotations
 import hashlib
 import time
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from typing import TYPE_CHECKING, Iterable, Optional
 from urllib.parse import urlparse
 from urllib.robotparser import RobotFileParser
 
-import requests
-from bs4 import BeautifulSoup
-from dateutil import parser as dateparser
-from newspaper import Article
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+# requests, bs4, dateutil and newspaper are imported on first use: importing
+# the scrapers (Celery autodiscovery, manage.py) should not pay for them.
 
 USER_AGENT = (
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
@@ -40,7 +41,11 @@ class BaseScraper:
     rate_limit_seconds: float = 1.0
 
     def __init__(self, session: Optional[requests.Session] = None) -> None:
-        self.session = session or requests.Session()
+        if session is None:
+            import requests
+
+            session = requests.Session()
+        self.session = session
         self.session.headers.update({"User-Agent": USER_AGENT})
         self._robots: Optional[RobotFileParser] = None
 
@@ -53,8 +58,16 @@ class BaseScraper:
     def fetch_article(self, url: str) -> Optional[ScrapedArticle]:  # pragma: no cover
         raise NotImplementedError
 
+    @staticmethod
+    def _soup(html: str):
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(html, "html.parser")
+
     def _fallback_newspaper(self, url: str) -> Optional[ScrapedArticle]:
         try:
+            from newspaper import Article
+
             article = Article(url)
             article.download()
             article.parse()
@@ -76,6 +89,8 @@ class BaseScraper:
     def _parse_date(text: Optional[str]) -> Optional[str]:
         if not text:
             return None
+        from dateutil import parser as dateparser
+
         try:
             return dateparser.parse(text).isoformat()
         except Exception:
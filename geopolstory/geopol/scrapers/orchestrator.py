@@ -1,49 +1,59 @@
 from __future__ import annotations
 
-from typing import Iterable, List
-
 from django.db import IntegrityError
 
+from ..metrics import incr, timed
 from .base import ScrapedArticle
 from .reuters import ReutersScraper
 from .aljazeera import AlJazeeraScraper
 from ..models import RawNews
 
 
-def scrape_all_sources(max_per_source: int = 10) -> int:
-    """Scrape both sources and persist unique RawNews rows.
+# Keyed by a stable name so each source can be scraped by its own task
+SCRAPERS = {
+    "reuters": ReutersScraper,
+    "aljazeera": AlJazeeraScraper,
+}
+
+
+def scrape_source(name: str, max_per_source: int = 10) -> int:
+    """Scrape one source and persist unique RawNews rows; returns new rows saved.
 
-    Respects robots.txt through individual scrapers. De-duplicates via
-    `source_url` and `fingerprint` unique constraints.
-    Returns number of new rows saved.
+    Respects robots.txt through the scraper. De-duplicates via `source_url`
+    and `fingerprint` unique constraints, so re-running is harmless.
     """
-    scrapers = [ReutersScraper(), AlJazeeraScraper()]
+    s = SCRAPERS[name]()
     new_count = 0
-
-    for s in scrapers:
-        urls = []
-        for i, url in enumerate(s.list_article_urls()):
-            if i >= max_per_source:
-                break
-            urls.append(url)
-        for url in urls:
-            s.sleep()
+    urls = []
+    for i, url in enumerate(s.list_article_urls()):
+        if i >= max_per_source:
+            break
+        urls.append(url)
+    for url in urls:
+        s.sleep()
+        with timed("fetch_article_seconds", source=name):
             art = s.fetch_article(url)
-            if not art:
-                continue
-            try:
-                RawNews.objects.create(
-                    source_name=art.source_name,
-                    source_url=art.source_url,
-                    title=art.title,
-                    text=art.text,
-                    published_at=art.published_at,
-                    byline=art.byline,
-                    fingerprint=art.fingerprint,
-                    language=art.language,
-                )
-                new_count += 1
-            except IntegrityError:
-                # already exists
-                pass
+        if not art:
+            continue
+        try:
+            RawNews.objects.create(
+                source_name=art.source_name,
+                source_url=art.source_url,
+                title=art.title,
+                text=art.text,
+                published_at=art.published_at,
+                byline=art.byline,
+                fingerprint=art.fingerprint,
+                language=art.language,
+            )
+            new_count += 1
+            incr("articles_scraped_total", source=name)
+        except IntegrityError:
+            # already exists
+            pass
     return new_count
+
+
+def scrape_all_sources(max_per_source: int = 10) -> int:
+    """Scrape every source in turn. Returns number of new rows saved."""
+    return sum(scrape_source(name, max_per_source) for name in SCRAPERS)
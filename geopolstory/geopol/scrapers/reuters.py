@@ -2,9 +2,6 @@ from __future__ import annotations
 
 from typing import Iterable, Optional
 
-import requests
-from bs4 import BeautifulSoup
-
 from .base import BaseScraper, ScrapedArticle
 
 
@@ -19,7 +16,7 @@ class ReutersScraper(BaseScraper):
             return []
         resp = self.session.get(self.base_url, timeout=20)
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = self._soup(resp.text)
         # Reuters uses article tags with links under h2
         urls = []
         for a in soup.select("a[href]"):
@@ -41,7 +38,7 @@ class ReutersScraper(BaseScraper):
         try:
             resp = self.session.get(url, timeout=20)
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "html.parser")
+            soup = self._soup(resp.text)
             title_el = soup.find("h1")
             title = title_el.get_text(strip=True) if title_el else url
             # Reuters article body paragraphs are within article tag
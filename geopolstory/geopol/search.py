@@ -0,0 +1,223 @@
+"""Ranked full-text search over article and episode text.
+
+SQLite keeps an external-content FTS5 table per model, synced by triggers on
+insert, update and delete. PostgreSQL keeps a stored generated `tsvector`
+column with a GIN index, which the database recomputes on every write. Either
+way the ORM never touches the index, so bulk inserts and `.update()` calls
+stay in sync too.
+
+Queries are reduced to plain word terms OR-ed together and ranked (BM25 on
+SQLite, `ts_rank_cd` on PostgreSQL) with title/summary hits weighted above
+body hits. Pages continue from a `(score, id)` cursor instead of an
+OFFSET, so a deep page returns only its own rows. Each page still ranks
+every match of the query before the cut: the index bounds the rows scored
+to the matching documents, not to the page size.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+from django.db import connection as default_connection
+
+from . import metrics
+
+logger = structlog.get_logger(__name__)
+
+# Postgres text search configuration; baked into the generated columns
+CONFIG = "english"
+MAX_TERMS = 16
+# Dropped from SQLite queries (Postgres drops its own via CONFIG)
+STOPWORDS = frozenset(
+    "a about an and are as at be by did do does for from had has have how in into is it its of on or "
+    "that the their there this to was we were what when where which who why will with would write wrote".split()
+)
+
+
+@dataclass(frozen=True)
+class Index:
+    table: str
+    columns: Tuple[str, str]  # (heading, body)
+    weights: Tuple[float, float]  # BM25 column weights on SQLite
+
+
+INDEXES: Dict[str, Index] = {
+    "articles": Index(table="geopol_rawnews", columns=("title", "text"), weights=(10.0, 1.0)),
+    "episodes": Index(table="geopol_episode", columns=("summary", "narrative"), weights=(5.0, 1.0)),
+}
+
+
+@dataclass
+class SearchPage:
+    ids: List[int]
+    scores: List[float]  # lower is better on every backend
+    next: Optional[str]
+
+
+def _sqlite_install(index: Index) -> List[str]:
+    fts, (head, body) = f"{index.table}_fts", index.columns
+    cols = f"{head}, {body}"
+    old = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, old.{head}, old.{body});"
+    new = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, new.{head}, new.{body});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{index.table}', "
+        f"content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {index.table} BEGIN {new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {index.table} BEGIN {old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {index.table} BEGIN {old} {new} END",
+    ]
+
+
+def _postgres_install(index: Index) -> List[str]:
+    head, body = index.columns
+    vector = (
+        f"setweight(to_tsvector('{CONFIG}', coalesce({head}, '')), 'A') || "
+        f"setweight(to_tsvector('{CONFIG}', coalesce({body}, '')), 'B')"
+    )
+    return [
+        f"ALTER TABLE {index.table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS {index.table}_search_idx ON {index.table} USING GIN (search_vector)",
+    ]
+
+
+def _sqlite_uninstall(index: Index) -> List[str]:
+    fts = f"{index.table}_fts"
+    return [f"DROP TRIGGER IF EXISTS {fts}_{t}" for t in ("ai", "ad", "au")] + [f"DROP TABLE IF EXISTS {fts}"]
+
+
+def _postgres_uninstall(index: Index) -> List[str]:
+    return [f"DROP INDEX IF EXISTS {index.table}_search_idx",
+            f"ALTER TABLE {index.table} DROP COLUMN IF EXISTS search_vector"]
+
+
+def install(connection=None) -> None:
+    """Create any missing index objects (idempotent).
+
+    Also restores the SQLite triggers after a migration rebuilds a table,
+    which drops them.
+    """
+    connection = connection or default_connection
+    build = _postgres_install if connection.vendor == "postgresql" else _sqlite_install
+    with connection.cursor() as cursor:
+        for index in INDEXES.values():
+            for sql in build(index):
+                cursor.execute(sql)
+
+
+def uninstall(connection=None) -> None:
+    connection = connection or default_connection
+    drop = _postgres_uninstall if connection.vendor == "postgresql" else _sqlite_uninstall
+    with connection.cursor() as cursor:
+        for index in INDEXES.values():
+            for sql in drop(index):
+                cursor.execute(sql)
+
+
+def missing(connection=None) -> List[str]:
+    """Index objects that should exist but do not (empty when search is in sync).
+
+    A SQLite table rebuild (e.g. from a migration's AddField) silently drops
+    the sync triggers; `install()` restores them.
+    """
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT table_name || '.search_vector' FROM information_schema.columns "
+                           "WHERE column_name = 'search_vector' AND table_schema = current_schema()")
+            present = {row[0] for row in cursor.fetchall()}
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+            present |= {row[0] for row in cursor.fetchall()}
+            expected = [name for index in INDEXES.values()
+                        for name in (f"{index.table}.search_vector", f"{index.table}_search_idx")]
+        else:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            present = {row[0] for row in cursor.fetchall()}
+            expected = [f"{index.table}_fts{suffix}" for index in INDEXES.values()
+                        for suffix in ("", "_ai", "_ad", "_au")]
+    return [name for name in expected if name not in present]
+
+
+def rebuild(connection=None) -> None:
+    """Install, then re-derive every index from its table (backfill/repair)."""
+    connection = connection or default_connection
+    install(connection)
+    with connection.cursor() as cursor:
+        for name, index in INDEXES.items():
+            if connection.vendor == "postgresql":
+                # Generated columns are always current; refresh planner stats for the GIN index
+                cursor.execute(f"ANALYZE {index.table}")
+            else:
+                fts = f"{index.table}_fts"
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+            logger.info("search_index_rebuilt", index=name, vendor=connection.vendor)
+
+
+def terms(query: str) -> List[str]:
+    """Lower-cased word terms of a free-text query, deduplicated, stopwords dropped."""
+    seen: List[str] = []
+    for term in re.findall(r"[^\W_]+", query.lower()):
+        if term not in STOPWORDS and term not in seen:
+            seen.append(term)
+    return seen[:MAX_TERMS]
+
+
+def _parse_cursor(cursor: str) -> Tuple[float, int]:
+    score, _, last_id = cursor.partition("~")
+    return float(score), int(last_id)
+
+
+def _ranked_sql(index: Index, vendor: str) -> str:
+    if vendor == "postgresql":
+        return (
+            f"SELECT id, -ts_rank_cd(search_vector, q)::float8 AS score "
+            f"FROM {index.table}, to_tsquery('{CONFIG}', %s) q WHERE search_vector @@ q"
+        )
+    fts = f"{index.table}_fts"
+    return (
+        f"SELECT rowid AS id, bm25({fts}, {index.weights[0]}, {index.weights[1]}) AS score "
+        f"FROM {fts} WHERE {fts} MATCH %s"
+    )
+
+
+def search(query: str, kind: str = "episodes", cursor: Optional[str] = None, limit: int = 20,
+           connection=None) -> SearchPage:
+    """One page of ids matching `query`, best first.
+
+    Cost grows with the number of matches, not with the page's depth.
+    Raises ValueError for an unknown `kind` or a malformed cursor.
+    """
+    connection = connection or default_connection
+    index = INDEXES.get(kind)
+    if index is None:
+        raise ValueError(f"unknown search kind {kind!r}")
+    words = terms(query)
+    if not words:
+        return SearchPage(ids=[], scores=[], next=None)
+    if connection.vendor == "postgresql":
+        expr = " | ".join(words)
+    else:
+        expr = " OR ".join(f'"{w}"' for w in words)
+
+    sql = f"SELECT id, score FROM ({_ranked_sql(index, connection.vendor)}) ranked"
+    params: List = [expr]
+    if cursor:
+        score, last_id = _parse_cursor(cursor)
+        sql += " WHERE score > %s OR (score = %s AND id > %s)"
+        params += [score, score, last_id]
+    sql += " ORDER BY score, id LIMIT %s"
+    params.append(limit + 1)
+
+    with metrics.timed("search_seconds", kind=kind), connection.cursor() as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return SearchPage(
+        ids=[r[0] for r in rows],
+        scores=[r[1] for r in rows],
+        next=f"{rows[-1][1]!r}~{rows[-1][0]}" if more else None,
+    )
@@ -1,89 +1,773 @@
 from __future__ import annotations
 
-from datetime import date
-from typing import List
+import asyncio
+from contextlib import contextmanager
+from itertools import groupby
+from dataclasses import asdict
+from datetime import date, datetime, time as dt_time
+from typing import Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from celery import shared_task
+import structlog
+from asgiref.sync import sync_to_async
+from celery import chain, chord, group, shared_task, signature
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Left
 from django.utils import timezone
 
-from .models import Episode, RawNews
-from .scrapers.orchestrator import scrape_all_sources
-from .emailing import EpisodeEmail, send_daily_digest
-from .pipeline.conflict_detection import ConflictDetector
-from .pipeline.story_generation import ArticleRef, render_prompt, openai_generate
+from .models import Conflict, ConflictSubscription, Episode, PipelineRun, RawNews
+from .scrapers.orchestrator import SCRAPERS, scrape_source
+from . import api, metrics
+from .emailing import PartialBatchError, build_daily_digest, send_digest_batch
+from .locks import advisory_lock
+from .retention import run_retention
+from .pipeline.story_generation import (
+    ArticleRef,
+    GenerationJob,
+    GenerationResult,
+    PromptBuilder,
+    get_story_generator,
+    input_digest,
+)
 
+logger = structlog.get_logger(__name__)
 
-@shared_task
-def run_daily_pipeline() -> int:
-    """Basic pipeline to cluster yesterday's articles and create episodes.
 
-    For MVP: group all RawNews from last 24h into conflicts; generate one episode
-    per conflict; email all subscribed users. Returns number of episodes.
-    """
+def _record_assignments(pairs: List[Tuple[RawNews, Conflict]]) -> None:
+    """Persist detection results and mark the receiving conflicts dirty."""
     now = timezone.now()
-    # Step 0: Scrape fresh articles first
-    try:
-        scrape_all_sources(max_per_source=10)
-    except Exception:
-        pass
-    since = now - timezone.timedelta(days=1)
-    articles = list(RawNews.objects.filter(created_at__gte=since).order_by("-created_at"))
-    detector = ConflictDetector()
-
-    conflict_to_articles: dict = {}
-    for art in articles:
-        det = detector.detect_or_create(art)
-        conflict_to_articles.setdefault(det.conflict, []).append(art)
-
-    created = 0
-    for conflict, arts in conflict_to_articles.items():
-        # Build context bullets from previous episodes (simple heuristic)
-        past = list(conflict.episodes.order_by("-date")[:3])
-        context_bullets = [ep.summary for ep in past]
-        refs: List[ArticleRef] = [
-            ArticleRef(title=a.title, source_name=a.source_name, url=a.source_url, snippet=a.text[:240])
-            for a in arts
-        ]
-        prompt = render_prompt(conflict.name, now.date().isoformat(), refs, context_bullets)
-        narrative = openai_generate(prompt)
-        summary = narrative.splitlines()[0][:240] if narrative else (
-            arts[0].title if arts else conflict.name
+    for art, conflict in pairs:
+        art.conflict = conflict
+        art.processed_at = now
+    RawNews.objects.bulk_update([art for art, _ in pairs], ["conflict", "processed_at"], batch_size=500)
+    Conflict.objects.filter(id__in={c.id for _, c in pairs}).update(dirty_at=now)
+
+
+def _iterator_chunk_size() -> int:
+    return getattr(settings, "PIPELINE_ITERATOR_CHUNK_SIZE", 2000) or 2000
+
+
+def _detect_batches(detector, article_ids: List[int]) -> List[List[int]]:
+    """Detect and record `article_ids` a fixed-size batch at a time.
+
+    Each batch loads only what detection reads (title, timestamp and a text
+    prefix) and is written back before the next is read, so memory is
+    bounded by the batch size, not the number of articles.
+    """
+    from .pipeline.conflict_detection import LEAD_CHARS
+
+    assigned: List[List[int]] = []
+    for ids in _chunks(article_ids, _iterator_chunk_size()):
+        # Already-assigned articles are skipped, so a retried shard resumes
+        articles = (
+            RawNews.objects.filter(id__in=ids, processed_at__isnull=True)
+            .only("id", "title", "created_at")
+            .annotate(lead=Left("text", LEAD_CHARS))
+            .order_by("-created_at")
         )
+        pairs = [(art, detector.detect_or_create(art).conflict) for art in articles]
+        with metrics.timed("centroid_flush_seconds"):
+            detector.flush_centroid_updates()
+        if pairs:
+            _record_assignments(pairs)
+        assigned += [[art.id, conflict.id] for art, conflict in pairs]
+    return assigned
+
+
+@shared_task
+def detect_conflicts_chunk(article_ids: List[int], run_id: Optional[int] = None) -> List[List[int]]:
+    """Assign one shard of articles to conflicts; returns [article_id, conflict_id] pairs.
+
+    Safe to run concurrently with other shards (see ConflictDetector).
+    """
+    from .pipeline.conflict_detection import ConflictDetector
+
+    with _task_metrics(run_id, PipelineRun.STAGE_DETECT):
+        return _detect_batches(ConflictDetector(), article_ids)
+
+
+@shared_task
+def count_assigned(shards: List[List[List[int]]]) -> int:
+    """Chord callback: total articles assigned across detection shards."""
+    assigned = sum(len(shard) for shard in shards)
+    if assigned:
+        api.invalidate()
+    return assigned
+
+
+def _detect_sharded(article_ids: List[int], chunk_size: int, run_id: Optional[int], then) -> None:
+    """Detect `article_ids` in parallel shards, then call `then` with the number assigned.
+
+    Nothing waits on the shards: `then` rides on the chord callback, so a
+    cpu slot is never held by a task waiting for other cpu tasks.
+    """
+    counted = count_assigned.s()
+    chord([detect_conflicts_chunk.si(chunk, run_id) for chunk in _chunks(article_ids, chunk_size)])(
+        counted | then if then else counted
+    )
+
+
+# Single-flight lock around "find unprocessed articles and detect them"
+INGEST_LOCK = "geopol:ingest"
+
+
+def _ingest_lock_timeout() -> int:
+    return getattr(settings, "INGEST_LOCK_TIMEOUT_SECONDS", 900)
+
+
+@shared_task
+def detect_pending(
+    since_iso: Optional[str] = None, run_id: Optional[int] = None, blocking: bool = True, then: Optional[dict] = None
+) -> int:
+    """Assign every unprocessed article since `since_iso` (default: last day), then call `then`.
+
+    CPU-bound (NER + embeddings), so it is routed to the cpu queue, and it
+    takes INGEST_LOCK itself: the lock is only ever held by a task doing the
+    work, never by one waiting on another queue. A non-blocking call that
+    finds the lock taken skips the sweep (and `then`) and returns 0.
+
+    `then` is a signature called with the number of articles assigned once
+    they all are. Above CONFLICT_DETECTION_CHUNK_SIZE articles detection is
+    sharded and `then` follows the shards; the lock is released once they
+    are queued, and shards re-check `processed_at`, so an overlapping sweep
+    only picks up what they have not reached yet. Returns number of
+    articles found.
+    """
+    from .pipeline.conflict_detection import ConflictDetector
+
+    since = datetime.fromisoformat(since_iso) if since_iso else timezone.now() - timezone.timedelta(days=1)
+    chunk_size = getattr(settings, "CONFLICT_DETECTION_CHUNK_SIZE", 0)
+    then = signature(then) if then else None
+    with advisory_lock(INGEST_LOCK, timeout=_ingest_lock_timeout(), blocking=blocking) as acquired:
+        if not acquired:
+            logger.info("ingest_skipped", reason="previous batch still running")
+            metrics.incr("ingest_skipped_total")
+            return 0
+        with _task_metrics(run_id, PipelineRun.STAGE_DETECT):
+            fresh = list(
+                RawNews.objects.filter(created_at__gte=since, processed_at__isnull=True)
+                .order_by("-created_at")
+                .values_list("id", flat=True)
+            )
+            sharded = bool(chunk_size) and len(fresh) > chunk_size
+            if not sharded:
+                assigned = len(_detect_batches(ConflictDetector(), fresh))
+                if assigned:
+                    api.invalidate()
+        if sharded:
+            _detect_sharded(fresh, chunk_size, run_id, then)
+    if then is not None and not sharded:
+        then.delay(assigned)
+    return len(fresh)
+
+
+def _scrape_all() -> None:
+    """Scrape every source; a failing source is logged and skipped."""
+    max_per_source = getattr(settings, "INGEST_MAX_PER_SOURCE", 10)
+    for name in SCRAPERS:
+        try:
+            scrape_source(name, max_per_source=max_per_source)
+        except Exception:
+            logger.exception("scrape_failed", source=name)
+
+
+@shared_task
+def ingest_batch_done(assigned: int) -> int:
+    """Chained after a micro-batch's detection to record what it assigned."""
+    metrics.incr("ingest_articles_total", assigned)
+    logger.info("ingest_batch_done", articles=assigned)
+    return assigned
+
+
+@shared_task
+def ingest_micro_batch() -> None:
+    """Continuous ingestion: scrape, dedupe and assign new articles as they appear.
+
+    Scheduled every INGEST_INTERVAL_MINUTES when INGEST_CONTINUOUS is on, so
+    the daily run only assembles articles that were already processed.
+    Scraping runs here (an io worker); detection is handed to the cpu queue
+    with ingest_batch_done as its continuation rather than waited on. If
+    the previous batch is still detecting, this batch's sweep is skipped,
+    not queued; its articles are picked up by the next one.
+    """
+    with metrics.timed("ingest_scrape_seconds"):
+        _scrape_all()
+    detect_pending.delay(None, None, False, then=ingest_batch_done.s())
+
+
+def _save_episode(conflict: Conflict, article_ids: List[int], headline: str, narrative: str, day: date,
+                  meta: Dict) -> Episode:
+    """Create or update `conflict`'s episode for `day`, sourced from `article_ids`.
+
+    `headline` (the newest article's title) is the summary when the
+    narrative is empty.
+    """
+    summary = narrative.splitlines()[0][:240] if narrative else (headline or conflict.name)
+    # Digest fragments are keyed on updated_at; a reader must never see the new
+    # stamp with the old source list, so both land in one transaction
+    with transaction.atomic():
         ep, _ = Episode.objects.get_or_create(
             conflict=conflict,
-            date=now.date(),
+            date=day,
             defaults={
                 "summary": summary,
                 "narrative": narrative,
                 "confidence": 0.6,
-                "meta": {"num_articles": len(arts)},
+                "meta": {"num_articles": len(article_ids), **meta},
             },
         )
         if not _:
             # Update existing
+            if ep.summary != summary:
+                ep.embedding = []  # stale; re-embedded after generation
             ep.summary = summary
             ep.narrative = narrative
-            ep.meta = {"num_articles": len(arts)}
+            ep.meta = {"num_articles": len(article_ids), **meta}
             ep.save()
-        ep.sources.set(arts)
-        created += 1
+        ep.sources.set(article_ids)
+    return ep
+
+
+def _generate_episodes(generator, jobs: List[GenerationJob], inputs: Dict, day: date) -> List:
+    """Generate narratives concurrently and persist each episode as it completes.
+
+    Returns the keys (conflict ids) whose episodes were saved.
+    """
+    save = sync_to_async(_save_episode)
+
+    async def persist(result: GenerationResult) -> None:
+        status = "cached" if result.cached else ("ok" if result.ok else "failed")
+        metrics.incr("llm_requests_total", status=status)
+        if not result.cached:
+            metrics.observe("llm_request_seconds", result.latency, model=generator.model)
+            if result.ttft is not None:
+                metrics.observe("llm_ttft_seconds", result.ttft, model=generator.model)
+        if not result.ok:
+            logger.warning("story_generation_failed", conflict_id=result.key, error=result.error,
+                           attempts=result.attempts)
+            return
+        conflict, article_ids, headline, meta = inputs[result.key]
+        await save(conflict, article_ids, headline, result.text, day, meta)
+
+    async def run() -> List[GenerationResult]:
+        try:
+            return await generator.generate_all(jobs, persist)
+        finally:
+            await generator.aclose()
+
+    return [r.key for r in asyncio.run(run()) if r.ok]
+
+
+# Characters of article text fetched for prompt snippets (PromptBuilder trims further)
+SNIPPET_SOURCE_CHARS = 1000
+
+
+def _window_articles(conflict_ids: List[int], since: datetime):
+    return RawNews.objects.filter(conflict_id__in=conflict_ids, created_at__gte=since).order_by(
+        "conflict_id", "-created_at"
+    )
+
+
+def _retrieve_context(conflict_ids: List[int], since: datetime, day: date) -> Dict[int, List[str]]:
+    """Context bullets per conflict, queried by its newest titles since `since` (see pipeline.context)."""
+    from .pipeline.context import QUERY_TITLES, ContextRetriever
+
+    by_id = {c.id: c for c in Conflict.objects.filter(id__in=conflict_ids).only("id", "name")}
+    titles: Dict[Conflict, List[str]] = {}
+    rows = _window_articles(list(by_id), since).values_list("conflict_id", "title")
+    for conflict_id, title in rows.iterator(chunk_size=_iterator_chunk_size()):
+        query = titles.setdefault(by_id[conflict_id], [])
+        if len(query) < QUERY_TITLES:
+            query.append(title)
+    return ContextRetriever.from_settings().context_for(titles, day)
+
 
-    # Email all subscribed users
+def _generate_for_conflicts(conflicts: List[Conflict], since: datetime, now, context: Dict[int, List[str]]) -> int:
+    """Build prompts and (re)generate today's episode for each conflict.
+
+    `context` holds each conflict's context bullets, picked beforehand by
+    `retrieve_context_chunk` on the cpu queue; summaries are embedded
+    afterwards by `embed_episodes_chunk`. Articles created since `since`
+    are streamed twice in fixed-size chunks: ids first, then one conflict
+    at a time with only a text prefix for its prompt. Afterwards only
+    article ids are kept per conflict, so memory does not grow with the
+    day's volume. Conflicts without articles in the window are marked
+    clean, as are conflicts whose episode is saved or already up to date
+    unless new articles arrived while generating. Returns number of
+    episodes.
+    """
+    started = timezone.now()
+    by_id = {c.id: c for c in conflicts}
+    chunk_size = _iterator_chunk_size()
+    article_ids: Dict[int, List[int]] = {}
+    rows = _window_articles(list(by_id), since).values_list("conflict_id", "id")
+    for conflict_id, article_id in rows.iterator(chunk_size=chunk_size):
+        article_ids.setdefault(conflict_id, []).append(article_id)
+    # Conflicts whose articles fell out of the window have nothing to (re)generate
+    Conflict.objects.filter(id__in=[cid for cid in by_id if cid not in article_ids]).update(dirty_at=None)
+    if not article_ids:
+        return 0
+
+    builder = PromptBuilder.from_settings()
+    generator = get_story_generator()
+    existing_digests = {
+        conflict_id: (meta or {}).get("input_digest")
+        for conflict_id, meta in Episode.objects.filter(
+            date=now.date(), conflict_id__in=list(article_ids)
+        ).values_list("conflict_id", "meta")
+    }
+    jobs: List[GenerationJob] = []
+    inputs: Dict = {}
+    unchanged: List[int] = []
+    rows = _window_articles(list(article_ids), since).values_list(
+        "conflict_id", "title", "source_name", "source_url", Left("text", SNIPPET_SOURCE_CHARS)
+    )
+    for conflict_id, group_rows in groupby(rows.iterator(chunk_size=chunk_size), key=lambda row: row[0]):
+        conflict, ids = by_id[conflict_id], article_ids[conflict_id]
+        refs: List[ArticleRef] = [
+            ArticleRef(title=title, source_name=source_name, url=url, snippet=snippet or "")
+            for _, title, source_name, url, snippet in group_rows
+        ]
+        # Most relevant earlier episodes; today's own episode is excluded so
+        # re-runs see identical inputs
+        built = builder.build(conflict.name, now.date().isoformat(), refs, context.get(conflict.id, []))
+        # The model that writes the narrative (OLLAMA_MODEL on the ollama backend)
+        digest = input_digest(built.prompt, generator.model, ids)
+        if existing_digests.get(conflict.id) == digest:
+            # Same prompt, model and sources as the stored episode: nothing to regenerate
+            unchanged.append(conflict.id)
+            continue
+        jobs.append(GenerationJob(key=conflict.id, prompt=built.prompt))
+        inputs[conflict.id] = (conflict, ids, refs[0].title, {"input_digest": digest, **built.meta})
+
+    done = unchanged + _generate_episodes(generator, jobs, inputs, now.date())
+    # Episodes count as activity for the detection window
+    Conflict.objects.filter(id__in=done).update(last_active_at=now)
+    Conflict.objects.filter(id__in=done, dirty_at__lte=started).update(dirty_at=None)
+    return len(done)
+
+
+def _checkpoint(run_id: int, key: str, value, stage: Optional[str] = None) -> None:
+    """Record a completed step on the run; parallel tasks serialize on the row."""
+    with transaction.atomic():
+        run = PipelineRun.objects.select_for_update().get(id=run_id)
+        run.checkpoints[key] = value
+        fields = ["checkpoints"]
+        if stage:
+            run.stage = stage
+            fields.append("stage")
+        if stage == PipelineRun.STAGE_DONE:
+            run.finished_at = timezone.now()
+            fields.append("finished_at")
+        run.save(update_fields=fields)
+
+
+@contextmanager
+def _task_metrics(run_id: Optional[int], stage: str) -> Iterator[None]:
+    """Time one pipeline task and merge what it observed into its run's metrics.
+
+    Also records the worker's peak RSS per stage, so a run shows whether
+    memory stays flat as the daily volume grows.
+    """
+    with metrics.scope() as collected:
+        try:
+            with metrics.timed("pipeline_task_seconds", stage=stage):
+                yield
+        finally:
+            metrics.peak("peak_rss_bytes", metrics.peak_rss_bytes(), stage=stage)
+            if run_id is not None:
+                with transaction.atomic():
+                    run = PipelineRun.objects.select_for_update().get(id=run_id)
+                    run.metrics = metrics.merge(run.metrics or {}, collected.snapshot())
+                    run.save(update_fields=["metrics"])
+
+
+def _fan_out(signatures: List, then) -> None:
+    """Run `signatures` in parallel, then `then` once all of them succeeded."""
+    if signatures:
+        chord(signatures)(then)
+    else:
+        then.delay()
+
+
+def _chunks(ids: List[int], size: int) -> List[List[int]]:
+    size = size or len(ids) or 1
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def scrape_source_stage(self, run_id: int, name: str) -> int:
+    """Scrape one source for a run. A source that keeps failing is recorded, not fatal."""
+    key = f"scrape:{name}"
+    if key in PipelineRun.objects.get(id=run_id).checkpoints:
+        return 0
+    try:
+        with _task_metrics(run_id, PipelineRun.STAGE_SCRAPE):
+            new = scrape_source(name, max_per_source=getattr(settings, "INGEST_MAX_PER_SOURCE", 10))
+    except Exception as exc:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc)
+        # One dead source should not hold back the digest built from the others
+        logger.exception("scrape_failed", run_id=run_id, source=name)
+        _checkpoint(run_id, key, {"error": repr(exc)})
+        return 0
+    logger.info("scrape_source_done", run_id=run_id, source=name, new=new)
+    _checkpoint(run_id, key, {"new": new})
+    return new
+
+
+@shared_task
+def detect_stage(run_id: int) -> None:
+    """Assign the run's unassigned articles, then chain generation on.
+
+    Detection goes through detect_pending, so it holds the ingest lock like
+    micro-batches and the incremental refresh do and never assigns an
+    article one of them is assigning; above CONFLICT_DETECTION_CHUNK_SIZE
+    it is sharded across cpu workers. With continuous ingestion this only
+    sweeps stragglers.
+    """
+    run = PipelineRun.objects.get(id=run_id)
+    _checkpoint(run_id, PipelineRun.STAGE_SCRAPE, True, stage=PipelineRun.STAGE_DETECT)
+    detect_pending.delay(run.since.isoformat(), run_id, then=generate_stage.si(run_id))
+
+
+@shared_task
+def retrieve_context_chunk(since_iso: str, day_iso: str, conflict_ids: List[int],
+                           run_id: Optional[int] = None) -> Dict[str, List[str]]:
+    """Pick the context bullets for one slice of conflicts, keyed by conflict id.
+
+    Embedding the retrieval queries is CPU-bound, so this runs on the cpu
+    queue and its result is chained into the io task that generates the
+    episodes. Keys are strings, as they come back through the broker.
+    """
+    with _task_metrics(run_id, PipelineRun.STAGE_GENERATE):
+        context = _retrieve_context(conflict_ids, datetime.fromisoformat(since_iso), date.fromisoformat(day_iso))
+    return {str(cid): bullets for cid, bullets in context.items()}
+
+
+def _parse_context(context: Dict[str, List[str]]) -> Dict[int, List[str]]:
+    return {int(cid): bullets for cid, bullets in context.items()}
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def generate_conflicts_chunk(self, context: Dict[str, List[str]], run_id: int, conflict_ids: List[int]) -> int:
+    """(Re)generate the run's episodes for one slice of conflicts.
+
+    `context` is the result of the preceding `retrieve_context_chunk`.
+    Episodes whose inputs are unchanged are skipped, so a retry only pays
+    for the conflicts that did not finish.
+    """
+    run = PipelineRun.objects.get(id=run_id)
+    conflicts = list(Conflict.objects.filter(id__in=conflict_ids).defer("embedding"))
+    try:
+        with _task_metrics(run_id, PipelineRun.STAGE_GENERATE):
+            return _generate_for_conflicts(conflicts, run.since, run.started_at, _parse_context(context))
+    except Exception as exc:
+        if self.request.retries >= self.max_retries:
+            # The chord body never fires now; leave the reason on the run for resume
+            PipelineRun.objects.filter(id=run_id).update(error=repr(exc))
+        raise self.retry(exc=exc)
+
+
+@shared_task
+def embed_episodes_chunk(day_iso: str, conflict_ids: List[int], run_id: Optional[int] = None) -> int:
+    """Embed the day's episode summaries that have no vector yet, for context retrieval.
+
+    CPU-bound, so it runs on the cpu queue after the io task that generated
+    the episodes. Returns number of episodes embedded.
+    """
+    from .pipeline.context import ContextRetriever
+
+    with _task_metrics(run_id, PipelineRun.STAGE_GENERATE):
+        return ContextRetriever.from_settings().embed_episodes(
+            Episode.objects.filter(date=date.fromisoformat(day_iso), conflict_id__in=conflict_ids)
+            .only("id", "summary", "embedding", "updated_at")
+        )
+
+
+@shared_task
+def generate_stage(run_id: int) -> None:
+    """Fan context retrieval, generation and summary embedding out over the conflicts with articles in the window."""
+    run = PipelineRun.objects.get(id=run_id)
+    window = RawNews.objects.filter(created_at__gte=run.since, conflict__isnull=False)
+    _checkpoint(run_id, PipelineRun.STAGE_DETECT, {"articles": window.count()}, stage=PipelineRun.STAGE_GENERATE)
+    conflict_ids = sorted(set(window.values_list("conflict_id", flat=True)))
+    chunk_size = getattr(settings, "PIPELINE_GENERATION_CHUNK_SIZE", 20)
+    _fan_out(
+        [
+            chain(retrieve_context_chunk.si(run.since.isoformat(), run.started_at.date().isoformat(), chunk, run_id),
+                  generate_conflicts_chunk.s(run_id, chunk),
+                  embed_episodes_chunk.si(run.day.isoformat(), chunk, run_id))
+            for chunk in _chunks(conflict_ids, chunk_size)
+        ],
+        email_stage.si(run_id),
+    )
+
+
+@shared_task
+def email_stage(run_id: int) -> None:
+    """Schedule the digest per timezone (at most once per run) and close the run."""
+    run = PipelineRun.objects.get(id=run_id)
+    episodes = Episode.objects.filter(date=run.day).count()
+    _checkpoint(run_id, PipelineRun.STAGE_GENERATE, {"episodes": episodes}, stage=PipelineRun.STAGE_EMAIL)
+    # Generation is over; publish its episodes to API readers in one bump
+    api.invalidate()
+    if PipelineRun.STAGE_EMAIL not in run.checkpoints:
+        with _task_metrics(run_id, PipelineRun.STAGE_EMAIL):
+            plan = schedule_digest_by_timezone(run.day)
+        _checkpoint(run_id, PipelineRun.STAGE_EMAIL, plan)
+        # Zones whose morning is already here should not wait for the next beat tick
+        send_due_digests.delay()
+    _checkpoint(run_id, PipelineRun.STAGE_DONE, True, stage=PipelineRun.STAGE_DONE)
+    run.refresh_from_db()
+    logger.info(
+        "pipeline_run_summary",
+        run_id=run_id,
+        episodes=episodes,
+        seconds=round((run.finished_at - run.started_at).total_seconds(), 3),
+        metrics=metrics.summarize(run.metrics),
+    )
+
+
+@shared_task
+def resume_pipeline(run_id: int) -> None:
+    """Continue a run from its first unfinished stage; completed steps are skipped."""
+    run = PipelineRun.objects.get(id=run_id)
+    if run.error:
+        PipelineRun.objects.filter(id=run_id).update(error="")
+    if run.stage == PipelineRun.STAGE_SCRAPE:
+        # Continuous ingestion already scraped; go straight to the detection sweep
+        pending = [] if getattr(settings, "INGEST_CONTINUOUS", False) else [
+            name for name in SCRAPERS if f"scrape:{name}" not in run.checkpoints
+        ]
+        _fan_out([scrape_source_stage.si(run_id, name) for name in pending], detect_stage.si(run_id))
+    elif run.stage == PipelineRun.STAGE_DETECT:
+        detect_stage.delay(run_id)
+    elif run.stage == PipelineRun.STAGE_GENERATE:
+        generate_stage.delay(run_id)
+    elif run.stage == PipelineRun.STAGE_EMAIL:
+        email_stage.delay(run_id)
+
+
+@shared_task
+def run_daily_pipeline() -> int:
+    """Start a checkpointed pipeline run; returns its PipelineRun id.
+
+    Stages run as a Celery canvas, each fanned out across workers:
+    per-source scrape -> chunked detection -> per-conflict generation ->
+    per-timezone digest batches. Every stage records a checkpoint on the run,
+    and `resume_pipeline(run_id)` continues a failed run where it stopped.
+    """
+    now = timezone.now()
+    run = PipelineRun.objects.create(started_at=now, day=now.date())
+    logger.info("pipeline_run_started", run_id=run.id, day=run.day.isoformat())
+    resume_pipeline.delay(run.id)
+    return run.id
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_digest_batch_task(self, user_ids: List[int], day_iso: str) -> Dict:
+    """Send one batch of personalized digests over a single pooled connection.
+
+    A retry after a part-way failure only covers the users who were not
+    mailed yet, so nobody gets the digest twice.
+    """
+    from django.contrib.auth import get_user_model
+
+    # Rendered once per date and shared through the cache by all batches
+    bundle = build_daily_digest(date.fromisoformat(day_iso))
+    emails = dict(get_user_model().objects.filter(id__in=user_ids).values_list("id", "email"))
+    follows: Dict[int, set] = {}
+    for uid, cid in ConflictSubscription.objects.filter(user_id__in=user_ids).values_list("user_id", "conflict_id"):
+        follows.setdefault(uid, set()).add(cid)
+    recipients = [(emails[uid], follows.get(uid)) for uid in user_ids if uid in emails]
+    try:
+        stats = send_digest_batch(recipients, bundle)
+    except PartialBatchError as exc:
+        delivered = set(exc.delivered)
+        pending = [uid for uid in user_ids if uid in emails and emails[uid] not in delivered]
+        logger.warning("digest_batch_partial", date=day_iso, delivered=len(delivered), pending=len(pending))
+        raise self.retry(args=(pending, day_iso), exc=exc)
+    except Exception as exc:
+        raise self.retry(exc=exc)
+    logger.info("digest_batch_sent", date=day_iso, recipients=len(recipients), sent=stats.sent,
+                seconds=round(stats.seconds, 3), per_second=round(stats.per_second, 1))
+    return {"sent": stats.sent, "seconds": stats.seconds}
+
+
+def dispatch_daily_digest(day: date, batch_size: int = 0, timezone_names: Optional[List[str]] = None) -> int:
+    """Queue digest batches for subscribers in parallel; returns number of batches.
+
+    `timezone_names` restricts delivery to those `User.timezone` buckets.
+    Batches carry user ids; each batch resolves emails and followed
+    conflicts in two queries and personalizes from the cached fragments.
+    """
     from django.contrib.auth import get_user_model
 
     User = get_user_model()
-    for user in User.objects.filter(is_subscribed=True):
-        eps = Episode.objects.filter(date=now.date()).select_related("conflict").prefetch_related("sources")
-        payload = [
-            EpisodeEmail(
-                conflict_name=e.conflict.name,
-                summary=e.summary,
-                narrative=e.narrative,
-                confidence=e.confidence,
-                sources=[{"title": s.title, "source_name": s.source_name, "url": s.source_url} for s in e.sources.all()],
-            )
-            for e in eps
-        ]
-        send_daily_digest(user.email, now.date().isoformat(), payload)
+    batch_size = batch_size or getattr(settings, "EMAIL_BATCH_SIZE", 500)
+    build_daily_digest(day)  # warm the shared cache before the batches start
+    users = User.objects.filter(is_subscribed=True)
+    if timezone_names is not None:
+        users = users.filter(timezone__in=timezone_names)
+    user_ids = users.order_by("id").values_list("id", flat=True)
+    batches, batch = [], []
+    for uid in user_ids.iterator(chunk_size=2000):
+        batch.append(uid)
+        if len(batch) >= batch_size:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+    if batches:
+        group(send_digest_batch_task.s(b, day.isoformat()) for b in batches).apply_async()
+    logger.info("digest_dispatched", date=day.isoformat(), batches=len(batches),
+                recipients=sum(len(b) for b in batches))
+    return len(batches)
+
+
+@shared_task
+def refresh_dirty_conflicts(since_iso: str, now_iso: str) -> int:
+    """Queue regeneration of today's episode for every dirty conflict; returns how many are dirty.
+
+    Context retrieval and summary embedding run on the cpu queue around
+    the io task that regenerates.
+    """
+    dirty = list(Conflict.objects.filter(dirty_at__isnull=False).values_list("id", flat=True))
+    if not dirty:
+        return 0
+    day_iso = datetime.fromisoformat(now_iso).date().isoformat()
+    chain(
+        retrieve_context_chunk.si(since_iso, day_iso, dirty),
+        regenerate_conflicts.s(since_iso, now_iso, dirty),
+        embed_episodes_chunk.si(day_iso, dirty),
+    ).delay()
+    return len(dirty)
+
+
+@shared_task
+def regenerate_conflicts(context: Dict[str, List[str]], since_iso: str, now_iso: str, conflict_ids: List[int]) -> int:
+    """Regenerate today's episode for `conflict_ids` given their retrieved context; returns how many."""
+    conflicts = list(Conflict.objects.filter(id__in=conflict_ids).defer("embedding"))
+    refreshed = _generate_for_conflicts(
+        conflicts, datetime.fromisoformat(since_iso), datetime.fromisoformat(now_iso), _parse_context(context)
+    )
+    if refreshed:
+        api.invalidate()
+    return refreshed
+
+
+@shared_task
+def run_incremental_refresh(scrape: bool = True) -> None:
+    """Intraday refresh: detect only new articles, regenerate only dirty episodes.
+
+    Scrapes here, then hands detection over RawNews not yet processed to
+    the cpu queue (under INGEST_LOCK), continuing with refresh_dirty_conflicts
+    for conflicts that received articles since their episode was last
+    generated. Nothing waits on detection. Sends no email.
+    """
+    now = timezone.now()
+    since = now - timezone.timedelta(days=1)
+    if scrape:
+        _scrape_all()
+    detect_pending.delay(since.isoformat(), then=refresh_dirty_conflicts.si(since.isoformat(), now.isoformat()))
+
 
-    return created
+@shared_task
+def send_timezone_digest(timezone_names: List[str], day_iso: str, run_id: Optional[int] = None) -> int:
+    """Deliver the digest to one timezone bucket (queued by send_due_digests at its local morning)."""
+    with _task_metrics(run_id, PipelineRun.STAGE_EMAIL):
+        return dispatch_daily_digest(date.fromisoformat(day_iso), timezone_names=timezone_names)
+
+
+def local_send_time(day: date, tz_name: str, hour: int, now: datetime, grace_minutes: int = 0) -> datetime:
+    """When `day`'s digest should go out in `tz_name`: the next `hour`:00 local still ahead of `now`.
+
+    A slot that passed at most `grace_minutes` ago is sent now (the run
+    itself takes time); a zone whose morning is further gone waits for the
+    next local morning instead of getting the digest mid-day. Never more
+    than a day ahead.
+    """
+    tz = ZoneInfo(tz_name)
+    local_day = max(day, now.astimezone(tz).date())
+    slot = datetime.combine(local_day, dt_time(hour=hour), tzinfo=tz)
+    if slot > now:
+        return slot
+    if now - slot <= timezone.timedelta(minutes=grace_minutes):
+        return now
+    return datetime.combine(local_day + timezone.timedelta(days=1), dt_time(hour=hour), tzinfo=tz)
+
+
+def schedule_digest_by_timezone(day: date, local_hour: Optional[int] = None) -> Dict[str, Dict]:
+    """Plan one delivery per timezone bucket at its next local-morning slot.
+
+    Spreads email load across the day instead of one burst. Nothing is
+    queued with an ETA (a broker would have to hold it unacked for up to a
+    day); the plan is stored on the run and send_due_digests releases each
+    bucket once its slot has come. Unknown timezone names are delivered
+    with the fallback bucket (settings.TIME_ZONE). Returns
+    `{bucket: {"at": iso send time, "timezones": [names]}}`.
+    """
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    hour = local_hour if local_hour is not None else getattr(settings, "DIGEST_LOCAL_HOUR", 7)
+    grace = getattr(settings, "DIGEST_LATE_GRACE_MINUTES", 120)
+    now = timezone.now()
+    fallback = settings.TIME_ZONE
+    buckets: Dict[str, List[str]] = {}
+    names = User.objects.filter(is_subscribed=True).values_list("timezone", flat=True).distinct()
+    for name in names:
+        try:
+            ZoneInfo(name)
+            key = name
+        except (ZoneInfoNotFoundError, ValueError):
+            key = fallback
+        buckets.setdefault(key, []).append(name)
+
+    plan = {
+        key: {"at": local_send_time(day, key, hour, now, grace).isoformat(), "timezones": tz_names}
+        for key, tz_names in buckets.items()
+    }
+    logger.info("digest_scheduled", date=day.isoformat(), buckets=len(plan))
+    return plan
+
+
+@shared_task
+def send_due_digests(as_of: Optional[str] = None) -> int:
+    """Queue every planned timezone digest whose slot has come; returns how many were queued.
+
+    Runs from beat every DIGEST_DISPATCH_INTERVAL_MINUTES (and right after a
+    run plans its digest). A bucket is marked sent on the run before it is
+    queued, so overlapping dispatchers never deliver it twice. `as_of` (ISO
+    datetime) releases everything due by then instead of by now.
+    """
+    now = datetime.fromisoformat(as_of) if as_of else timezone.now()
+    recent = PipelineRun.objects.filter(day__gte=now.date() - timezone.timedelta(days=2))
+    queued = 0
+    for run_id in recent.values_list("id", flat=True):
+        with transaction.atomic():
+            run = PipelineRun.objects.select_for_update().get(id=run_id)
+            plan = run.checkpoints.get(PipelineRun.STAGE_EMAIL) or {}
+            # Plans are dicts; older runs stored bare ETAs and queued their buckets themselves
+            due = [
+                bucket for bucket in plan.values()
+                if isinstance(bucket, dict) and not bucket.get("sent") and datetime.fromisoformat(bucket["at"]) <= now
+            ]
+            for bucket in due:
+                bucket["sent"] = True
+            if due:
+                run.save(update_fields=["checkpoints"])
+        for bucket in due:
+            send_timezone_digest.delay(bucket["timezones"], run.day.isoformat(), run_id=run.id)
+        queued += len(due)
+    if queued:
+        logger.info("digest_buckets_released", buckets=queued)
+    return queued
+
+
+@shared_task
+def run_retention_task() -> Dict:
+    """Nightly data lifecycle pass (see geopol.retention)."""
+    return asdict(run_retention())
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    # In-memory SQLite uses shared-cache table locks that fail immediately under
+    # concurrent access; a file database waits on locks like a real server does.
+    from django.conf import settings
+
+    db = settings.DATABASES["default"]
+    if db["ENGINE"].endswith("sqlite3"):
+        db.setdefault("TEST", {})["NAME"] = str(tmp_path_factory.mktemp("db") / "test.sqlite3")
+        db.setdefault("OPTIONS", {})["timeout"] = 30
+
+
+@pytest.fixture
+def make_article():
+    """Factory for RawNews rows: `make_article(1, "Port")` is titled "Port update 1".
+
+    The topic word leads the title, which is what `offline_pipeline` embeds
+    on; keyword arguments override any field.
+    """
+    from geopol.models import RawNews
+
+    def make(i, topic="Story", **fields):
+        values = {
+            "source_name": "Test", "source_url": f"https://example.com/a{i}", "title": f"{topic} update {i}",
+            "text": "x", "fingerprint": f"a{i}",
+        }
+        values.update(fields)
+        return RawNews.objects.create(**values)
+
+    return make
+
+
+@pytest.fixture
+def offline_pipeline(monkeypatch, settings):
+    """Stub scraping, embeddings and the LLM; returns the list of generated prompts.
+
+    Celery runs eagerly so the pipeline canvas completes inside the test.
+    """
+    from geopol import tasks
+    from geopol.pipeline.conflict_detection import ConflictDetector
+
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    prompts = []
+
+    class StubGenerator:
+        model = "stub"
+
+        async def generate_all(self, jobs, on_result=None):
+            results = []
+            for job in jobs:
+                prompts.append(job.prompt)
+                res = tasks.GenerationResult(key=job.key, text=f"Summary for {job.key}\nBody")
+                if on_result:
+                    await on_result(res)
+                results.append(res)
+            return results
+
+        async def aclose(self):
+            pass
+
+    monkeypatch.setattr(tasks, "scrape_source", lambda name, max_per_source: 0)
+    monkeypatch.setattr(tasks, "get_story_generator", StubGenerator)
+    topics = {"Port": [1.0, 0.0], "Border": [0.0, 1.0]}
+    monkeypatch.setattr(
+        ConflictDetector, "_embed", lambda self, texts: np.array([topics[texts[0].split()[0]]])
+    )
+    from geopol.benchmarks import SyntheticEmbedder
+
+    monkeypatch.setattr("geopol.pipeline.context.get_embedder", lambda: SyntheticEmbedder(dim=8))
+    sigs = iter(range(1000))
+    monkeypatch.setattr("geopol.pipeline.conflict_detection.build_entity_signature", lambda ner: f"s{next(sigs)}")
+    return prompts
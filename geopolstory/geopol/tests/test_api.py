@@ -0,0 +1,101 @@
+from datetime import date
+
+import pytest
+
+from geopol import api, tasks
+from geopol.models import Conflict, Episode, PipelineRun, RawNews
+from geopol.tasks import _save_episode
+
+
+@pytest.fixture
+def corpus(db):
+    conflicts = [Conflict.objects.create(name=f"Conflict {i}", entity_signature=f"c{i}", embedding=[0.1] * 8)
+                 for i in range(3)]
+    for i, day in enumerate([date(2024, 5, d) for d in (1, 2, 3)]):
+        for c in conflicts:
+            ep = Episode.objects.create(conflict=c, date=day, summary=f"{c.name} day {i}", narrative="N")
+            ep.sources.set([
+                RawNews.objects.create(source_name="Test", source_url=f"https://example.com/{c.id}/{i}/{k}",
+                                       title=f"Story {k}", text="body", fingerprint=f"{c.id}-{i}-{k}")
+                for k in range(2)
+            ])
+    return conflicts
+
+
+def _walk(client, url, **params):
+    """Follow `next` cursors to the end; returns every result in order."""
+    results, cursor = [], None
+    while True:
+        resp = client.get(url, {**params, "limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200
+        data = resp.json()
+        results += data["results"]
+        cursor = data["next"]
+        if cursor is None:
+            return results
+
+
+@pytest.mark.django_db
+def test_keyset_pages_cover_everything_once(client, corpus):
+    conflicts = _walk(client, "/api/conflicts/")
+    assert [c["id"] for c in conflicts] == sorted((c.id for c in corpus), reverse=True)
+    assert "embedding" not in conflicts[0]
+
+    timeline = _walk(client, f"/api/conflicts/{corpus[0].id}/episodes/")
+    assert [e["date"] for e in timeline] == ["2024-05-03", "2024-05-02", "2024-05-01"]
+    assert len(timeline[0]["sources"]) == 2
+
+    daily = _walk(client, "/api/episodes/", date="2024-05-02")
+    assert sorted(e["conflict"]["id"] for e in daily) == sorted(c.id for c in corpus)
+    assert len(_walk(client, "/api/episodes/")) == 9
+
+
+@pytest.mark.django_db
+def test_episode_page_query_count_is_constant(client, corpus, django_assert_num_queries):
+    # Page + sources prefetch, whatever the page size (cache version lives in locmem)
+    with django_assert_num_queries(2):
+        assert len(client.get("/api/episodes/", {"limit": 9}).json()["results"]) == 9
+
+
+@pytest.mark.django_db
+def test_cached_with_conditional_requests_and_invalidation(client, corpus, django_assert_num_queries, settings):
+    url = f"/api/conflicts/{corpus[0].id}/episodes/"
+    first = client.get(url)
+    etag = first["ETag"]
+    assert first["Last-Modified"] and "must-revalidate" in first["Cache-Control"]
+
+    with django_assert_num_queries(0):
+        assert client.get(url).content == first.content
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code == 304
+
+    # A regenerated episode shows once the generation stage finishes, not per save
+    conflict = Conflict.objects.get(id=corpus[0].id)
+    _save_episode(conflict, [], "", "Regenerated\nBody", date(2024, 5, 3), {})
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    tasks.email_stage(PipelineRun.objects.create(day=date(2024, 5, 3), stage=PipelineRun.STAGE_EMAIL).id)
+    fresh = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert fresh.status_code == 200
+    assert fresh.json()["results"][0]["summary"] == "Regenerated"
+
+
+@pytest.mark.django_db
+def test_bad_parameters(client, corpus):
+    assert client.get("/api/episodes/", {"date": "yesterday"}).status_code == 400
+    assert client.get("/api/episodes/", {"cursor": "nope"}).status_code == 400
+    assert client.get("/api/conflicts/999999/episodes/").status_code == 404
+    assert client.post("/api/conflicts/").status_code == 405
+    assert api.page_size("1000") == api.MAX_PAGE_SIZE
+
+
+def test_process_local_cache_warns_that_invalidation_cannot_reach_web(settings):
+    from geopol.checks import check_api_cache_shared
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    assert [m.id for m in check_api_cache_shared()] == ["geopol.W001"]
+    settings.API_CACHE_SECONDS = 0
+    assert check_api_cache_shared() == []
+    settings.API_CACHE_SECONDS = 300
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+    assert check_api_cache_shared() == []
@@ -0,0 +1,41 @@
+import pytest
+
+from geopol.benchmarks import Scale, compare_results, run_benchmark, run_search_benchmark
+
+
+@pytest.mark.django_db(transaction=True)
+def test_synthetic_benchmark_runs_every_stage():
+    result = run_benchmark(Scale.parse("60:4:10"))
+
+    assert result["stage"] == "done" and not result["error"]
+    assert result["scale"] == {"articles": 60, "conflicts": 4, "subscribers": 10}
+    assert set(result["stages"]) == {"scrape", "detect", "generate", "email"}
+    assert result["stages"]["detect"] > 0
+    # Deterministic embeddings: every existing topic plus the unseen one gets an episode
+    assert result["episodes"] == 5
+    assert result["emails_sent"] == 10
+
+
+def test_compare_results_flags_only_real_slowdowns():
+    def report(detect, total):
+        return {"results": [{"scale": {"articles": 1000, "conflicts": 50, "subscribers": 500}, "total_seconds": total,
+                             "stages": {"scrape": 0.0, "detect": detect, "generate": 0.5, "email": 0.01}}]}
+
+    assert compare_results(report(1.0, 2.0), report(1.1, 2.1)) == []
+    problems = compare_results(report(1.0, 2.0), report(2.5, 3.5))
+    assert len(problems) == 2
+    assert problems[0].startswith("1000:50:500 total: 2.000s -> 3.500s")
+    assert problems[1].startswith("1000:50:500 detect: 1.000s -> 2.500s")
+    # Tiny stages doubling stay under the absolute floor
+    assert compare_results(report(0.01, 2.0), report(0.03, 2.0)) == []
+    assert compare_results({"results": []}, report(5.0, 9.0)) == []
+
+
+@pytest.mark.django_db
+def test_search_benchmark_reports_latencies():
+    report = run_search_benchmark(200, queries=3)
+
+    assert report["scale"] == {"articles": 200, "episodes": 10}
+    for kind in ("articles", "episodes"):
+        assert report[kind]["first_page"]["p50_ms"] >= 0
+    assert report["icontains_scan"]["max_ms"] > 0
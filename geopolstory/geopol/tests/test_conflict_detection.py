@@ -34,3 +34,93 @@ def test_conflict_creation_and_matching(monkeypatch):
     res2 = det.detect_or_create(a2)
     assert res2.created is False
     assert res2.conflict.id == res1.conflict.id
+
+
+def test_incremental_centroid_is_count_weighted():
+    np = __import__("numpy")
+    from geopol.pipeline.conflict_detection import incremental_centroid
+
+    prev = np.array([1.0, 0.0])
+    centroid, weight = incremental_centroid(prev, 3.0, [np.array([0.0, 1.0])])
+    assert weight == 4.0
+    assert abs(np.linalg.norm(centroid) - 1.0) < 1e-9
+    # History outweighs the single new vector 3:1
+    assert centroid[0] == pytest.approx(3 * centroid[1])
+
+
+@pytest.mark.django_db
+def test_centroid_updates_flushed_in_bulk(make_article, monkeypatch):
+    np = __import__("numpy")
+    det = ConflictDetector(half_life_days=0)
+    vecs = iter([[1.0, 0.0], [0.8, 0.6], [0.96, 0.28]])
+    monkeypatch.setattr(det, "_embed", lambda texts: np.array([next(vecs)]))
+    # Distinct signatures so matching goes through the centroid index
+    sigs = iter(["a", "b", "c"])
+    monkeypatch.setattr(
+        "geopol.pipeline.conflict_detection.build_entity_signature", lambda ner: next(sigs)
+    )
+
+    arts = [make_article(i, title=f"T{i}") for i in range(3)]
+    first = det.detect_or_create(arts[0])
+    assert det.detect_or_create(arts[1]).conflict.id == first.conflict.id
+    assert det.detect_or_create(arts[2]).conflict.id == first.conflict.id
+
+    assert det.flush_centroid_updates() == 1
+    c = Conflict.objects.get(id=first.conflict.id)
+    assert c.member_count == 3
+    assert c.centroid_weight == pytest.approx(3.0)
+    expected = np.array([2.76, 0.88]) / np.linalg.norm([2.76, 0.88])
+    assert np.allclose(c.embedding, expected)
+
+
+@pytest.mark.django_db
+def test_dormant_conflicts_only_searched_as_second_chance(make_article, monkeypatch):
+    np = __import__("numpy")
+    from django.utils import timezone
+
+    old = timezone.now() - timezone.timedelta(days=90)
+    dormant = Conflict.objects.create(
+        name="Dormant", entity_signature="dormant", embedding=[1.0, 0.0], last_active_at=old
+    )
+    active = Conflict.objects.create(
+        name="Active", entity_signature="active", embedding=[0.0, 1.0], last_active_at=timezone.now()
+    )
+    det = ConflictDetector(active_window_days=30)
+    monkeypatch.setattr(det, "_embed", lambda texts: np.array([[0.99, 0.14]]))
+
+    det._ensure_index()
+    assert [c.id for c in det._conflicts] == [active.id]
+
+    art = make_article(1, title="Revival")
+    res = det.detect_or_create(art)
+    assert res.created is False
+    assert res.conflict.id == dormant.id
+    det.flush_centroid_updates()
+    dormant.refresh_from_db()
+    assert dormant.last_active_at > old
+
+
+def test_detection_shards_share_loaded_models(monkeypatch, settings):
+    import sys
+    import types
+
+    from geopol.pipeline import processing
+
+    loads = []
+    fake_spacy = types.ModuleType("spacy")
+    fake_spacy.load = lambda name: loads.append(name) or object()
+    monkeypatch.setitem(sys.modules, "spacy", fake_spacy)
+    processing._load_nlp.cache_clear()
+    settings.EMBEDDING_BACKEND = "onnx"
+    try:
+        # One detector per shard, as detect_conflicts_chunk builds them
+        first, second = ConflictDetector(), ConflictDetector()
+        first.pre.ensure()
+        second.pre.ensure()
+        first._ensure_model()
+        second._ensure_model()
+        assert loads == ["en_core_web_sm"]
+        assert first.pre._nlp is second.pre._nlp
+        assert first._model is second._model
+    finally:
+        processing._load_nlp.cache_clear()
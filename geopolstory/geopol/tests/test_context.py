@@ -0,0 +1,141 @@
+from datetime import date, timedelta
+
+import pytest
+from django.core.cache import cache
+
+from geopol import metrics
+from geopol.benchmarks import SyntheticEmbedder
+from geopol.models import Conflict, Episode
+from geopol.pipeline.context import ContextRetriever
+from geopol.tasks import _save_episode
+
+TODAY = date(2024, 6, 10)
+
+
+@pytest.fixture
+def history(db):
+    """Six past days alternating between two topics (the first word is the topic)."""
+    cache.clear()
+    c = Conflict.objects.create(name="Strait", entity_signature="strait")
+    topics = ["ports", "border", "ports", "border", "border", "border"]
+    episodes = [
+        Episode.objects.create(conflict=c, date=date(2024, 6, d + 1), summary=f"{t} update on day {d + 1}",
+                               narrative="N")
+        for d, t in enumerate(topics)
+    ]
+    return c, episodes
+
+
+def test_latest_plus_most_relevant_episodes(history):
+    c, episodes = history
+    retriever = ContextRetriever(top_k=3, embedder=SyntheticEmbedder(dim=16, noise=0.1))
+    assert retriever.embed_episodes(Episode.objects.all()) == 6
+    assert retriever.embed_episodes(Episode.objects.all()) == 0  # stored once
+
+    bullets = retriever.context_for({c: ["ports reopen after talks"]}, TODAY)[c.id]
+
+    # Newest (day 6) for continuity, then both "ports" days, newest first
+    assert bullets == ["border update on day 6", "ports update on day 3", "ports update on day 1"]
+
+
+def test_index_is_patched_incrementally_and_rebuilt_after_deletes(history, django_assert_num_queries):
+    c, episodes = history
+    retriever = ContextRetriever(embedder=SyntheticEmbedder(dim=16))
+    retriever.embed_episodes(Episode.objects.all())
+
+    with metrics.scope() as reg:
+        assert len(retriever.indexes([c.id])[c.id].ids) == 6
+        with django_assert_num_queries(1):  # stamp only
+            retriever.indexes([c.id])
+        new = Episode.objects.create(conflict=c, date=TODAY, summary="ports blockade", narrative="N")
+        retriever.embed_episodes([new])
+        with django_assert_num_queries(2):  # stamp + the one changed row
+            assert retriever.indexes([c.id])[c.id].ids[-1] == new.id
+        episodes[0].delete()
+        assert len(retriever.indexes([c.id])[c.id].ids) == 6
+
+    counters = reg.snapshot()["counters"]
+    assert counters['context_index_total{outcome="built"}'] == 2
+    assert counters['context_index_total{outcome="hit"}'] == 1
+    assert counters['context_index_total{outcome="patched"}'] == 1
+
+
+def test_falls_back_to_recent_episodes_without_embedder(history):
+    c, _ = history
+
+    class Broken(SyntheticEmbedder):
+        def encode(self, texts):
+            raise RuntimeError("model not installed")
+
+    ContextRetriever(embedder=SyntheticEmbedder(dim=16)).embed_episodes(Episode.objects.all())
+    retriever = ContextRetriever(top_k=2, embedder=Broken())
+
+    bullets = retriever.context_for({c: ["ports reopen"]}, TODAY)[c.id]
+
+    assert bullets == ["border update on day 6", "border update on day 5"]
+
+
+def test_changed_summary_drops_stale_embedding(history):
+    c, episodes = history
+    ContextRetriever(embedder=SyntheticEmbedder(dim=16)).embed_episodes(Episode.objects.all())
+
+    ep = _save_episode(c, [], "", "ports talks collapse\nBody", episodes[-1].date, {})
+
+    assert ep.embedding == []
+
+
+def test_fallback_episodes_for_many_conflicts_in_one_query(history, django_assert_num_queries):
+    c, _ = history
+    others = [Conflict.objects.create(name=f"C{i}", entity_signature=f"c{i}") for i in range(4)]
+    for i, other in enumerate(others):
+        for d in range(3):
+            Episode.objects.create(conflict=other, date=date(2024, 6, d + 1), summary=f"c{i} day {d + 1}")
+    retriever = ContextRetriever(top_k=2, enabled=False)
+
+    with django_assert_num_queries(1):
+        bullets = retriever.context_for({conflict: [] for conflict in [c, *others]}, TODAY)
+
+    assert bullets[c.id] == ["border update on day 6", "border update on day 5"]
+    assert bullets[others[2].id] == ["c2 day 3", "c2 day 2"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pipeline_embeds_new_episodes_after_generation(offline_pipeline, make_article, monkeypatch):
+    from geopol import tasks
+
+    embedded = []
+    real = tasks.embed_episodes_chunk.run
+    monkeypatch.setattr(tasks.embed_episodes_chunk, "run",
+                        lambda *args: embedded.append(args) or real(*args))
+    for i, topic in enumerate(["Port", "Border"]):
+        make_article(i, topic)
+
+    tasks.run_daily_pipeline()
+
+    assert len(embedded) == 1  # one cpu task per generation chunk
+    assert Episode.objects.count() == 2
+    assert all(ep.embedding for ep in Episode.objects.all())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_embeddings_are_only_computed_on_cpu_workers(offline_pipeline, make_article, monkeypatch):
+    from celery import current_task
+    from django.utils import timezone
+
+    from geopol import tasks
+    from geopolstory.celery import app
+
+    embedding_tasks = []
+    real = ContextRetriever._embed
+    monkeypatch.setattr(ContextRetriever, "_embed",
+                        lambda self, texts: embedding_tasks.append(current_task.name) or real(self, texts))
+    for i, topic in enumerate(["Port", "Border"]):
+        make_article(i, topic)
+    tasks.run_daily_pipeline()
+    # Yesterday's episodes are history now, so the refresh has queries to embed
+    Episode.objects.update(date=timezone.now().date() - timedelta(days=1))
+    make_article(2, "Port")
+    tasks.run_incremental_refresh(scrape=False)
+
+    assert "geopol.tasks.retrieve_context_chunk" in embedding_tasks
+    assert {app.amqp.router.route({}, name)["queue"].name for name in embedding_tasks} == {"cpu"}
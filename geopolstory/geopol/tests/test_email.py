@@ -20,3 +20,255 @@ def test_render_email_works(settings, tmp_path, monkeypatch):
 
     assert len(mail.outbox) == 1
     assert "GeopolStory — Daily Digest" in mail.outbox[0].subject
+
+
+@pytest.mark.django_db
+def test_digest_rendered_once_for_all_recipients(settings, django_assert_max_num_queries, monkeypatch):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    from datetime import date
+
+    from django.core import mail
+    from django.core.cache import cache
+
+    from geopol import emailing
+    from geopol.models import Conflict, Episode
+
+    cache.clear()
+    c = Conflict.objects.create(name="Conflict A", entity_signature="a")
+    Episode.objects.create(conflict=c, date=date(2025, 10, 5), summary="S", narrative="N")
+    renders = []
+    real_render = emailing.render_fragment
+    monkeypatch.setattr(emailing, "render_fragment", lambda *a, **k: renders.append(1) or real_render(*a, **k))
+
+    bundle = emailing.build_daily_digest(date(2025, 10, 5))
+    with django_assert_max_num_queries(0):
+        for i in range(5):
+            emailing.send_digest_bundle(f"user{i}@example.com", bundle)
+    # A second build (e.g. another batch) only runs the freshness check
+    with django_assert_max_num_queries(1):
+        assert emailing.build_daily_digest(date(2025, 10, 5)).html == bundle.html
+
+    assert len(renders) == 1
+    assert len(mail.outbox) == 5
+    html = mail.outbox[3].alternatives[0][0]
+    assert "user3@example.com" in html
+    assert emailing.RECIPIENT_PLACEHOLDER not in html
+    assert bundle.num_episodes == 1
+
+
+def test_generated_text_cannot_receive_the_recipient_address():
+    from geopol import emailing
+
+    bundle = emailing.DigestBundle(
+        date_str="2025-10-05", subject="s", shell=emailing.render_shell("2025-10-05"),
+        fragments={1: f"<p>Quoted {emailing.RECIPIENT_PLACEHOLDER}</p>"},
+    )
+    html = bundle.html_for("a@example.com")
+    assert f"<p>Quoted {emailing.RECIPIENT_PLACEHOLDER}</p>" in html
+    assert html.count("a@example.com") == 1
+
+
+@pytest.mark.django_db
+def test_digest_batches_share_one_connection(settings, monkeypatch):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    from datetime import date
+
+    from django.contrib.auth import get_user_model
+    from django.core import mail
+    from django.core.mail.backends.locmem import EmailBackend
+
+    from geopol import tasks
+
+    opened = []
+    real_open = EmailBackend.open
+    monkeypatch.setattr(EmailBackend, "open", lambda self: opened.append(1) or real_open(self))
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    User = get_user_model()
+    for i in range(7):
+        User.objects.create(username=f"u{i}", email=f"u{i}@example.com", is_subscribed=True)
+    User.objects.create(username="off", email="off@example.com", is_subscribed=False)
+
+    assert tasks.dispatch_daily_digest(date(2025, 10, 5), batch_size=3) == 3
+    assert len(mail.outbox) == 7
+    assert len(opened) == 3  # one connection per batch, not per recipient
+    assert "off@example.com" not in {m.to[0] for m in mail.outbox}
+
+
+@pytest.mark.django_db
+def test_batch_retry_skips_recipients_already_mailed(settings, monkeypatch):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    from datetime import date
+    from smtplib import SMTPServerDisconnected
+
+    from django.contrib.auth import get_user_model
+    from django.core import mail
+    from django.core.mail.backends.locmem import EmailBackend
+
+    from geopol import tasks
+
+    real_send = EmailBackend.send_messages
+    failures = []
+
+    def drops_after_three(self, messages):
+        for msg in messages:
+            if len(mail.outbox) == 3 and not failures:
+                failures.append(1)
+                raise SMTPServerDisconnected("connection lost")
+            real_send(self, [msg])
+        return len(messages)
+
+    monkeypatch.setattr(EmailBackend, "send_messages", drops_after_three)
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    User = get_user_model()
+    for i in range(5):
+        User.objects.create(username=f"u{i}", email=f"u{i}@example.com", is_subscribed=True)
+
+    assert tasks.dispatch_daily_digest(date(2025, 10, 5), batch_size=10) == 1
+    assert failures
+    assert sorted(m.to[0] for m in mail.outbox) == [f"u{i}@example.com" for i in range(5)]
+
+
+@pytest.mark.django_db
+def test_digest_scheduled_per_timezone_at_local_morning(settings, monkeypatch):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    from datetime import date, datetime, timezone as dt_timezone
+
+    from django.contrib.auth import get_user_model
+    from django.core import mail
+
+    from geopol import tasks
+    from geopol.models import PipelineRun
+
+    User = get_user_model()
+    for i, tz in enumerate(["Asia/Kolkata", "Asia/Kolkata", "America/New_York", "Not/AZone"]):
+        User.objects.create(username=f"u{i}", email=f"u{i}@example.com", timezone=tz)
+    queued = []
+    monkeypatch.setattr(tasks.send_timezone_digest, "delay", lambda names, day, **kw: queued.append((names, day)))
+    now = datetime(2025, 10, 5, 0, 0, tzinfo=dt_timezone.utc)
+    monkeypatch.setattr(tasks.timezone, "now", lambda: now)
+
+    plan = tasks.schedule_digest_by_timezone(date(2025, 10, 5), local_hour=7)
+
+    assert plan["Asia/Kolkata"]["at"] == "2025-10-05T07:00:00+05:30"  # 01:30 UTC
+    assert plan["America/New_York"]["at"] == "2025-10-05T07:00:00-04:00"  # 11:00 UTC
+    assert plan["UTC"] == {"at": "2025-10-05T07:00:00+00:00", "timezones": ["Not/AZone"]}  # fallback bucket
+    assert not queued  # planned, not queued with an ETA the broker would have to hold
+
+    # Beat releases each bucket once its morning has come, and only once
+    run = PipelineRun.objects.create(day=date(2025, 10, 5), checkpoints={"email": plan})
+    assert tasks.send_due_digests() == 0
+    now = datetime(2025, 10, 5, 7, 5, tzinfo=dt_timezone.utc)
+    assert tasks.send_due_digests() == 2
+    assert sorted(tz for names, _ in queued for tz in names) == ["Asia/Kolkata", "Not/AZone"]
+    assert tasks.send_due_digests() == 0
+    now = datetime(2025, 10, 5, 11, 0, tzinfo=dt_timezone.utc)
+    assert tasks.send_due_digests() == 1
+    assert queued[-1] == (["America/New_York"], "2025-10-05")
+    run.refresh_from_db()
+    assert all(bucket["sent"] for bucket in run.checkpoints["email"].values())
+
+    # Redis redelivers lost cpu tasks soon after their time limit, not a day later
+    assert settings.CELERY_CPU_TIME_LIMIT < settings.CELERY_BROKER_TRANSPORT_OPTIONS["visibility_timeout"] < 3 * 3600
+
+    # Delivering one bucket only reaches that bucket's subscribers
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    tasks.send_timezone_digest(["Asia/Kolkata"], "2025-10-05")
+    assert sorted(m.to[0] for m in mail.outbox) == ["u0@example.com", "u1@example.com"]
+
+
+def test_late_eastern_zones_wait_for_their_next_local_morning():
+    from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+    from geopol.tasks import local_send_time
+
+    day = date(2025, 10, 5)
+    # The daily run fires at 07:00 IST (01:30 UTC) and finishes a little later
+    now = datetime(2025, 10, 5, 1, 50, tzinfo=dt_timezone.utc)
+
+    # Tokyo's 07:00 passed at 22:00 UTC yesterday: tomorrow morning, not mid-day today
+    assert local_send_time(day, "Asia/Tokyo", 7, now, grace_minutes=120) == datetime(
+        2025, 10, 5, 22, 0, tzinfo=dt_timezone.utc
+    )
+    assert local_send_time(day, "Pacific/Kiritimati", 7, now, grace_minutes=120) == datetime(
+        2025, 10, 5, 17, 0, tzinfo=dt_timezone.utc
+    )
+    # Kolkata's slot passed 20 minutes ago, within the grace: send now
+    assert local_send_time(day, "Asia/Kolkata", 7, now, grace_minutes=120) == now
+    assert local_send_time(day, "Asia/Kolkata", 7, now) == datetime(2025, 10, 6, 1, 30, tzinfo=dt_timezone.utc)
+    # Western zones still get today's morning
+    assert local_send_time(day, "America/New_York", 7, now, grace_minutes=120) == datetime(
+        2025, 10, 5, 11, 0, tzinfo=dt_timezone.utc
+    )
+    # Every slot is in the future and at most a day away
+    for tz in ("Asia/Tokyo", "Pacific/Kiritimati", "Etc/GMT+12", "Europe/London"):
+        eta = local_send_time(day, tz, 7, now, grace_minutes=120)
+        assert now <= eta <= now + timedelta(days=1)
+
+
+@pytest.mark.django_db
+def test_personalized_digest_joins_cached_fragments(settings, monkeypatch):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    from datetime import date
+
+    from django.contrib.auth import get_user_model
+    from django.core import mail
+    from django.core.cache import cache
+
+    from geopol import emailing, tasks
+    from geopol.models import Conflict, ConflictSubscription, Episode
+
+    cache.clear()
+    day = date(2025, 10, 5)
+    a = Conflict.objects.create(name="Conflict A", entity_signature="a")
+    b = Conflict.objects.create(name="Conflict B", entity_signature="b")
+    quiet = Conflict.objects.create(name="Conflict Q", entity_signature="q")
+    Episode.objects.create(conflict=a, date=day, summary="SA", narrative="NA")
+    ep_b = Episode.objects.create(conflict=b, date=day, summary="SB", narrative="NB")
+    User = get_user_model()
+    everyone = User.objects.create(username="all", email="all@example.com")
+    only_b = User.objects.create(username="b", email="b@example.com")
+    only_quiet = User.objects.create(username="q", email="q@example.com")
+    ConflictSubscription.objects.create(user=only_b, conflict=b)
+    ConflictSubscription.objects.create(user=only_quiet, conflict=quiet)
+    renders = []
+    real_render = emailing.render_fragment
+    monkeypatch.setattr(emailing, "render_fragment", lambda *a, **k: renders.append(1) or real_render(*a, **k))
+
+    tasks.dispatch_daily_digest(day, batch_size=2)
+
+    html = {m.to[0]: m.alternatives[0][0] for m in mail.outbox}
+    assert set(html) == {everyone.email, only_b.email}  # nothing new for the quiet follower
+    assert "Conflict A" in html[everyone.email] and "Conflict B" in html[everyone.email]
+    assert "Conflict B" in html[only_b.email] and "Conflict A" not in html[only_b.email]
+    assert emailing.EPISODES_PLACEHOLDER not in html[only_b.email]
+    assert len(renders) == 2  # one render per episode, not per recipient
+
+    # Regenerating one episode re-renders only its fragment
+    ep_b.summary = "SB2"
+    ep_b.save()
+    assert "SB2" in emailing.build_daily_digest(day).html
+    assert len(renders) == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_episode_stamp_and_sources_change_together():
+    from datetime import date
+
+    from django.db import IntegrityError
+
+    from geopol.models import Conflict, Episode, RawNews
+    from geopol.tasks import _save_episode
+
+    conflict = Conflict.objects.create(name="Strait", entity_signature="strait")
+    art = RawNews.objects.create(source_name="T", source_url="https://example.com/a", title="A", text="x",
+                                 fingerprint="a", conflict=conflict)
+    ep = _save_episode(conflict, [art.id], "", "First\nBody", date(2024, 6, 1), {})
+
+    # The fragment cache key is the episode's updated_at: a failed source update
+    # must not leave a new stamp behind with the old sources
+    with pytest.raises(IntegrityError):
+        _save_episode(conflict, [art.id + 1000], "", "Second\nBody", date(2024, 6, 1), {})
+    ep_after = Episode.objects.get(id=ep.id)
+    assert (ep_after.summary, ep_after.updated_at) == ("First", ep.updated_at)
+    assert list(ep_after.sources.values_list("id", flat=True)) == [art.id]
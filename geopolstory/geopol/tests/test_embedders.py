@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from geopol.pipeline.conflict_detection import ConflictDetector
+from geopol.pipeline.embedders import Embedder, OnnxEmbedder, benchmark_embedders, get_embedder
+
+
+class FakeEmbedder(Embedder):
+    def __init__(self, name, noise=0.0):
+        self.name = name
+        self.noise = noise
+
+    def encode(self, texts):
+        vecs = np.array([[len(t), 1.0 + self.noise, 1.0] for t in texts], dtype=np.float32)
+        return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def test_get_embedder_selects_backend(settings):
+    settings.EMBEDDING_BACKEND = "onnx"
+    settings.EMBEDDING_ONNX_THREADS = 2
+    emb = get_embedder()
+    assert isinstance(emb, OnnxEmbedder)
+    assert emb.intra_op_threads == 2
+    # One shared instance per configuration, so the model loads once per process
+    assert get_embedder() is emb
+    settings.EMBEDDING_ONNX_THREADS = 4
+    assert get_embedder() is not emb
+    with pytest.raises(ValueError):
+        get_embedder("tensorflow")
+
+
+def test_detector_uses_injected_embedder():
+    det = ConflictDetector(embedder=FakeEmbedder("fake"))
+    out = det._embed(["abc", "abcdef"])
+    assert out.shape == (2, 3)
+    assert np.allclose(np.linalg.norm(out, axis=1), 1.0)
+
+
+def test_benchmark_reports_throughput_and_agreement():
+    texts = [f"text {i}" for i in range(10)]
+    res = benchmark_embedders(FakeEmbedder("torch"), FakeEmbedder("onnx", noise=0.01), texts, batch_size=4)
+    assert res["torch"]["throughput"] > 0
+    assert res["onnx"]["latency_p95_ms"] >= res["onnx"]["latency_p50_ms"]
+    assert 0.99 < res["agreement"]["cosine_mean"] <= 1.0 + 1e-6
@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Modules every web process, worker and manage.py call imports
+ENTRY_POINTS = ["geopol.tasks", "geopolstory.urls"]
+# Must only load on first use (ML, scraping, LLM clients, columnar I/O)
+HEAVY = [
+    "numpy", "torch", "sentence_transformers", "transformers", "onnxruntime", "spacy", "pandas", "pyarrow",
+    "newspaper", "bs4", "requests", "jinja2", "openai", "httpx", "tiktoken", "pydantic",
+]
+# Cumulative import time of the entry points after django.setup(); generous for slow CI
+BUDGET_MS = 250
+
+SCRIPT = f"""
+import json, sys
+import django
+django.setup()
+{"; ".join(f"import {m}" for m in ENTRY_POINTS)}
+print(json.dumps(sorted(set(sys.modules) & set({HEAVY!r}))))
+"""
+
+
+def _run():
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "geopolstory.settings"}
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        capture_output=True, text=True, env=env, cwd=Path(__file__).resolve().parents[2], check=True,
+    )
+
+
+def test_entry_points_do_not_import_heavy_dependencies():
+    proc = _run()
+    assert json.loads(proc.stdout.strip().splitlines()[-1]) == []
+
+    # Lines look like "import time:  self [us] | cumulative | module"
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, total, name = line.split("|")
+            if total.strip().isdigit():
+                cumulative[name.strip()] = int(total) / 1000
+    spent = sum(cumulative.get(m, 0.0) for m in ENTRY_POINTS)
+    slowest = sorted(cumulative.items(), key=lambda kv: -kv[1])[:10]
+    assert spent < BUDGET_MS, f"entry points took {spent:.0f} ms to import; slowest: {slowest}"
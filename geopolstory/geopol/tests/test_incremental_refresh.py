@@ -0,0 +1,28 @@
+import pytest
+
+from geopol import tasks
+from geopol.models import Conflict, Episode, PipelineRun, RawNews
+
+
+@pytest.mark.django_db(transaction=True)
+def test_incremental_refresh_only_touches_dirty_conflicts(offline_pipeline, make_article):
+    make_article(1, "Port")
+    make_article(2, "Border")
+    run = PipelineRun.objects.get(id=tasks.run_daily_pipeline())
+    assert run.checkpoints["generate"] == {"episodes": 2}
+    assert len(offline_pipeline) == 2
+    assert not Conflict.objects.filter(dirty_at__isnull=False).exists()
+    assert not RawNews.objects.filter(processed_at__isnull=True).exists()
+
+    # Nothing new: no detection, no generation
+    tasks.run_incremental_refresh()
+    assert len(offline_pipeline) == 2
+
+    # A new Port article only regenerates the Port episode
+    make_article(3, "Port")
+    tasks.run_incremental_refresh()
+    assert len(offline_pipeline) == 3
+    port = Episode.objects.get(conflict__name__startswith="Port")
+    assert port.sources.count() == 2
+    assert "Port update 3" in offline_pipeline[-1]
+    assert not Conflict.objects.filter(dirty_at__isnull=False).exists()
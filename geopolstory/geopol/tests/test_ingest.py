@@ -0,0 +1,96 @@
+import pytest
+
+from geopol import tasks
+from geopol.locks import advisory_lock
+from geopol.models import PipelineRun, RawNews
+
+
+@pytest.mark.django_db(transaction=True)
+def test_micro_batch_is_single_flight(offline_pipeline, make_article, monkeypatch):
+    scraped = []
+    monkeypatch.setattr(tasks, "scrape_source", lambda name, max_per_source: scraped.append(name) or 0)
+    make_article(1, "Port")
+
+    with advisory_lock(tasks.INGEST_LOCK):
+        tasks.ingest_micro_batch()  # an overlapping batch still scrapes but skips its sweep
+    assert sorted(scraped) == sorted(tasks.SCRAPERS)
+    assert RawNews.objects.filter(processed_at__isnull=True).count() == 1
+
+    tasks.ingest_micro_batch()
+    assert not RawNews.objects.filter(processed_at__isnull=True).exists()
+    assert tasks.detect_pending.delay(None, None, False).get() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_daily_run_only_assembles_ingested_articles(offline_pipeline, make_article, settings, monkeypatch):
+    settings.INGEST_CONTINUOUS = True
+    make_article(1, "Port")
+    make_article(2, "Border")
+    tasks.ingest_micro_batch()
+    make_article(3, "Port")  # arrived after the last micro-batch
+
+    scraped, chunks = [], []
+    monkeypatch.setattr(tasks, "scrape_source", lambda name, max_per_source: scraped.append(name) or 0)
+    monkeypatch.setattr(tasks.detect_conflicts_chunk, "si", lambda *a: chunks.append(a))
+    run = PipelineRun.objects.get(id=tasks.run_daily_pipeline())
+
+    assert run.stage == PipelineRun.STAGE_DONE
+    assert scraped == [] and chunks == []  # no scrape fan-out, no detection shards
+    assert run.checkpoints["detect"] == {"articles": 3}  # the straggler was swept in
+    assert run.checkpoints["generate"] == {"episodes": 2}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_straggler_sweep_shards_onto_the_cpu_queue(offline_pipeline, make_article, settings, monkeypatch):
+    settings.INGEST_CONTINUOUS = True
+    settings.CONFLICT_DETECTION_CHUNK_SIZE = 1
+    monkeypatch.setattr(tasks, "scrape_source", lambda name, max_per_source: 0)
+    shards = []
+    real_chunk = tasks.detect_conflicts_chunk.si
+    monkeypatch.setattr(
+        tasks.detect_conflicts_chunk, "si", lambda ids, run_id: shards.append(run_id) or real_chunk(ids, run_id)
+    )
+    make_article(1, "Port")
+    make_article(2, "Border")
+
+    assert tasks.detect_pending.delay(None, None, False).get() == 2
+    assert shards == [None, None]
+
+    make_article(3, "Port")
+    make_article(4, "Border")
+    run = PipelineRun.objects.get(id=tasks.run_daily_pipeline())
+    assert run.stage == PipelineRun.STAGE_DONE and not run.error
+    assert shards[2:] == [run.id, run.id]  # shard metrics land on the run
+    assert run.metrics["histograms"]["detect_seconds"]["count"] == 2
+    assert not RawNews.objects.filter(processed_at__isnull=True).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_daily_detection_waits_for_the_ingest_lock(offline_pipeline, make_article, settings):
+    settings.INGEST_LOCK_TIMEOUT_SECONDS = 0.1
+    make_article(1, "Port")
+
+    with advisory_lock(tasks.INGEST_LOCK):  # a refresh or micro-batch is assigning articles
+        run = PipelineRun.objects.get(id=tasks.run_daily_pipeline())
+    assert run.stage == PipelineRun.STAGE_DETECT  # detection gave up with LockTimeout
+    assert RawNews.objects.filter(processed_at__isnull=True).count() == 1
+
+    tasks.resume_pipeline(run.id)
+    run.refresh_from_db()
+    assert run.stage == PipelineRun.STAGE_DONE
+    assert not RawNews.objects.filter(processed_at__isnull=True).exists()
+
+
+def test_cpu_and_io_tasks_are_routed_to_separate_queues():
+    from geopolstory.celery import app
+
+    def queue(name):
+        return app.amqp.router.route({}, name)["queue"].name
+
+    assert queue("geopol.tasks.detect_conflicts_chunk") == "cpu"
+    assert queue("geopol.tasks.detect_pending") == "cpu"
+    assert queue("geopol.tasks.embed_episodes_chunk") == "cpu"
+    assert queue("geopol.tasks.retrieve_context_chunk") == "cpu"
+    for name in ("scrape_source_stage", "generate_conflicts_chunk", "send_digest_batch_task", "ingest_micro_batch"):
+        assert queue(f"geopol.tasks.{name}") == "io"
+    assert app.conf.task_annotations["geopol.tasks.detect_pending"]["acks_late"]
@@ -0,0 +1,74 @@
+import pytest
+from django.core.management import call_command
+
+from geopol import metrics, tasks
+from geopol.models import PipelineRun
+
+
+def test_scoped_timers_render_as_prometheus():
+    @metrics.timed("work_seconds", kind="unit")
+    def work(fail=False):
+        if fail:
+            raise ValueError("boom")
+
+    with metrics.scope() as outer:
+        work()
+        with metrics.scope() as inner:
+            with pytest.raises(ValueError):
+                work(fail=True)
+        metrics.incr("items_total", 3)
+
+    assert inner.snapshot()["histograms"]['work_seconds{kind="unit"}']["count"] == 1
+    snap = outer.snapshot()
+    assert snap["histograms"]['work_seconds{kind="unit"}']["count"] == 2
+    assert snap["counters"] == {'work_errors_total{kind="unit"}': 1, "items_total": 3}
+
+    text = metrics.to_prometheus(metrics.merge(snap, inner.snapshot()), {"up": 1})
+    assert "# TYPE geopol_work_seconds histogram" in text
+    assert 'geopol_work_seconds_bucket{kind="unit",le="+Inf"} 3' in text
+    assert 'geopol_work_seconds_count{kind="unit"} 3' in text
+    assert "geopol_items_total 3" in text
+    assert "geopol_up 1" in text
+
+
+def test_peaks_merge_by_maximum():
+    with metrics.scope() as first:
+        metrics.peak("peak_rss_bytes", 300, stage="detect")
+        metrics.peak("peak_rss_bytes", 100, stage="detect")
+    with metrics.scope() as second:
+        metrics.peak("peak_rss_bytes", 200, stage="detect")
+
+    merged = metrics.merge(first.snapshot(), second.snapshot())
+    assert merged["peaks"] == {'peak_rss_bytes{stage="detect"}': 300}
+    assert metrics.summarize(merged)['peak_rss_bytes{stage="detect"}'] == 300
+    # Snapshots stored before peaks existed still merge
+    assert metrics.merge({"counters": {}, "histograms": {}}, merged)["peaks"] == merged["peaks"]
+    text = metrics.to_prometheus(merged)
+    assert "# TYPE geopol_peak_rss_bytes gauge" in text
+    assert 'geopol_peak_rss_bytes{stage="detect"} 300' in text
+    assert metrics.peak_rss_bytes() > 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pipeline_run_stores_per_stage_metrics(offline_pipeline, make_article, tmp_path, capsys):
+    for i, topic in enumerate(["Port", "Border"]):
+        make_article(i, topic)
+
+    run = PipelineRun.objects.get(id=tasks.run_daily_pipeline())
+
+    hist = run.metrics["histograms"]
+    assert hist["detect_seconds"]["count"] == 2
+    assert hist["ner_seconds"]["count"] == 2
+    for stage in ("scrape", "detect", "generate", "email"):
+        assert hist[f'pipeline_task_seconds{{stage="{stage}"}}']["count"] >= 1
+    assert run.metrics["counters"]['llm_requests_total{status="ok"}'] == 2
+    assert run.metrics["counters"]['detections_total{outcome="created"}'] == 2
+    assert run.metrics["peaks"]['peak_rss_bytes{stage="generate"}'] > 0
+
+    out = tmp_path / "geopol.prom"
+    call_command("export_metrics", output=str(out))
+    text = out.read_text()
+    assert "geopol_pipeline_run_episodes 2" in text
+    assert 'geopol_detect_seconds_count 2' in text
+    assert "geopol_pipeline_run_duration_seconds" in text
+    assert 'geopol_peak_rss_bytes{stage="detect"}' in text
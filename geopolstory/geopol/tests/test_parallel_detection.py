@@ -0,0 +1,70 @@
+import itertools
+import threading
+
+import numpy as np
+import pytest
+from django.db import connection
+
+from geopol.models import Conflict
+from geopol.pipeline.conflict_detection import ConflictDetector
+
+N_WORKERS = 6
+TOPICS = {
+    "alpha": [1.0, 0.0, 0.0],
+    "beta": [0.0, 1.0, 0.0],
+    "gamma": [0.0, 0.0, 1.0],
+}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_workers_create_no_duplicate_conflicts(make_article, monkeypatch):
+    # Each article's topic is its title; the fake embedder maps it to a fixed vector
+    articles = [make_article(i, title=topic, text=f"{topic} story {i}") for i, topic in enumerate(list(TOPICS) * 4)]
+    # Distinct signature per call so only the claim protocol prevents duplicate topics
+    counter = itertools.count()
+    monkeypatch.setattr(
+        "geopol.pipeline.conflict_detection.build_entity_signature", lambda ner: f"sig-{next(counter)}"
+    )
+
+    barrier = threading.Barrier(N_WORKERS)
+    errors = []
+
+    def worker(shard):
+        try:
+            det = ConflictDetector(active_window_days=0)
+            det._embed = lambda texts: np.array([TOPICS[texts[0].split("\n")[0]]])
+            barrier.wait()
+            for art in shard:
+                det.detect_or_create(art)
+            det.flush_centroid_updates()
+        except Exception as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    # Every worker sees every article: worst-case overlap
+    threads = [threading.Thread(target=worker, args=(articles,)) for _ in range(N_WORKERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert Conflict.objects.count() == len(TOPICS)
+    assert sum(Conflict.objects.values_list("member_count", flat=True)) == N_WORKERS * len(articles)
+
+
+def test_locks_on_an_unshared_cache_are_flagged(settings, monkeypatch):
+    # The threads above share one locmem cache; separate worker processes would not
+    from django.conf import settings as live
+
+    from geopol.checks import check_locks_shared
+
+    for backend in ("locmem.LocMemCache", "dummy.DummyCache"):
+        settings.CACHES = {"default": {"BACKEND": f"django.core.cache.backends.{backend}"}}
+        assert [m.id for m in check_locks_shared()] == ["geopol.W003"]
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+    assert check_locks_shared() == []
+    monkeypatch.setitem(live.DATABASES["default"], "ENGINE", "django.db.backends.postgresql")
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    assert check_locks_shared() == []
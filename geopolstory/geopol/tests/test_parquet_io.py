@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+import pytest
+from django.utils import timezone
+
+from geopol.models import Conflict, Episode, RawNews
+from geopol.parquet_io import export_tables, import_tables
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.mark.django_db
+def test_export_import_roundtrip(tmp_path):
+    c = Conflict.objects.create(name="Port dispute", entity_signature="port", embedding=[0.5, -0.25, 1.0])
+    old, new = [
+        RawNews.objects.create(
+            source_name="Test", source_url=f"https://example.com/{i}", title=f"Story {i}", text=f"body {i}",
+            fingerprint=f"fp{i}", meta={"tags": ["a", i]}, conflict=c,
+        )
+        for i in range(2)
+    ]
+    RawNews.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=40))
+    ep = Episode.objects.create(conflict=c, date=date(2024, 5, 1), summary="S", narrative="N", meta={"k": 1})
+    ep.sources.set([old, new])
+    before = {
+        "conflict": Conflict.objects.values().get(),
+        "articles": list(RawNews.objects.order_by("id").values()),
+        "episode": Episode.objects.values().get(),
+    }
+
+    counts = export_tables(tmp_path, chunk_size=1)  # one row per query
+
+    assert counts == {"conflicts": 1, "rawnews": 2, "episodes": 1}
+    assert len(list((tmp_path / "rawnews").glob("month=*/*.parquet"))) == 2
+    assert (tmp_path / "episodes" / "month=2024-05" / "part-0.parquet").exists()
+    assert pq.read_table(tmp_path / "conflicts").column("embedding").to_pylist() == [[0.5, -0.25, 1.0]]
+
+    Conflict.objects.all().delete()
+    RawNews.objects.all().delete()
+
+    assert import_tables(tmp_path, batch_size=1) == counts
+    assert Conflict.objects.values().get() == before["conflict"]
+    assert list(RawNews.objects.order_by("id").values()) == before["articles"]
+    assert Episode.objects.values().get() == before["episode"]
+    assert set(Episode.objects.get().sources.values_list("id", flat=True)) == {old.id, new.id}
+
+    # Reloading over existing rows is a no-op rather than an integrity error
+    import_tables(tmp_path)
+    assert RawNews.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_import_leaves_auto_now_on_for_other_writers(tmp_path, monkeypatch):
+    c = Conflict.objects.create(name="Port dispute", entity_signature="port")
+    Conflict.objects.filter(id=c.id).update(updated_at=timezone.now() - timedelta(days=3))
+    exported = Conflict.objects.get().updated_at
+    export_tables(tmp_path)
+    Conflict.objects.all().delete()
+
+    # A save from another thread while the import is running keeps auto_now
+    seen = []
+    real_bulk_create = Conflict.objects.bulk_create
+    monkeypatch.setattr(
+        Conflict.objects, "bulk_create",
+        lambda *a, **k: seen.append(Conflict._meta.get_field("updated_at").auto_now) or real_bulk_create(*a, **k),
+    )
+    import_tables(tmp_path, tables=["conflicts"])
+
+    assert seen == [True]
+    assert Conflict.objects.get().updated_at == exported
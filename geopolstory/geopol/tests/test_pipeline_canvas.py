@@ -0,0 +1,93 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+from geopol import tasks
+from geopol.models import Episode, PipelineRun
+from geopol.pipeline.conflict_detection import ConflictDetector
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_run_resumes_from_its_checkpoint(offline_pipeline, make_article, settings, monkeypatch):
+    settings.CONFLICT_DETECTION_CHUNK_SIZE = 1
+    settings.PIPELINE_GENERATION_CHUNK_SIZE = 1
+    scraped, detected, queued = [], [], []
+    monkeypatch.setattr(tasks, "scrape_source", lambda name, max_per_source: scraped.append(name) or 0)
+    real_detect = ConflictDetector.detect_or_create
+    monkeypatch.setattr(
+        ConflictDetector, "detect_or_create", lambda self, art: detected.append(art.id) or real_detect(self, art)
+    )
+    monkeypatch.setattr(tasks.send_timezone_digest, "delay", lambda names, day, **kw: queued.append(names))
+    real_generate = tasks._generate_for_conflicts
+
+    def llm_down(conflicts, since, now, context):
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(tasks, "_generate_for_conflicts", llm_down)
+    get_user_model().objects.create(username="u", email="u@example.com", timezone="Asia/Kolkata")
+    make_article(1, "Port")
+    make_article(2, "Border")
+
+    tasks.run_daily_pipeline()
+    run = PipelineRun.objects.get()
+    assert run.stage == PipelineRun.STAGE_GENERATE
+    assert "LLM unavailable" in run.error
+    assert sorted(scraped) == sorted(tasks.SCRAPERS)
+    assert run.checkpoints["detect"] == {"articles": 2}
+    assert len(detected) == 2
+    assert not Episode.objects.exists() and not queued
+
+    # Resuming skips scraping and detection and picks up at generation
+    monkeypatch.setattr(tasks, "_generate_for_conflicts", real_generate)
+    tasks.resume_pipeline(run.id)
+    run.refresh_from_db()
+    assert run.stage == PipelineRun.STAGE_DONE and run.finished_at and not run.error
+    assert len(scraped) == len(tasks.SCRAPERS) and len(detected) == 2
+    assert run.checkpoints["generate"] == {"episodes": 2}
+    assert Episode.objects.count() == 2
+    plan = run.checkpoints["email"]
+    assert [bucket["timezones"] for bucket in plan.values()] == [["Asia/Kolkata"]]
+
+    # A finished run is never redone
+    tasks.resume_pipeline(run.id)
+    run.refresh_from_db()
+    assert len(offline_pipeline) == 2 and run.checkpoints["email"] == plan
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stages_stream_articles_without_full_text(offline_pipeline, make_article, settings, monkeypatch):
+    settings.PIPELINE_ITERATOR_CHUNK_SIZE = 2
+    seen = []
+    real_detect = ConflictDetector.detect_or_create
+    monkeypatch.setattr(
+        ConflictDetector, "detect_or_create",
+        lambda self, art: seen.append((art.get_deferred_fields(), art.lead)) or real_detect(self, art),
+    )
+    for i in range(5):
+        make_article(i, "Port", text=f"Body {i} " + "filler " * 1000)
+
+    run = PipelineRun.objects.get(id=tasks.run_daily_pipeline())
+    assert run.stage == PipelineRun.STAGE_DONE and not run.error
+    assert len(seen) == 5
+    assert all("text" in deferred and len(lead) == 2000 for deferred, lead in seen)
+    # Every article of the conflict reaches the prompt and the episode, across iterator chunks
+    episode = Episode.objects.get()
+    assert episode.sources.count() == 5
+    assert all(f"Port update {i}" in offline_pipeline[-1] for i in range(5))
+    assert episode.meta["num_articles"] == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_api_cache_is_retired_once_per_finished_stage(offline_pipeline, make_article, settings, monkeypatch):
+    from geopol import api
+
+    settings.CONFLICT_DETECTION_CHUNK_SIZE = 1
+    settings.PIPELINE_GENERATION_CHUNK_SIZE = 1
+    settings.PIPELINE_ITERATOR_CHUNK_SIZE = 1
+    bumps = []
+    monkeypatch.setattr(api, "invalidate", lambda: bumps.append(1))
+    for i, topic in enumerate(["Port", "Border", "Port", "Border"]):
+        make_article(i, topic)
+
+    run = PipelineRun.objects.get(id=tasks.run_daily_pipeline())
+    assert run.stage == PipelineRun.STAGE_DONE and Episode.objects.count() == 2
+    assert len(bumps) == 2  # detection sweep, then generation
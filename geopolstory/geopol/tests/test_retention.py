@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+import pytest
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from geopol.models import Conflict, Episode, PipelineRun, RawNews
+from geopol.retention import read_archive, run_retention
+
+
+def _article(i, age_days):
+    art = RawNews.objects.create(
+        source_name="Test", source_url=f"https://example.com/old{i}", title=f"Old story {i}", text=f"body {i}",
+        fingerprint=f"old{i}",
+    )
+    RawNews.objects.filter(id=art.id).update(created_at=timezone.now() - timedelta(days=age_days))
+    art.refresh_from_db()
+    return art
+
+
+@pytest.mark.django_db
+def test_old_bodies_archived_and_rows_kept_as_dedupe_tombstones(settings, tmp_path):
+    settings.ARCHIVE_DIR = str(tmp_path)
+    linked, unlinked = _article(1, 120), _article(2, 100)
+    fresh = _article(3, 1)
+    c = Conflict.objects.create(name="C", entity_signature="c")
+    ep = Episode.objects.create(conflict=c, date=linked.created_at.date(), summary="S", narrative="N")
+    ep.sources.set([linked])
+    old_run = PipelineRun.objects.create(day=linked.created_at.date())
+    PipelineRun.objects.filter(id=old_run.id).update(started_at=timezone.now() - timedelta(days=200))
+
+    assert run_retention(dry_run=True).articles_archived == 2
+    assert RawNews.objects.filter(text="").count() == 0
+
+    stats = run_retention(batch_size=1)  # one row per chunk
+
+    assert (stats.articles_archived, stats.runs_deleted) == (2, 1)
+    linked.refresh_from_db()
+    assert linked.text == "" and linked.archived_at is not None
+    assert linked.source_url == "https://example.com/old1"  # episode links still resolve
+    # Unlinked rows stay too, so scraping the article again is still a duplicate
+    assert RawNews.objects.get(id=unlinked.id).text == ""
+    with pytest.raises(IntegrityError), transaction.atomic():
+        RawNews.objects.create(source_name="Test", source_url=unlinked.source_url, title="Again", text="body 2",
+                               fingerprint="again")
+    assert RawNews.objects.get(id=fresh.id).text == "body 3"
+    months = {a.created_at.strftime("%Y-%m") for a in (linked, unlinked)}
+    archived = {r["id"]: r for m in months for r in read_archive("rawnews", m)}
+    assert archived[linked.id]["text"] == "body 1" and archived[unlinked.id]["text"] == "body 2"
+    # A second pass finds nothing left to do
+    assert run_retention().articles_archived == 0
+
+    # Episode retention archives the episode; its source row stays as a tombstone
+    assert run_retention(episode_days=30).episodes_archived == 1
+    assert not Episode.objects.exists() and RawNews.objects.filter(id=linked.id).exists()
+    (record,) = read_archive("episodes", ep.created_at.strftime("%Y-%m"))
+    assert record["sources"][0]["url"] == "https://example.com/old1"
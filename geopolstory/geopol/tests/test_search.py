@@ -0,0 +1,113 @@
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from geopol import search
+from geopol.models import Conflict, Episode, RawNews
+
+
+def _article(i, title, text):
+    return RawNews.objects.create(source_name="Test", source_url=f"https://example.com/{i}", title=title,
+                                  text=text, fingerprint=f"fp{i}")
+
+
+@pytest.mark.django_db
+def test_index_follows_inserts_updates_and_deletes():
+    art = _article(1, "Harbor talks resume", "Negotiators met on Tuesday.")
+    assert search.search("harbor", "articles").ids == [art.id]
+
+    RawNews.objects.filter(id=art.id).update(text="Shipping lanes were blockaded overnight.")
+    assert search.search("blockade", "articles").ids == [art.id]  # stemmed: blockaded ~ blockade
+    assert search.search("negotiators", "articles").ids == []
+
+    art.delete()
+    assert search.search("harbor", "articles").ids == []
+
+
+@pytest.mark.django_db
+def test_ranked_with_heading_weight_and_natural_language_query():
+    c = Conflict.objects.create(name="Strait", entity_signature="strait")
+    body_hit = Episode.objects.create(conflict=c, date=date(2024, 5, 1), summary="Navy drills",
+                                      narrative="Officials mentioned the port blockade in passing.")
+    title_hit = Episode.objects.create(conflict=c, date=date(2024, 5, 2), summary="Port blockade tightens",
+                                       narrative="Ships queued outside the port for a third day.")
+    Episode.objects.create(conflict=c, date=date(2024, 5, 3), summary="Elections", narrative="Turnout was high.")
+
+    page = search.search("what did we write about the port blockade", "episodes")
+
+    assert page.ids == [title_hit.id, body_hit.id]
+    assert page.scores == sorted(page.scores)
+
+
+@pytest.mark.django_db
+def test_cursor_pages_cover_every_hit_once():
+    ids = {_article(i, f"Ceasefire report {i}", "ceasefire " * (i % 4 + 1)).id for i in range(11)}
+    seen, cursor = [], None
+    while True:
+        page = search.search("ceasefire", "articles", cursor=cursor, limit=3)
+        seen += page.ids
+        cursor = page.next
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(ids) and len(seen) == len(ids)
+    with pytest.raises(ValueError):
+        search.search("ceasefire", "articles", cursor="bogus")
+
+
+@pytest.mark.django_db
+def test_rebuild_backfills_rows_written_behind_the_index():
+    art = _article(1, "Drone strike", "Details remain unclear.")
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cur:
+            cur.execute("DELETE FROM geopol_rawnews_fts")  # simulate a lost index
+        assert search.search("drone", "articles").ids == []
+
+    call_command("rebuild_search_index")
+
+    assert search.search("drone", "articles").ids == [art.id]
+
+
+@pytest.mark.django_db
+def test_search_endpoint(client):
+    c = Conflict.objects.create(name="Strait", entity_signature="strait")
+    ep = Episode.objects.create(conflict=c, date=date(2024, 5, 2), summary="Port blockade tightens", narrative="N")
+    art = _article(1, "Port closed", "The port closed.")
+
+    data = client.get("/api/search/", {"q": "port blockade"}).json()
+    assert [r["id"] for r in data["results"]] == [ep.id]
+    assert data["results"][0]["conflict"]["name"] == "Strait"
+    articles = client.get("/api/search/", {"q": "port", "type": "articles"}).json()
+    assert [r["id"] for r in articles["results"]] == [art.id]
+    assert client.get("/api/search/", {"q": " "}).status_code == 400
+    assert client.get("/api/search/", {"q": "port", "type": "users"}).status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_missing_sync_triggers_are_reported():
+    from geopol.checks import check_search_index
+
+    # Every migration that rebuilt an indexed table put the triggers back
+    assert search.missing() == []
+    assert check_search_index(databases=["default"]) == []
+
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TRIGGER geopol_episode_fts_au")  # what a SQLite table rebuild does
+    try:
+        assert search.missing() == ["geopol_episode_fts_au"]
+        assert [m.id for m in check_search_index(databases=["default"])] == ["geopol.W002"]
+    finally:
+        search.install()
+    assert search.missing() == []
+
+
+def test_search_migration_matches_current_index_definitions():
+    import importlib
+
+    # Changing geopol.search.INDEXES needs a new migration; 0010 is frozen
+    migration = importlib.import_module("geopol.migrations.0010_search_index")
+    live = [sql for index in search.INDEXES.values() for sql in search._sqlite_install(index)]
+    assert [sql for sql in migration.SQLITE_FORWARDS if "'rebuild'" not in sql] == live
+    live = [sql for index in search.INDEXES.values() for sql in search._postgres_install(index)]
+    assert [sql for sql in migration.POSTGRES_FORWARDS if not sql.startswith("ANALYZE")] == live
@@ -0,0 +1,424 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from geopol.pipeline.story_generation import AsyncStoryGenerator, GenerationJob
+
+
+class FakeOpenAI:
+    """Minimal OpenAI-compatible /v1/chat/completions server on a local port."""
+
+    def __init__(self, delay=0.1, fail_first=0, status=429):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.status = status
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake._lock:
+                    fake.calls += 1
+                    call = fake.calls
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                time.sleep(fake.delay)
+                with fake._lock:
+                    fake.in_flight -= 1
+                if call <= fake.fail_first:
+                    payload, code = {"error": {"message": "slow down", "type": "rate_limit"}}, fake.status
+                else:
+                    prompt = body["messages"][-1]["content"]
+                    payload, code = {
+                        "id": f"cmpl-{call}",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": body["model"],
+                        "choices": [{
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": f"Summary line\n{prompt[:40]}"},
+                        }],
+                    }, 200
+                data = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_openai():
+    servers = []
+
+    def make(**kwargs):
+        srv = FakeOpenAI(**kwargs)
+        servers.append(srv)
+        return srv
+
+    yield make
+    for srv in servers:
+        srv.close()
+
+
+def test_generation_is_concurrent_and_bounded(fake_openai):
+    srv = fake_openai(delay=0.2)
+    gen = AsyncStoryGenerator(base_url=srv.base_url, api_key="test", concurrency=4)
+    jobs = [GenerationJob(key=i, prompt=f"prompt {i}") for i in range(12)]
+    completed = []
+
+    async def on_result(result):
+        completed.append(result.key)
+
+    async def run():
+        try:
+            return await gen.generate_all(jobs, on_result)
+        finally:
+            await gen.aclose()
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert all(r.ok for r in results)
+    assert sorted(completed) == list(range(12))
+    assert srv.max_in_flight == 4
+    assert elapsed < 12 * 0.2 / 2  # well under the sequential time
+
+
+def test_parallel_chunks_share_one_concurrency_limit(fake_openai):
+    from django.core.cache import cache
+
+    from geopol.checks import check_llm_limit_shared
+
+    cache.clear()
+    srv = fake_openai(delay=0.1)
+
+    def chunk(keys):
+        # One generation task; a worker would run each in its own process
+        gen = AsyncStoryGenerator(base_url=srv.base_url, api_key="test", concurrency=3, shared_limit="test")
+
+        async def run():
+            try:
+                return await gen.generate_all([GenerationJob(key=k, prompt=f"prompt {k}") for k in keys])
+            finally:
+                await gen.aclose()
+
+        return asyncio.run(run())
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = [r for rs in pool.map(chunk, [range(0, 9), range(9, 18)]) for r in rs]
+
+    assert sorted(r.key for r in results if r.ok) == list(range(18))
+    assert srv.max_in_flight == 3
+    # The test cache is locmem, which real worker processes would not share
+    assert [m.id for m in check_llm_limit_shared()] == ["geopol.W004"]
+
+
+def test_generation_retries_rate_limits(fake_openai):
+    srv = fake_openai(delay=0.0, fail_first=2, status=429)
+    gen = AsyncStoryGenerator(base_url=srv.base_url, api_key="test", concurrency=1, backoff_base=0.01)
+
+    async def run():
+        try:
+            return await gen.generate_all([GenerationJob(key="a", prompt="p")])
+        finally:
+            await gen.aclose()
+
+    (result,) = asyncio.run(run())
+    assert result.ok
+    assert result.attempts == 3
+    assert srv.calls == 3
+
+
+def test_generation_gives_up_after_max_retries(fake_openai):
+    srv = fake_openai(delay=0.0, fail_first=99, status=503)
+    gen = AsyncStoryGenerator(base_url=srv.base_url, api_key="test", max_retries=1, backoff_base=0.01)
+
+    async def run():
+        try:
+            return await gen.generate_all([GenerationJob(key="a", prompt="p")])
+        finally:
+            await gen.aclose()
+
+    (result,) = asyncio.run(run())
+    assert not result.ok
+    assert result.attempts == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pipeline_persists_generated_episodes(fake_openai, settings, monkeypatch):
+    from geopol import tasks
+    from geopol.models import Episode, PipelineRun, RawNews
+    from geopol.pipeline.conflict_detection import ConflictDetector
+
+    srv = fake_openai(delay=0.05)
+    settings.OPENAI_BASE_URL = srv.base_url
+    settings.LLM_CONCURRENCY = 3
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    settings.STORY_CONTEXT_RETRIEVAL = False
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(tasks, "scrape_source", lambda name, max_per_source: 0)
+    vecs = iter(np.eye(3))
+    monkeypatch.setattr(ConflictDetector, "_embed", lambda self, texts: np.array([next(vecs)]))
+    sigs = iter(["a", "b", "c"])
+    monkeypatch.setattr("geopol.pipeline.conflict_detection.build_entity_signature", lambda ner: next(sigs))
+    for i in range(3):
+        RawNews.objects.create(
+            source_name="Test", source_url=f"https://example.com/g{i}", title=f"Story {i}", text="x", fingerprint=f"g{i}"
+        )
+
+    run = PipelineRun.objects.get(id=tasks.run_daily_pipeline())
+    assert run.checkpoints["generate"] == {"episodes": 3}
+    assert Episode.objects.count() == 3
+    assert set(Episode.objects.values_list("summary", flat=True)) == {"Summary line"}
+    assert all(ep.sources.count() == 1 for ep in Episode.objects.all())
+
+
+def test_identical_prompts_served_from_response_cache(fake_openai):
+    from django.core.cache import cache
+
+    cache.clear()
+    srv = fake_openai(delay=0.0)
+    gen = AsyncStoryGenerator(base_url=srv.base_url, api_key="test", concurrency=1, cache_seconds=60)
+
+    async def run(jobs):
+        try:
+            return await gen.generate_all(jobs)
+        finally:
+            await gen.aclose()
+
+    asyncio.run(run([GenerationJob(key=1, prompt="same prompt")]))
+    (again,) = asyncio.run(run([GenerationJob(key=2, prompt="same prompt")]))
+    assert again.cached and again.ok
+    assert srv.calls == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rerun_skips_unchanged_episodes(fake_openai, settings, monkeypatch):
+    from geopol import tasks
+    from geopol.models import Episode, PipelineRun, RawNews
+    from geopol.pipeline.conflict_detection import ConflictDetector
+
+    srv = fake_openai(delay=0.0)
+    settings.OPENAI_BASE_URL = srv.base_url
+    settings.LLM_RESPONSE_CACHE_SECONDS = 0  # exercise the digest check alone
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    settings.STORY_CONTEXT_RETRIEVAL = False
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(tasks, "scrape_source", lambda name, max_per_source: 0)
+    monkeypatch.setattr(ConflictDetector, "_embed", lambda self, texts: np.array([[1.0, 0.0]]))
+    for i in range(2):
+        RawNews.objects.create(
+            source_name="Test", source_url=f"https://example.com/r{i}", title=f"Story {i}", text="x", fingerprint=f"r{i}"
+        )
+
+    tasks.run_daily_pipeline()
+    assert srv.calls == 1
+    digest = Episode.objects.get().meta["input_digest"]
+
+    tasks.run_daily_pipeline()
+    assert srv.calls == 1
+    assert Episode.objects.get().meta["input_digest"] == digest
+
+
+@pytest.mark.django_db(transaction=True)
+def test_changing_the_generating_model_regenerates(offline_pipeline, monkeypatch):
+    from geopol import tasks
+    from geopol.models import RawNews
+
+    RawNews.objects.create(source_name="Test", source_url="https://example.com/m", title="Port update 1", text="x",
+                           fingerprint="m")
+    tasks.run_daily_pipeline()
+    tasks.run_daily_pipeline()
+    assert len(offline_pipeline) == 1
+
+    # e.g. a new OLLAMA_MODEL while the prompt builder's LLM_MODEL stays the same
+    monkeypatch.setattr(tasks.get_story_generator, "model", "other-model")
+    tasks.run_daily_pipeline()
+    assert len(offline_pipeline) == 2
+
+
+def test_prompt_builder_respects_token_budget():
+    from geopol.pipeline.story_generation import ArticleRef, PromptBuilder, count_tokens
+
+    arts = [
+        ArticleRef(title=f"Headline {i}", source_name=f"S{i % 3}", url=f"https://e.com/{i}", snippet="word " * 200)
+        for i in range(60)
+    ]
+    arts.append(ArticleRef(title="Headline 0", source_name="S0", url="https://e.com/dup", snippet="dup"))
+    builder = PromptBuilder(token_budget=600, snippet_chars=80)
+    built = builder.build("Conflict", "2025-10-05", arts, ["Earlier: talks stalled"])
+
+    assert built.tokens <= 600
+    assert built.tokens == count_tokens(built.prompt)
+    assert 0 < len(built.articles) < 60
+    assert "https://e.com/dup" not in built.prompt
+    # Sources interleaved, snippets truncated and rendered
+    assert [a.source_name for a in built.articles[:3]] == ["S0", "S1", "S2"]
+    assert all(len(a.snippet) <= 81 for a in built.articles)
+    assert built.meta["articles_total"] == 61
+
+    big = PromptBuilder(token_budget=100_000).build("Conflict", "2025-10-05", arts[:5], [])
+    assert big.meta["prompt_snippets"] == 5
+    assert "word word" in big.prompt
+
+
+def test_token_count_falls_back_when_tokenizer_download_fails(monkeypatch):
+    import sys
+    import types
+
+    from geopol.pipeline import story_generation
+
+    def offline(name):
+        raise OSError("Failed to fetch o200k_base.tiktoken: network is unreachable")
+
+    fake = types.ModuleType("tiktoken")
+    fake.encoding_for_model = offline
+    fake.get_encoding = offline
+    monkeypatch.setitem(sys.modules, "tiktoken", fake)
+    story_generation._encoding.cache_clear()
+    try:
+        assert story_generation.count_tokens("x" * 400, "offline-model") == 100
+        built = story_generation.PromptBuilder(token_budget=500, model="offline-model").build(
+            "Conflict", "2025-10-05", [], []
+        )
+        assert built.tokens > 0
+    finally:
+        story_generation._encoding.cache_clear()
+
+
+class FakeOllama:
+    """Streams /api/generate as chunked NDJSON, one token per chunk."""
+
+    def __init__(self, tokens=("Summary", " line", "\nBody"), first_token_delay=0.05, token_delay=0.0):
+        self.requests = []
+        self.connections = set()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _chunk(self, obj):
+                data = (json.dumps(obj) + "\n").encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                fake.requests.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                fake.connections.add(self.client_address)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                time.sleep(first_token_delay)
+                for tok in tokens:
+                    self._chunk({"model": "llama3.1", "response": tok, "done": False})
+                    time.sleep(token_delay)
+                self._chunk({"model": "llama3.1", "response": "", "done": True, "eval_count": len(tokens)})
+                self.wfile.write(b"0\r\n\r\n")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_ollama_stream_assembled_with_ttft_and_pooling():
+    from geopol.pipeline.story_generation import OllamaStoryGenerator
+
+    srv = FakeOllama()
+    gen = OllamaStoryGenerator(host=srv.host, concurrency=1, keep_alive="10m")
+
+    async def run():
+        try:
+            return await gen.generate_all([GenerationJob(key=i, prompt=f"p{i}") for i in range(3)])
+        finally:
+            await gen.aclose()
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        srv.close()
+    assert [r.text for r in results] == ["Summary line\nBody"] * 3
+    assert all(r.ttft is not None and r.ttft >= 0.05 for r in results)
+    assert srv.requests[0]["stream"] is True
+    assert srv.requests[0]["keep_alive"] == "10m"
+    assert len(srv.connections) == 1  # one pooled keep-alive connection
+
+
+def test_ollama_read_timeout_does_not_cap_a_steady_stream():
+    from geopol.pipeline.story_generation import OllamaStoryGenerator
+
+    srv = FakeOllama(tokens=("a",) * 6, first_token_delay=0, token_delay=0.1)
+
+    async def run(gen):
+        try:
+            return await gen.generate_all([GenerationJob(key=1, prompt="p")])
+        finally:
+            await gen.aclose()
+
+    try:
+        # Each read arrives well within the 0.3s timeout; the whole stream takes ~0.6s
+        (result,) = asyncio.run(run(OllamaStoryGenerator(host=srv.host, timeout=0.3, total_timeout=0)))
+        assert result.ok and result.text == "aaaaaa"
+        assert result.attempts == 1
+        # The whole-generation backstop fails once instead of repeating the generation
+        (result,) = asyncio.run(run(OllamaStoryGenerator(host=srv.host, timeout=0.3, total_timeout=0.2,
+                                                         max_retries=2, backoff_base=0.01)))
+        assert not result.ok and result.attempts == 1
+    finally:
+        srv.close()
+
+
+def test_sync_ollama_generate_parses_ndjson(monkeypatch):
+    from geopol.pipeline.story_generation import ollama_generate
+
+    srv = FakeOllama(first_token_delay=0)
+    monkeypatch.setenv("OLLAMA_HOST", srv.host)
+    try:
+        assert ollama_generate("prompt") == "Summary line\nBody"
+    finally:
+        srv.close()
+
+
+def test_ollama_backend_selected_from_settings(settings):
+    from geopol.pipeline.story_generation import OllamaStoryGenerator, get_story_generator
+
+    settings.LLM_BACKEND = "ollama"
+    settings.OLLAMA_HOST = "http://ollama:11434"
+    gen = get_story_generator()
+    assert isinstance(gen, OllamaStoryGenerator)
+    assert gen.host == "http://ollama:11434"
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = "geopol"
+
+urlpatterns = [
+    path("conflicts/", views.conflict_list, name="conflict-list"),
+    path("conflicts/<int:conflict_id>/episodes/", views.conflict_timeline, name="conflict-timeline"),
+    path("episodes/", views.episode_list, name="episode-list"),
+    path("search/", views.search, name="search"),
+]
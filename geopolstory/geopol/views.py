@@ -1,3 +1,76 @@
-from django.shortcuts import render
+"""Read-only JSON API: conflicts, conflict timelines, daily episodes and search.
 
-# Create your views here.
+Responses are built once per cache version (see geopol.api) and carry an
+ETag and Last-Modified so clients revalidate with a cheap 304.
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+
+from . import api, metrics
+from .models import Conflict
+
+
+def _serve(request, build: Callable[[], api.CachedPage]) -> HttpResponse:
+    key = api.cache_key(request.get_full_path())
+    page = cache.get(key)
+    metrics.incr("api_cache_total", outcome="miss" if page is None else "hit")
+    if page is None:
+        try:
+            page = build()
+        except api.BadRequest as exc:
+            return JsonResponse({"detail": str(exc)}, status=400)
+        except Conflict.DoesNotExist:
+            return JsonResponse({"detail": "conflict not found"}, status=404)
+        cache.set(key, page, api.cache_seconds())
+
+    response = HttpResponse(page.body, content_type="application/json")
+    response["ETag"] = page.etag
+    last_modified = int(page.last_modified.timestamp()) if page.last_modified else None
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # Shared caches may keep it, but must revalidate (a 304 is nearly free)
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    return get_conditional_response(request, etag=page.etag, last_modified=last_modified, response=response)
+
+
+@require_GET
+def conflict_list(request):
+    def build():
+        return api.conflicts_payload(request.GET.get("cursor"), api.page_size(request.GET.get("limit")))
+
+    return _serve(request, build)
+
+
+@require_GET
+def conflict_timeline(request, conflict_id: int):
+    def build():
+        conflict = Conflict.objects.only(*api.CONFLICT_FIELDS).get(id=conflict_id)
+        return api.timeline_payload(conflict, request.GET.get("cursor"), api.page_size(request.GET.get("limit")))
+
+    return _serve(request, build)
+
+
+@require_GET
+def episode_list(request):
+    def build():
+        raw_date = request.GET.get("date")
+        day = api.parse_date(raw_date) if raw_date else None
+        return api.episodes_payload(day, request.GET.get("cursor"), api.page_size(request.GET.get("limit")))
+
+    return _serve(request, build)
+
+
+@require_GET
+def search(request):
+    def build():
+        return api.search_payload(request.GET.get("q", ""), request.GET.get("type", "episodes"),
+                                  request.GET.get("cursor"), api.page_size(request.GET.get("limit")))
+
+    return _serve(request, build)
@@ -1,3 +1,19 @@
+"""Celery app.
+
+Tasks are routed (see CELERY_TASK_ROUTES in settings) to two queues with
+different worker profiles, so slow network calls never occupy a CPU worker
+and CPU-heavy detection never starves the network-bound pool:
+
+    # io: scraping, LLM calls, SMTP, canvas coordination. Mostly waiting on
+    # sockets, so many threads per process; a larger prefetch keeps them fed.
+    celery -A geopolstory worker -n io@%h -Q io -P threads -c 64 --prefetch-multiplier 4
+
+    # cpu: spaCy NER, embeddings, centroid search. One process per core,
+    # prefetch 1 and fair scheduling so a long chunk doesn't hoard queued work.
+    celery -A geopolstory worker -n cpu@%h -Q cpu -P prefork -c "$(nproc)" --prefetch-multiplier 1 -O fair
+
+Both pools share the broker, so workers can be scaled per queue.
+"""
 import os
 from celery import Celery
 
@@ -6,3 +22,4 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "geopolstory.settings")
 app = Celery("geopolstory")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
@@ -10,6 +10,8 @@ from pathlib import Path
 import os
 import environ
 import structlog
+from datetime import timedelta
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,9 +28,52 @@ env = environ.Env(
     DJANGO_DB_HOST=(str, ""),
     DJANGO_DB_PORT=(str, ""),
     REDIS_URL=(str, "redis://localhost:6379/0"),
+    CACHE_URL=(str, "locmemcache://"),
     DEFAULT_FROM_EMAIL=(str, "GeopolStory <no-reply@geopolstory.local>"),
     SENDGRID_API_KEY=(str, ""),
     SENTRY_DSN=(str, ""),
+    CONFLICT_CENTROID_HALF_LIFE_DAYS=(float, 0.0),
+    DIGEST_CACHE_SECONDS=(int, 6 * 3600),
+    EMAIL_BATCH_SIZE=(int, 500),
+    DIGEST_LOCAL_HOUR=(int, 7),
+    DIGEST_LATE_GRACE_MINUTES=(int, 120),
+    DIGEST_DISPATCH_INTERVAL_MINUTES=(int, 5),
+    CONFLICT_ACTIVE_WINDOW_DAYS=(float, 30.0),
+    CONFLICT_DETECTION_CHUNK_SIZE=(int, 0),
+    PIPELINE_GENERATION_CHUNK_SIZE=(int, 20),
+    PIPELINE_ITERATOR_CHUNK_SIZE=(int, 2000),
+    INGEST_CONTINUOUS=(bool, False),
+    INGEST_INTERVAL_MINUTES=(int, 5),
+    INGEST_MAX_PER_SOURCE=(int, 10),
+    INGEST_LOCK_TIMEOUT_SECONDS=(int, 900),
+    CELERY_CPU_TIME_LIMIT=(int, 1800),
+    DAILY_PIPELINE_BEAT=(bool, False),
+    ARCHIVE_DIR=(str, ""),
+    RETENTION_ARTICLE_DAYS=(int, 90),
+    RETENTION_EPISODE_DAYS=(int, 0),
+    RETENTION_RUN_DAYS=(int, 90),
+    RETENTION_BATCH_SIZE=(int, 1000),
+    API_CACHE_SECONDS=(int, 300),
+    API_PAGE_SIZE=(int, 50),
+    LLM_BACKEND=(str, "openai"),
+    OPENAI_BASE_URL=(str, ""),
+    LLM_MODEL=(str, "gpt-4o-mini"),
+    LLM_CONCURRENCY=(int, 8),
+    LLM_TIMEOUT_SECONDS=(float, 60.0),
+    LLM_MAX_RETRIES=(int, 4),
+    LLM_RESPONSE_CACHE_SECONDS=(int, 7 * 24 * 3600),
+    LLM_PROMPT_TOKEN_BUDGET=(int, 3000),
+    LLM_PROMPT_SNIPPET_CHARS=(int, 240),
+    STORY_CONTEXT_EPISODES=(int, 3),
+    STORY_CONTEXT_RETRIEVAL=(bool, True),
+    OLLAMA_HOST=(str, "http://localhost:11434"),
+    OLLAMA_MODEL=(str, "llama3.1"),
+    OLLAMA_KEEP_ALIVE=(str, "30m"),
+    OLLAMA_CONCURRENCY=(int, 2),
+    OLLAMA_TOTAL_TIMEOUT_SECONDS=(float, 900.0),
+    EMBEDDING_BACKEND=(str, "torch"),
+    EMBEDDING_ONNX_THREADS=(int, 0),
+    EMBEDDING_ONNX_CACHE_DIR=(str, ""),
 )
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -110,6 +155,10 @@ else:
     }
 
 
+# Cache (use a redis:// URL in production so locks and caches are shared across workers)
+CACHES = {'default': env.cache('CACHE_URL')}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -169,6 +218,17 @@ if env('SENDGRID_API_KEY'):
 else:
     # Fall back to console backend in dev
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Rendered daily digests are cached and shared by all recipients for this long
+DIGEST_CACHE_SECONDS = env('DIGEST_CACHE_SECONDS')
+# Recipients per Celery email task; each task reuses one SMTP connection
+EMAIL_BATCH_SIZE = env('EMAIL_BATCH_SIZE')
+# Digests are delivered at this hour in each subscriber's own timezone
+DIGEST_LOCAL_HOUR = env('DIGEST_LOCAL_HOUR')
+# A zone whose slot passed less than this long ago when the run finishes is sent
+# at once; later than that, it waits for its next local morning
+DIGEST_LATE_GRACE_MINUTES = env('DIGEST_LATE_GRACE_MINUTES')
+# How often beat releases due timezone digests; a zone's digest leaves at most this late
+DIGEST_DISPATCH_INTERVAL_MINUTES = env('DIGEST_DISPATCH_INTERVAL_MINUTES')
 
 # Celery configuration
 CELERY_BROKER_URL = env('REDIS_URL')
@@ -176,6 +236,129 @@ CELERY_RESULT_BACKEND = env('REDIS_URL')
 CELERY_TASK_ALWAYS_EAGER = False
 CELERY_TIMEZONE = 'Asia/Kolkata'  # Ensure 07:00 IST schedules run as expected
 
+# Queues: "cpu" for NER/embedding/detection (prefork, one process per core),
+# "io" for scraping, LLM calls, SMTP and canvas coordination (thread pool,
+# high concurrency). Worker profiles are documented in geopolstory/celery.py.
+CELERY_TASK_DEFAULT_QUEUE = 'io'
+CELERY_TASK_ROUTES = {
+    'geopol.tasks.detect_conflicts_chunk': {'queue': 'cpu'},
+    'geopol.tasks.detect_pending': {'queue': 'cpu'},
+    'geopol.tasks.embed_episodes_chunk': {'queue': 'cpu'},
+    'geopol.tasks.retrieve_context_chunk': {'queue': 'cpu'},
+    'geopol.tasks.*': {'queue': 'io'},
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # per-profile override on the worker command line
+# Time limits are enforced by the prefork (cpu) pool only; io tasks are bounded
+# by their per-call network timeouts (scraper requests, LLM_TIMEOUT_SECONDS).
+# Detection is idempotent, so cpu tasks are acked late and re-delivered if the
+# worker dies mid-chunk.
+CELERY_CPU_TIME_LIMIT = env('CELERY_CPU_TIME_LIMIT')
+_CPU_TASK = {
+    'soft_time_limit': CELERY_CPU_TIME_LIMIT,
+    'time_limit': CELERY_CPU_TIME_LIMIT + 60,
+    'acks_late': True,
+    'reject_on_worker_lost': True,
+}
+CELERY_TASK_ANNOTATIONS = {
+    'geopol.tasks.detect_conflicts_chunk': _CPU_TASK,
+    'geopol.tasks.detect_pending': _CPU_TASK,
+    'geopol.tasks.embed_episodes_chunk': _CPU_TASK,
+    'geopol.tasks.retrieve_context_chunk': _CPU_TASK,
+}
+# Redis redelivers a message left unacked for visibility_timeout. Late-acked cpu
+# tasks stay unacked while they run, so it must outlast their hard time limit,
+# and no longer than that, so a task lost with its worker is redelivered
+# promptly. Nothing is queued with a far-off ETA (digests are released by
+# send_due_digests), which would otherwise need a timeout longer than the delay.
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': CELERY_CPU_TIME_LIMIT + 600}
+CELERY_BEAT_SCHEDULE = {
+    'retention': {
+        'task': 'geopol.tasks.run_retention_task',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'incremental-refresh': {
+        'task': 'geopol.tasks.run_incremental_refresh',
+        'schedule': crontab(minute=15, hour='8-23,0-6'),  # hourly, outside the daily run
+    },
+    # Releases each timezone's planned digest once its local morning arrives
+    'digest-dispatch': {
+        'task': 'geopol.tasks.send_due_digests',
+        'schedule': timedelta(minutes=DIGEST_DISPATCH_INTERVAL_MINUTES),
+    },
+}
+# Opt in to scheduling the 07:00 daily run from beat; off by default so it
+# cannot double-run alongside an existing cron job or external scheduler.
+DAILY_PIPELINE_BEAT = env('DAILY_PIPELINE_BEAT')
+if DAILY_PIPELINE_BEAT:
+    CELERY_BEAT_SCHEDULE['daily-pipeline'] = {
+        'task': 'geopol.tasks.run_daily_pipeline',
+        'schedule': crontab(hour=7, minute=0),
+    }
+
+# Data lifecycle (geopol.retention): article bodies older than RETENTION_ARTICLE_DAYS
+# move to gzip JSONL under ARCHIVE_DIR; 0 disables a rule.
+ARCHIVE_DIR = env('ARCHIVE_DIR') or str(BASE_DIR / 'archive')
+RETENTION_ARTICLE_DAYS = env('RETENTION_ARTICLE_DAYS')
+RETENTION_EPISODE_DAYS = env('RETENTION_EPISODE_DAYS')  # 0 keeps episodes forever
+RETENTION_RUN_DAYS = env('RETENTION_RUN_DAYS')
+RETENTION_BATCH_SIZE = env('RETENTION_BATCH_SIZE')
+
+# Read API (geopol.views): rendered pages are cached this long and dropped early
+# whenever episodes or conflict assignments change. Early drops come from Celery
+# workers and need a shared CACHE_URL; with locmem, pages can stay stale this long.
+API_CACHE_SECONDS = env('API_CACHE_SECONDS')
+API_PAGE_SIZE = env('API_PAGE_SIZE')  # default ?limit=, capped at 200
+
+# Continuous ingestion: scrape + detect in small batches all day, so the daily
+# run only assembles already-processed articles.
+INGEST_CONTINUOUS = env('INGEST_CONTINUOUS')
+INGEST_INTERVAL_MINUTES = env('INGEST_INTERVAL_MINUTES')
+INGEST_MAX_PER_SOURCE = env('INGEST_MAX_PER_SOURCE')  # article URLs per source per scrape
+# Single-flight lock lifetime; a batch running longer than this may overlap the next
+INGEST_LOCK_TIMEOUT_SECONDS = env('INGEST_LOCK_TIMEOUT_SECONDS')
+if INGEST_CONTINUOUS:
+    CELERY_BEAT_SCHEDULE['ingest-micro-batch'] = {
+        'task': 'geopol.tasks.ingest_micro_batch',
+        'schedule': timedelta(minutes=INGEST_INTERVAL_MINUTES),
+    }
+
+# Conflict detection
+# Half-life (days) for decaying old members in conflict centroids; 0 disables decay.
+CONFLICT_CENTROID_HALF_LIFE_DAYS = env('CONFLICT_CENTROID_HALF_LIFE_DAYS')
+# Only conflicts active within this many days are matched first; 0 searches everything.
+CONFLICT_ACTIVE_WINDOW_DAYS = env('CONFLICT_ACTIVE_WINDOW_DAYS')
+# Articles per Celery detection task; 0 detects each run's articles in a single task.
+CONFLICT_DETECTION_CHUNK_SIZE = env('CONFLICT_DETECTION_CHUNK_SIZE')
+# Conflicts per Celery generation task in the daily pipeline canvas; 0 = one task.
+PIPELINE_GENERATION_CHUNK_SIZE = env('PIPELINE_GENERATION_CHUNK_SIZE')
+# Articles fetched per database round trip when pipeline stages stream the window
+PIPELINE_ITERATOR_CHUNK_SIZE = env('PIPELINE_ITERATOR_CHUNK_SIZE')
+# Embedding backend: "torch" (sentence-transformers) or "onnx" (int8-quantized, CPU)
+EMBEDDING_BACKEND = env('EMBEDDING_BACKEND')
+EMBEDDING_ONNX_THREADS = env('EMBEDDING_ONNX_THREADS')  # intra-op threads; 0 = onnxruntime default
+EMBEDDING_ONNX_CACHE_DIR = env('EMBEDDING_ONNX_CACHE_DIR')
+
+# Story generation: "openai" (any OpenAI-compatible API) or "ollama" (local, streaming)
+LLM_BACKEND = env('LLM_BACKEND')
+OPENAI_BASE_URL = env('OPENAI_BASE_URL')  # empty = api.openai.com
+LLM_MODEL = env('LLM_MODEL')
+LLM_CONCURRENCY = env('LLM_CONCURRENCY')  # max in-flight requests across all workers (needs a shared CACHE_URL)
+LLM_TIMEOUT_SECONDS = env('LLM_TIMEOUT_SECONDS')  # per call
+LLM_MAX_RETRIES = env('LLM_MAX_RETRIES')  # on 429/5xx/timeouts, with exponential backoff
+LLM_RESPONSE_CACHE_SECONDS = env('LLM_RESPONSE_CACHE_SECONDS')  # prompt-hash cache TTL; 0 disables
+LLM_PROMPT_TOKEN_BUDGET = env('LLM_PROMPT_TOKEN_BUDGET')  # max prompt tokens; articles/snippets trimmed to fit
+LLM_PROMPT_SNIPPET_CHARS = env('LLM_PROMPT_SNIPPET_CHARS')
+# Past episodes summarized in each prompt: the latest plus the most similar to
+# today's articles (geopol.pipeline.context); retrieval off = the latest N.
+STORY_CONTEXT_EPISODES = env('STORY_CONTEXT_EPISODES')
+STORY_CONTEXT_RETRIEVAL = env('STORY_CONTEXT_RETRIEVAL')
+OLLAMA_HOST = env('OLLAMA_HOST')
+OLLAMA_MODEL = env('OLLAMA_MODEL')
+OLLAMA_KEEP_ALIVE = env('OLLAMA_KEEP_ALIVE')  # how long Ollama keeps the model loaded after a call
+OLLAMA_CONCURRENCY = env('OLLAMA_CONCURRENCY')  # all workers together; match the server's OLLAMA_NUM_PARALLEL
+# LLM_TIMEOUT_SECONDS bounds each streamed read; this bounds a whole generation (0 = none)
+OLLAMA_TOTAL_TIMEOUT_SECONDS = env('OLLAMA_TOTAL_TIMEOUT_SECONDS')
+
 # Sentry
 SENTRY_DSN = env('SENTRY_DSN')
 if SENTRY_DSN:
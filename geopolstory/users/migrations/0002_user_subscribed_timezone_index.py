@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_subscribed', 'timezone'], name='users_subscribed_tz_idx'),
+        ),
+    ]
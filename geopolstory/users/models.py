@@ -14,6 +14,10 @@ class User(AbstractUser):
     is_subscribed = models.BooleanField(default=True)
     timezone = models.CharField(max_length=64, default="Asia/Kolkata")
 
+    class Meta(AbstractUser.Meta):
+        # Digest scheduling selects subscribers one timezone bucket at a time
+        indexes = [models.Index(fields=["is_subscribed", "timezone"], name="users_subscribed_tz_idx")]
+
     def __str__(self) -> str:  # pragma: no cover - trivial
         return self.username or self.email
 